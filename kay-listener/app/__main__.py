@@ -0,0 +1,18 @@
+"""``python -m app``: starts Kay Listener and times the import of app.app for
+--profile-startup.
+"""
+
+from __future__ import annotations
+
+import importlib
+import time
+
+
+def run() -> None:
+    started = time.perf_counter()
+    module = importlib.import_module("app.app")
+    module.main(import_seconds=time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    run()
@@ -1,46 +1,144 @@
 from __future__ import annotations
 
 import argparse
+import dataclasses
+import functools
+import importlib
+import sys
 import threading
 import time
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
-from loguru import logger
+if TYPE_CHECKING:
+    from .audio_stream import AudioStream
+    from .config import AppConfig
+    from .recorder import Recorder, RecordingResult
+    from .utils import StartupTimer
+    from .wake_detector import WakeDetector
 
-from .audio_stream import AudioStream
-from .config import AppConfig, ensure_directories, load_config, project_root
-from .logger import configure_logging
-from .recorder import Recorder, RecordingResult
-from .tray import TrayIcon, open_path_in_explorer
-from .uploader import UploadMeta, Uploader
-from .utils import NotificationManager, RepeatedTimer
-from .wake_detector import WakeDetector
+# Dependencias pesadas por subsistema, en el orden en que se cargan al arrancar
+PROFILED_MODULES = (
+    ("loguru", "logs"),
+    ("numpy", "captura"),
+    ("sounddevice", "captura"),
+    ("app.audio_stream", "captura"),
+    ("webrtcvad", "vad"),
+    ("app.recorder", "grabación"),
+    ("vosk", "wake word"),
+    ("app.wake_detector", "wake word"),
+    ("requests", "subida"),
+    ("http.server", "métricas"),
+    ("pystray", "bandeja"),
+    ("PIL.Image", "bandeja"),
+    ("win10toast", "notificaciones"),
+)
+
+
+class _LazyLogger:
+    """Stands in for loguru's logger until the first message, so importing app.app does
+    not load it.
+    """
+
+    def __getattr__(self, name: str):
+        from loguru import logger as loguru_logger
+
+        return getattr(loguru_logger, name)
+
+
+logger = _LazyLogger()
+
+
+@dataclass
+class DeviceChannel:
+    """Capture, wake word detection and recording for one input device."""
+
+    device_id: str
+    audio_stream: AudioStream
+    recorder: Recorder
+    wake_detector: WakeDetector
+    recording_lock: threading.Lock = field(default_factory=threading.Lock)
 
 
 class KayListenerApp:
-    def __init__(self, config: AppConfig) -> None:
+    def __init__(
+        self,
+        config: AppConfig,
+        startup: StartupTimer | None = None,
+        env_path: Path | None = None,
+    ) -> None:
+        # Lazy import: los subsistemas (y loguru) se cargan
+        # al construir la app, no al importar app.app
+        from .config import ensure_directories, project_root
+        from .config_watch import ConfigWatcher
+        from .logger import configure_logging
+        from .metrics import MetricsServer, metrics
+        from .tray import TrayIcon
+        from .upload_queue import UploadQueue
+        from .uploader import Uploader
+        from .utils import (
+            NotificationManager,
+            RepeatedTimer,
+            StartupTimer,
+            logs_dir,
+            remove_stale_spill_files,
+        )
+
+        self.startup = startup or StartupTimer()
         ensure_directories()
         configure_logging(config.log_level)
         self.config = config
         self.notifier = NotificationManager()
-        self.audio_stream = AudioStream(config)
-        self.recorder = Recorder(config, self.audio_stream)
-        from scripts.download_vosk_model import ensure_model
-
-        model_dir = ensure_model(show_progress=False)
-        self.wake_detector = WakeDetector(
-            config=config,
-            audio_stream=self.audio_stream,
-            on_wake=self._on_wake_word,
-            model_path=model_dir,
+        self.ready = threading.Event()
+        # Un canal por micrófono; todos comparten el mismo vosk.Model (ver
+        # shared_model). El modelo se carga después, en segundo plano: ver _warm_up
+        devices = (
+            config.device_indices
+            if config.audio_source.strip().lower() == "device"
+            else [config.input_device_index]
         )
+        self.channels = [
+            self._build_channel(index, multiple=len(devices) > 1) for index in devices
+        ]
+        primary = self.channels[0]
+        self.audio_stream = primary.audio_stream
+        self.recorder = primary.recorder
+        self.wake_detector = primary.wake_detector
         self.uploader = Uploader(config, self.notifier)
+        if self.uploader.journal.owner:
+            # Restos de grabaciones interrumpidas por un cierre inesperado; otra
+            # instancia en marcha no los toca
+            removed = remove_stale_spill_files()
+            if removed:
+                logger.info(
+                    "Eliminados %s archivos temporales de grabaciones interrumpidas",
+                    removed,
+                )
+        # Las subidas no bloquean la grabación: la siguiente wake word se atiende en
+        # cuanto acaba el endpointing
+        self.upload_queue = UploadQueue(
+            self.uploader, config.upload_workers, config.upload_queue_size
+        )
+        self.upload_queue.start()
         self.listening = True
-        self._recording_lock = threading.Lock()
         self._stop_event = threading.Event()
         self._spooler = RepeatedTimer(config.spooler_interval_seconds, self._spool_once)
         if config.auto_start_spooler:
             self._spooler.start()
+        self._metrics_server = (
+            MetricsServer(metrics, config.metrics_port)
+            if config.metrics_port > 0
+            else None
+        )
+        self._metrics_snapshots = None
+        if config.metrics_snapshot_seconds > 0:
+            self._metrics_snapshots = RepeatedTimer(
+                config.metrics_snapshot_seconds,
+                metrics.write_snapshot,
+                logs_dir() / "metrics.json",
+                name="MetricsSnapshot",
+            )
         icon_path = project_root() / "app" / "assets" / "icon.ico"
         if not icon_path.exists():
             icon_path = None
@@ -50,15 +148,73 @@ class KayListenerApp:
             toggle_listening=self.toggle_listening,
             test_microphone=self.test_microphone,
             open_logs=self.open_logs,
+            profile_cpu=self.profile_cpu,
             on_exit=self.stop,
         )
+        self._warmup_thread: threading.Thread | None = None
+        self._profile_thread: threading.Thread | None = None
+        # Cambios en .env se aplican sin reiniciar: ver reload_config
+        self._config_watcher = None
+        if config.config_reload_seconds > 0:
+            self._config_watcher = ConfigWatcher(
+                env_path or Path.cwd() / ".env",
+                self.reload_config,
+                interval=config.config_reload_seconds,
+            )
+        self.startup.mark("init")
+
+    def _build_channel(self, index: Optional[int], multiple: bool) -> DeviceChannel:
+        # Lazy import: numpy y el pipeline de audio no se cargan hasta construir la app
+        from .audio_stream import AudioStream
+        from .config import device_label
+        from .recorder import Recorder
+        from .wake_detector import WakeDetector
+
+        device_id = device_label(index)
+        config = dataclasses.replace(self.config, input_device_index=index)
+        if multiple and config.audio_capture_path:
+            capture = Path(config.audio_capture_path)
+            config = dataclasses.replace(
+                config,
+                audio_capture_path=str(
+                    capture.with_name(f"{capture.stem}_{device_id}{capture.suffix}")
+                ),
+            )
+        audio_stream = AudioStream(config, device_id=device_id)
+        wake_detector = WakeDetector(
+            config=config,
+            audio_stream=audio_stream,
+            on_wake=functools.partial(self._on_wake_word, device_id),
+        )
+        recorder = Recorder(config, audio_stream)
+        recorder.noise_floor = lambda: wake_detector.noise_floor_db
+        recorder.boundary_recognizer = wake_detector.boundary_recognizer
+        return DeviceChannel(
+            device_id=device_id,
+            audio_stream=audio_stream,
+            recorder=recorder,
+            wake_detector=wake_detector,
+        )
 
     def start(self) -> None:
-        logger.info("Iniciando Kay Listener")
-        self.audio_stream.start()
-        self.wake_detector.start()
+        logger.info("Iniciando Kay Listener (%s dispositivos)", len(self.channels))
+        # La captura arranca ya: el pre-roll y el audio
+        # de la carga del modelo quedan en el buffer
+        for channel in self.channels:
+            channel.audio_stream.start()
+        self.startup.mark("capture")
+        if self._metrics_server is not None:
+            self._metrics_server.start()
+        if self._metrics_snapshots is not None:
+            self._metrics_snapshots.start()
+        if self._config_watcher is not None:
+            self._config_watcher.start()
+        self.tray.set_status("Cargando modelo...")
         self.tray.run()
-        self.notifier.show("Kay Listener", "Escuchando...")
+        self._warmup_thread = threading.Thread(
+            target=self._warm_up, name="ModelWarmup", daemon=True
+        )
+        self._warmup_thread.start()
         try:
             while not self._stop_event.is_set():
                 time.sleep(1)
@@ -67,25 +223,194 @@ class KayListenerApp:
             self.stop()
 
     def stop(self) -> None:
+        from .metrics import metrics
+        from .utils import logs_dir
+
         if self._stop_event.is_set():
             return
         logger.info("Cerrando Kay Listener")
         self._stop_event.set()
-        self.wake_detector.stop()
-        self.audio_stream.stop()
+        if self._config_watcher is not None:
+            self._config_watcher.stop()
+        for channel in self.channels:
+            channel.wake_detector.stop()
+            channel.audio_stream.stop()
+        self.upload_queue.stop()
         self._spooler.stop()
+        if self._metrics_server is not None:
+            self._metrics_server.stop()
+        if self._metrics_snapshots is not None:
+            self._metrics_snapshots.stop()
+            metrics.write_snapshot(logs_dir() / "metrics.json")
         self.tray.stop()
         self.notifier.show("Kay Listener", "Aplicación detenida")
 
+    def _warm_up(self) -> None:
+        """Fetch and load the Vosk model, then start every detector on the buffered
+        audio.
+        """
+        from .metrics import metrics
+
+        try:
+            from scripts.download_vosk_model import ensure_model
+
+            model_dir = ensure_model(show_progress=False)
+            self.startup.mark("model_files")
+            for position, channel in enumerate(self.channels):
+                channel.wake_detector.model_path = model_dir
+                channel.wake_detector.load()
+                if position == 0:
+                    self.startup.mark("model_load")
+            if self._stop_event.is_set():
+                return
+            backlog = 0
+            for channel in self.channels:
+                backlog = max(backlog, channel.wake_detector.backlog_frames)
+                channel.wake_detector.start()
+            self.startup.mark("recognizers")
+        except Exception as exc:
+            logger.exception("No se pudo cargar el modelo de wake word: %s", exc)
+            self.tray.set_status("Error al cargar el modelo")
+            self.notifier.show("Kay Listener", "Error al cargar el modelo de voz")
+            return
+        self.ready.set()
+        logger.info(
+            "Kay Listener listo en %.2fs (%.1fs de audio pendiente de decodificar)",
+            self.startup.total,
+            backlog * self.config.frame_duration_seconds,
+        )
+        metrics.gauge(
+            "startup_seconds", "Process start to wake word detection ready"
+        ).set(self.startup.total)
+        self.tray.set_status("Escuchando" if self.listening else "En pausa")
+        self.notifier.show("Kay Listener", "Escuchando...")
+
+    def profile_cpu(self, seconds: float | None = None) -> bool:
+        """Sample every thread for ``seconds`` in the background and write the profile
+        to ``logs/``.
+
+        Returns False if a profile is already running.
+        """
+        if self._profile_thread is not None and self._profile_thread.is_alive():
+            logger.warning("Ya hay un perfil de CPU en curso")
+            return False
+        seconds = self.config.profile_seconds if seconds is None else seconds
+        self._profile_thread = threading.Thread(
+            target=self._run_profile, args=(seconds,), name="KayProfiler", daemon=True
+        )
+        self._profile_thread.start()
+        return True
+
+    def _run_profile(self, seconds: float) -> None:
+        from .profiler import SamplingProfiler, ThreadInfo, write_profile
+
+        def callback_threads() -> list[ThreadInfo]:
+            return [
+                ThreadInfo(
+                    f"AudioCallback-{channel.device_id}",
+                    *channel.audio_stream.callback_thread,
+                )
+                for channel in self.channels
+                if channel.audio_stream.callback_thread is not None
+            ]
+
+        logger.info("Perfil de CPU: muestreando todos los hilos durante %s s", seconds)
+        self.tray.set_status("Perfilando CPU...")
+        profiler = SamplingProfiler(
+            self.config.profile_interval_ms / 1000, extra_threads=callback_threads
+        )
+        try:
+            report = profiler.run(seconds, stop_event=self._stop_event)
+            collapsed_path, summary_path = write_profile(report)
+        except Exception as exc:
+            logger.exception("No se pudo completar el perfil de CPU: %s", exc)
+            return
+        finally:
+            if not self._stop_event.is_set():
+                self.tray.set_status("Escuchando" if self.listening else "En pausa")
+        logger.info(
+            "Perfil de CPU guardado en %s y %s\n%s",
+            collapsed_path,
+            summary_path,
+            report.summary(),
+        )
+
+    def reload_config(self, new: AppConfig) -> list[str]:
+        """Apply changed settings in place, keeping the model, the audio devices and the
+        queues.
+
+        Returns the changed settings that only take effect after a restart.
+        """
+        from .config_watch import RELOADABLE_FIELDS, config_changes
+        from .logger import configure_logging
+        from .metrics import metrics
+        from .recorder import ENDPOINTERS, create_vad
+
+        changes = config_changes(self.config, new)
+        if changes.get("endpointer", ENDPOINTERS[0]) not in ENDPOINTERS:
+            logger.error(
+                "ENDPOINTER no válido: %s (se mantiene %s)",
+                changes.pop("endpointer"),
+                self.config.endpointer,
+            )
+        live = {
+            name: value for name, value in changes.items() if name in RELOADABLE_FIELDS
+        }
+        restart = sorted(set(changes) - set(live))
+        if live:
+            # Cada canal tiene su copia de la config (con su dispositivo); se actualizan
+            # todas en el sitio
+            targets = {
+                id(config): config for config in [self.config, self.uploader.config]
+            }
+            for channel in self.channels:
+                targets[id(channel.recorder.config)] = channel.recorder.config
+                targets[id(channel.wake_detector.config)] = channel.wake_detector.config
+            for config in targets.values():
+                for name, value in live.items():
+                    setattr(config, name, value)
+            for channel in self.channels:
+                if "vad_aggressiveness" in live:
+                    channel.recorder.vad = create_vad(new.vad_aggressiveness)
+                channel.wake_detector.reconfigure(live)
+            if "webhook_batch_url" in live:
+                self.uploader.batch_supported = bool(new.webhook_batch_url)
+            if "delivery_check" in live:
+                self.uploader.delivery_check_supported = new.delivery_check
+            if "log_level" in live:
+                configure_logging(new.log_level)
+            self._spooler.interval = self.config.spooler_interval_seconds
+            if "auto_start_spooler" in live:
+                (
+                    self._spooler.start
+                    if new.auto_start_spooler
+                    else self._spooler.stop
+                )()
+            logger.info("Configuración recargada: %s", ", ".join(sorted(live)))
+            metrics.counter(
+                "config_reloads_total", "Settings applied from .env without restarting"
+            ).inc()
+        if restart:
+            logger.warning(
+                "Estos cambios requieren reiniciar Kay Listener: %s", ", ".join(restart)
+            )
+        return restart
+
     def toggle_listening(self) -> None:
         self.listening = not self.listening
         if self.listening:
             logger.info("Escucha reanudada")
-            self.wake_detector.resume()
+            for channel in self.channels:
+                channel.wake_detector.resume()
+            if self.ready.is_set():
+                self.tray.set_status("Escuchando")
             self.notifier.show("Kay Listener", "Escucha reanudada")
         else:
             logger.info("Escucha pausada")
-            self.wake_detector.pause()
+            for channel in self.channels:
+                channel.wake_detector.pause()
+            if self.ready.is_set():
+                self.tray.set_status("En pausa")
             self.notifier.show("Kay Listener", "Escucha pausada")
 
     def test_microphone(self) -> None:
@@ -97,41 +422,125 @@ class KayListenerApp:
         self.notifier.show("Kay Listener", f"Grabación de prueba {len(result.audio_bytes)} bytes")
 
     def open_logs(self) -> None:
+        from .config import project_root
+        from .tray import open_path_in_explorer
+
         logs_path = project_root() / "logs"
         open_path_in_explorer(logs_path)
 
-    def _on_wake_word(self) -> None:
+    def _on_wake_word(self, device_id: str, start_index: int) -> None:
+        from .metrics import metrics
+
+        triggered_at = time.monotonic()
+        channel = next(
+            channel for channel in self.channels if channel.device_id == device_id
+        )
         if not self.listening:
             logger.debug("Wake word ignorada: escucha en pausa")
+            metrics.counter(
+                "wake_ignored_total",
+                "Wake words that did not start a recording",
+                reason="paused",
+            ).inc()
             return
-        if not self._recording_lock.acquire(blocking=False):
-            logger.info("Wake word ignorada: grabación en curso")
+        if not channel.recording_lock.acquire(blocking=False):
+            logger.info(
+                "Wake word ignorada: grabación en curso en %s", channel.device_id
+            )
+            metrics.counter(
+                "wake_ignored_total",
+                "Wake words that did not start a recording",
+                reason="busy",
+            ).inc()
             return
-        threading.Thread(target=self._capture_and_send, name="RecorderThread", daemon=True).start()
+        threading.Thread(
+            target=self._capture_and_send,
+            args=(channel, start_index, triggered_at),
+            name=f"RecorderThread-{channel.device_id}",
+            daemon=True,
+        ).start()
 
-    def _capture_and_send(self) -> None:
+    def _capture_and_send(
+        self,
+        channel: DeviceChannel,
+        start_index: int,
+        triggered_at: float | None = None,
+    ) -> None:
+        from .streaming import SegmentedUploadSession
+        from .utils import timestamp_iso
+
+        session = None
         try:
             self.notifier.show("Kay Listener", "Grabando...")
-            result = self.recorder.record_until_silence(self._stop_event)
-            if result is None:
-                self.notifier.show("Kay Listener", "Grabación cancelada")
-                return
-            self._send_recording(result)
+            if self.config.stream_segment_seconds > 0:
+                session = SegmentedUploadSession(
+                    self.uploader,
+                    encode=channel.recorder.encode,
+                    wake_word=self.config.wake_word,
+                    timestamp_iso=timestamp_iso(),
+                    codec=channel.recorder.encoder.name,
+                    content_type=channel.recorder.encoder.content_type,
+                    device_id=channel.device_id,
+                )
+            result = channel.recorder.record_until_silence(
+                self._stop_event,
+                start_index=start_index,
+                on_segment=session.add_segment if session else None,
+                triggered_at=triggered_at,
+            )
         finally:
-            self._recording_lock.release()
-            self.wake_detector.resume()
+            # El micrófono queda libre al terminar el endpointing, no la subida
+            channel.recording_lock.release()
+            channel.wake_detector.resume()
+        recording_ended = time.monotonic()
+        if session is not None:
+            # La sesión se cierra siempre para que el backend no la deje abierta
+            if (
+                session.finish(result.duration_ms if result else 0)
+                and result is not None
+            ):
+                self._observe_upload_ack(recording_ended)
+        if result is None:
+            self.notifier.show("Kay Listener", "Grabación cancelada")
+            return
+        if session is None:
+            self._send_recording(result, channel.device_id, recording_ended)
+
+    def _send_recording(
+        self,
+        result: RecordingResult,
+        device_id: str | None = None,
+        recording_ended: float | None = None,
+    ) -> bool:
+        """Hand the recording to the upload workers; False if it went straight to the
+        outbox.
+        """
+        from .uploader import UploadMeta
 
-    def _send_recording(self, result: RecordingResult) -> None:
         meta = UploadMeta(
             duration_ms=result.duration_ms,
             wake_word=result.wake_word,
             timestamp_iso=result.timestamp_iso,
+            codec=result.codec,
+            content_type=result.content_type,
+            device_id=device_id,
+            original_duration_ms=result.original_duration_ms,
         )
-        success = self.uploader.upload(result.audio_bytes, meta)
-        if success:
-            logger.info("Grabación enviada (%sms)", result.duration_ms)
-        else:
-            logger.info("Grabación encolada (%sms)", result.duration_ms)
+        on_sent = (
+            None
+            if recording_ended is None
+            else functools.partial(self._observe_upload_ack, recording_ended)
+        )
+        return self.upload_queue.submit(result.audio, meta, on_sent=on_sent)
+
+    @staticmethod
+    def _observe_upload_ack(recording_ended: float) -> None:
+        from .metrics import metrics
+
+        metrics.histogram(
+            "record_end_to_upload_ack_seconds",
+            "End of recording to webhook acknowledgement",
+        ).observe(time.monotonic() - recording_ended)
 
     def _spool_once(self) -> None:
         self.uploader.process_outbox_once()
@@ -140,18 +549,117 @@ class KayListenerApp:
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Kay Listener")
     parser.add_argument("--list-devices", action="store_true", help="Lista dispositivos de entrada disponibles")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help=(
+            "Muestra el tiempo de importación de cada subsistema y de cada fase del "
+            "arranque y sale"
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=-1.0,
+        type=float,
+        metavar="SEGUNDOS",
+        help=(
+            "Perfila el CPU de cada hilo durante SEGUNDOS (por defecto "
+            "PROFILE_SECONDS) tras cargar el modelo y lo guarda en logs/"
+        ),
+    )
     return parser
 
 
-def main() -> None:
+def profile_imports(
+    import_seconds: float | None = None,
+) -> list[tuple[str, str, float | str]]:
+    """Time the first import of each heavy dependency, or say why it could not be timed.
+
+    ``import_seconds`` is the cost of importing app.app itself, measured by ``python -m
+    app``.
+    """
+    timings: list[tuple[str, str, float | str]] = [
+        (
+            "app.app",
+            "módulo principal",
+            "ya cargado" if import_seconds is None else import_seconds,
+        )
+    ]
+    for module, subsystem in PROFILED_MODULES:
+        if module in sys.modules:
+            timings.append((module, subsystem, "ya cargado"))
+            continue
+        started = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except Exception:
+            timings.append((module, subsystem, "no disponible"))
+            continue
+        timings.append((module, subsystem, time.perf_counter() - started))
+    return timings
+
+
+def profile_startup(
+    config: AppConfig, startup: StartupTimer, import_seconds: float | None = None
+) -> str:
+    """Run every startup phase in the foreground, without tray or main loop, and report
+    timings.
+    """
+    imports = profile_imports(import_seconds)
+    startup.mark("imports")
+    app = KayListenerApp(config, startup=startup)
+    try:
+        for channel in app.channels:
+            channel.audio_stream.start()
+        startup.mark("capture")
+        app._warm_up()
+    finally:
+        app.stop()
+    lines = ["Importaciones:"]
+    for module, subsystem, seconds in imports:
+        elapsed = seconds if isinstance(seconds, str) else f"{seconds * 1000:8.1f} ms"
+        lines.append(f"  {module:<20} {subsystem:<28} {elapsed}")
+    lines.append("Fases del arranque:")
+    for phase, seconds in startup.phases.items():
+        lines.append(f"  {phase:<20} {seconds * 1000:8.1f} ms")
+    lines.append(f"  {'total':<20} {startup.total * 1000:8.1f} ms")
+    return "\n".join(lines)
+
+
+def main(import_seconds: float | None = None) -> None:
+    """Run Kay Listener; ``import_seconds`` comes from the ``python -m app`` entry
+    point.
+    """
+    from .config import load_config
+    from .utils import StartupTimer
+
+    startup = StartupTimer()
     parser = build_parser()
     args = parser.parse_args()
     config = load_config()
     if args.list_devices:
+        from .audio_stream import AudioStream
+
         for device in AudioStream.list_input_devices():
             print(device)
         return
-    app = KayListenerApp(config)
+    if args.profile_startup:
+        print(profile_startup(config, startup, import_seconds))
+        return
+    app = KayListenerApp(config, startup=startup)
+    if args.profile is not None:
+        seconds = None if args.profile < 0 else args.profile
+
+        def profile_when_ready() -> None:
+            # Se perfila la app en marcha, no la carga del modelo
+            app.ready.wait()
+            if not app._stop_event.is_set():
+                app.profile_cpu(seconds)
+
+        threading.Thread(
+            target=profile_when_ready, name="ProfileStarter", daemon=True
+        ).start()
     app.start()
 
 
@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import io
+import struct
+import time
+import wave
+from dataclasses import dataclass
+
+import numpy as np
+
+try:
+    from loguru import logger
+except ImportError:  # pragma: no cover - fallback for testing
+
+    class _DummyLogger:
+        def __getattr__(self, name):
+            def _noop(*args, **kwargs):
+                pass
+
+            return _noop
+
+    logger = _DummyLogger()  # type: ignore[assignment]
+
+WAVE_FORMAT_MULAW = 0x0007
+WAVE_FORMAT_IMA_ADPCM = 0x0011
+ADPCM_BLOCK_ALIGN = 256
+ADPCM_SAMPLES_PER_BLOCK = (ADPCM_BLOCK_ALIGN - 4) * 2 + 1
+_IMA_STEPS = np.array(
+    [
+        7,
+        8,
+        9,
+        10,
+        11,
+        12,
+        13,
+        14,
+        16,
+        17,
+        19,
+        21,
+        23,
+        25,
+        28,
+        31,
+        34,
+        37,
+        41,
+        45,
+        50,
+        55,
+        60,
+        66,
+        73,
+        80,
+        88,
+        97,
+        107,
+        118,
+        130,
+        143,
+        157,
+        173,
+        190,
+        209,
+        230,
+        253,
+        279,
+        307,
+        337,
+        371,
+        408,
+        449,
+        494,
+        544,
+        598,
+        658,
+        724,
+        796,
+        876,
+        963,
+        1060,
+        1166,
+        1282,
+        1411,
+        1552,
+        1707,
+        1878,
+        2066,
+        2272,
+        2499,
+        2749,
+        3024,
+        3327,
+        3660,
+        4026,
+        4428,
+        4871,
+        5358,
+        5894,
+        6484,
+        7132,
+        7845,
+        8630,
+        9493,
+        10442,
+        11487,
+        12635,
+        13899,
+        15289,
+        16818,
+        18500,
+        20350,
+        22385,
+        24623,
+        27086,
+        29794,
+        32767,
+    ],
+    dtype=np.int32,
+)
+_IMA_INDEX_SHIFT = np.array([-1, -1, -1, -1, 2, 4, 6, 8], dtype=np.int32)
+
+
+@dataclass
+class EncodeStats:
+    """Running totals used to report encode cost per second of audio."""
+
+    audio_seconds: float = 0.0
+    encode_seconds: float = 0.0
+    input_bytes: int = 0
+    output_bytes: int = 0
+
+    @property
+    def ms_per_audio_second(self) -> float:
+        if not self.audio_seconds:
+            return 0.0
+        return self.encode_seconds * 1000 / self.audio_seconds
+
+    @property
+    def compression_ratio(self) -> float:
+        if not self.output_bytes:
+            return 0.0
+        return self.input_bytes / self.output_bytes
+
+
+class Encoder:
+    """Turns 16-bit mono PCM into an upload-ready file."""
+
+    name = "wav"
+    content_type = "audio/wav"
+
+    def __init__(self, sample_rate: int) -> None:
+        self.sample_rate = sample_rate
+        self.stats = EncodeStats()
+
+    def encode(self, pcm_bytes: bytes | memoryview) -> bytes:
+        started = time.perf_counter()
+        data = self._encode(pcm_bytes)
+        self.stats.encode_seconds += time.perf_counter() - started
+        self.stats.audio_seconds += len(pcm_bytes) / 2 / self.sample_rate
+        self.stats.input_bytes += len(pcm_bytes)
+        self.stats.output_bytes += len(data)
+        return data
+
+    def _encode(self, pcm_bytes: bytes | memoryview) -> bytes:
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self.sample_rate)
+            wf.writeframes(pcm_bytes)
+        return buffer.getvalue()
+
+
+class MuLawEncoder(Encoder):
+    """G.711 mu-law (8 bits per sample) in a WAV container, vectorized with NumPy."""
+
+    name = "mulaw"
+
+    def _encode(self, pcm_bytes: bytes | memoryview) -> bytes:
+        samples = np.frombuffer(pcm_bytes, dtype="<i2")
+        data = linear_to_mulaw(samples).tobytes()
+        fmt = struct.pack(
+            "<HHIIHHH",
+            WAVE_FORMAT_MULAW,
+            1,
+            self.sample_rate,
+            self.sample_rate,
+            1,
+            8,
+            0,
+        )
+        return _wav_container(fmt, data, len(samples))
+
+
+class AdpcmEncoder(Encoder):
+    """IMA ADPCM (4 bits per sample) in a WAV container, vectorized with NumPy."""
+
+    name = "adpcm"
+
+    def _encode(self, pcm_bytes: bytes | memoryview) -> bytes:
+        samples = np.frombuffer(pcm_bytes, dtype="<i2", count=len(pcm_bytes) // 2)
+        fmt = struct.pack(
+            "<HHIIHHHH",
+            WAVE_FORMAT_IMA_ADPCM,
+            1,
+            self.sample_rate,
+            self.sample_rate * ADPCM_BLOCK_ALIGN // ADPCM_SAMPLES_PER_BLOCK,
+            ADPCM_BLOCK_ALIGN,
+            4,
+            2,
+            ADPCM_SAMPLES_PER_BLOCK,
+        )
+        return _wav_container(fmt, linear_to_ima_adpcm(samples).tobytes(), len(samples))
+
+
+class FlacEncoder(Encoder):
+    """Lossless FLAC through soundfile (libsndfile)."""
+
+    name = "flac"
+    content_type = "audio/flac"
+
+    def _encode(self, pcm_bytes: bytes | memoryview) -> bytes:
+        import soundfile as sf
+
+        buffer = io.BytesIO()
+        sf.write(
+            buffer,
+            np.frombuffer(pcm_bytes, dtype="<i2"),
+            self.sample_rate,
+            format="FLAC",
+            subtype="PCM_16",
+        )
+        return buffer.getvalue()
+
+
+ENCODERS: dict[str, type[Encoder]] = {
+    Encoder.name: Encoder,
+    MuLawEncoder.name: MuLawEncoder,
+    AdpcmEncoder.name: AdpcmEncoder,
+    FlacEncoder.name: FlacEncoder,
+}
+
+
+def get_encoder(name: str, sample_rate: int) -> Encoder:
+    """Build the encoder for ``name``; falls back to plain WAV when FLAC support is
+    missing.
+    """
+    key = (name or "wav").strip().lower()
+    if key not in ENCODERS:
+        raise ValueError(f"Códec desconocido: {name}")
+    if key == FlacEncoder.name:
+        try:
+            import soundfile  # noqa: F401
+        except Exception as exc:  # pragma: no cover - depends on libsndfile
+            logger.warning("FLAC no disponible (%s), usando WAV", exc)
+            key = Encoder.name
+    return ENCODERS[key](sample_rate)
+
+
+def linear_to_mulaw(samples: np.ndarray) -> np.ndarray:
+    """Vectorized G.711 mu-law compression of int16 samples (bit-exact with audioop)."""
+    values = samples.astype(np.int32) >> 2
+    negative = values < 0
+    magnitude = np.minimum(np.where(negative, -values, values), 8159) + 0x21
+    _, bit_length = np.frexp(magnitude)
+    segment = np.maximum(bit_length - 6, 0)
+    ulaw = (segment << 4) | ((magnitude >> (segment + 1)) & 0x0F)
+    ulaw = np.where(segment > 7, 0x7F, ulaw)  # saturación en el extremo del rango
+    return (ulaw ^ np.where(negative, 0x7F, 0xFF)).astype(np.uint8)
+
+
+def linear_to_ima_adpcm(
+    samples: np.ndarray, index: np.ndarray | None = None
+) -> np.ndarray:
+    """IMA ADPCM blocks of int16 samples, laid out as in a WAV file (one row per block).
+
+    The step size of each sample depends on the previous one, but every block starts
+    from its own header. The loop walks the positions of a block and encodes that
+    position in all blocks at once, so it takes ``ADPCM_SAMPLES_PER_BLOCK`` NumPy steps
+    whatever the length of the recording. ``index`` sets the initial step index of each
+    block; by default it is estimated from the block's first samples.
+    """
+    count = max(1, -(-len(samples) // ADPCM_SAMPLES_PER_BLOCK))
+    # Solo el último bloque se rellena con ceros; el
+    # chunk fact guarda el número real de muestras
+    grid = np.zeros((count, ADPCM_SAMPLES_PER_BLOCK), dtype=np.int32)
+    grid.reshape(-1)[: len(samples)] = samples
+    if index is None:
+        # Paso inicial del tamaño de las primeras
+        # diferencias: así el bloque no arranca desadaptado
+        first_steps = np.abs(np.diff(grid[:, :9], axis=1)).mean(axis=1)
+        index = np.minimum(np.searchsorted(_IMA_STEPS, first_steps), 88)
+    index = np.asarray(index, dtype=np.int32).copy()
+    blocks = np.empty((count, ADPCM_BLOCK_ALIGN), dtype=np.uint8)
+    blocks[:, :2] = grid[:, 0].astype("<i2").view(np.uint8).reshape(count, 2)
+    blocks[:, 2] = index
+    blocks[:, 3] = 0
+    predicted = grid[:, 0].copy()
+    codes = np.empty((count, ADPCM_SAMPLES_PER_BLOCK - 1), dtype=np.uint8)
+    for position in range(1, ADPCM_SAMPLES_PER_BLOCK):
+        step = _IMA_STEPS[index]
+        diff = grid[:, position] - predicted
+        code = np.where(diff < 0, 8, 0)
+        diff = np.abs(diff)
+        delta = step >> 3
+        for bit, shift in ((4, 0), (2, 1), (1, 2)):
+            part = step >> shift
+            hit = diff >= part
+            code |= bit * hit
+            diff -= part * hit
+            delta += part * hit
+        predicted = np.clip(
+            np.where(code & 8, predicted - delta, predicted + delta), -32768, 32767
+        )
+        index = np.clip(index + _IMA_INDEX_SHIFT[code & 7], 0, 88)
+        codes[:, position - 1] = code
+    # El primer nibble de cada byte va en la parte baja
+    blocks[:, 4:] = codes[:, 0::2] | (codes[:, 1::2] << 4)
+    return blocks
+
+
+def _wav_container(fmt: bytes, data: bytes, sample_count: int) -> bytes:
+    """RIFF/WAVE file with a non-PCM ``fmt`` chunk and the ``fact`` chunk it needs."""
+    chunks = [
+        b"fmt " + struct.pack("<I", len(fmt)) + fmt,
+        b"fact" + struct.pack("<II", 4, sample_count),
+        b"data" + struct.pack("<I", len(data)) + data,
+    ]
+    if len(data) % 2:
+        chunks.append(b"\x00")
+    body = b"WAVE" + b"".join(chunks)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+__all__ = [
+    "AdpcmEncoder",
+    "ENCODERS",
+    "EncodeStats",
+    "Encoder",
+    "FlacEncoder",
+    "MuLawEncoder",
+    "get_encoder",
+    "linear_to_ima_adpcm",
+    "linear_to_mulaw",
+]
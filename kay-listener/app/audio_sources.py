@@ -0,0 +1,530 @@
+from __future__ import annotations
+
+import collections
+import struct
+import threading
+import time
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterator, Optional, Sequence
+
+import numpy as np
+
+try:
+    from loguru import logger
+except ImportError:  # pragma: no cover - fallback for testing
+
+    class _DummyLogger:
+        def __getattr__(self, name):
+            def _noop(*args, **kwargs):
+                pass
+
+            return _noop
+
+    logger = _DummyLogger()  # type: ignore[assignment]
+
+from .resample import PolyphaseResampler
+
+if TYPE_CHECKING:
+    from .config import AppConfig
+
+# Same signature as the sounddevice callback: (indata, frames, time_info, status)
+SourceCallback = Callable[[np.ndarray, int, object, object], None]
+
+CAPTURE_MAGIC = b"KCAP"
+CAPTURE_VERSION = 1
+_CAPTURE_HEADER = struct.Struct("<4sHII")
+_CAPTURE_RECORD = struct.Struct("<dI")
+RAW_SUFFIXES = {".raw", ".pcm"}
+CAPTURE_SUFFIX = ".kcap"
+
+
+class AudioSource:
+    """Something that delivers int16 mono frames to an AudioStream callback."""
+
+    def __init__(self, sample_rate: int, frame_samples: int) -> None:
+        self.sample_rate = sample_rate
+        self.frame_samples = frame_samples
+
+    def start(self, callback: SourceCallback) -> None:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        raise NotImplementedError
+
+
+class DeviceSource(AudioSource):
+    """Live capture through PortAudio (sounddevice)."""
+
+    def __init__(
+        self, sample_rate: int, frame_samples: int, device: Optional[int] = None
+    ) -> None:
+        super().__init__(sample_rate, frame_samples)
+        self.device = device
+        self._stream = None
+
+    @staticmethod
+    def native_rate(device: Optional[int] = None) -> Optional[int]:
+        """Default sample rate the host API reports for the input device, or None if
+        unknown.
+        """
+        try:
+            import sounddevice as sd
+
+            return int(sd.query_devices(device, "input")["default_samplerate"])
+        except Exception as exc:
+            logger.warning(
+                "No se pudo consultar la frecuencia nativa del dispositivo %s: %s",
+                device,
+                exc,
+            )
+            return None
+
+    def start(self, callback: SourceCallback) -> None:
+        import sounddevice as sd
+
+        stream = sd.InputStream(
+            samplerate=self.sample_rate,
+            blocksize=self.frame_samples,
+            channels=1,
+            dtype="int16",
+            callback=callback,
+            device=self.device,
+        )
+        stream.start()
+        self._stream = stream
+
+    def stop(self) -> None:
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class ResamplingSource(AudioSource):
+    """Runs ``inner`` at its own rate and delivers ``frame_samples`` frames at
+    ``sample_rate``.
+
+    Lets the device capture at its native rate, so neither the driver nor the host
+    API resamples; a PolyphaseResampler converts each block inside the callback and
+    the output is cut back into fixed frames for the ring. Both steps reuse
+    preallocated buffers.
+    """
+
+    def __init__(
+        self, inner: AudioSource, sample_rate: int, frame_samples: int
+    ) -> None:
+        super().__init__(sample_rate, frame_samples)
+        self.inner = inner
+        self.resampler = PolyphaseResampler(inner.sample_rate, sample_rate)
+        self._pending = np.zeros(
+            frame_samples + self.resampler.max_output(inner.frame_samples),
+            dtype=np.int16,
+        )
+        self._filled = 0
+
+    def start(self, callback: SourceCallback) -> None:
+        self.resampler.reset()
+        self._filled = 0
+
+        def convert(indata, frames, time_info, status) -> None:
+            needed = self._filled + self.resampler.max_output(frames)
+            if needed > len(self._pending):
+                # Solo si el driver entrega un bloque mayor que el previsto
+                grown = np.zeros(needed, dtype=np.int16)
+                grown[: self._filled] = self._pending[: self._filled]
+                self._pending = grown
+            # El remuestreador escribe tras lo pendiente: el callback no asigna memoria
+            self._filled += len(
+                self.resampler.process(indata, out=self._pending[self._filled :])
+            )
+            delivered = 0
+            while self._filled - delivered >= self.frame_samples:
+                frame = self._pending[delivered : delivered + self.frame_samples]
+                # El estado del driver se notifica una sola vez por bloque capturado
+                callback(
+                    frame.reshape(-1, 1),
+                    self.frame_samples,
+                    time_info,
+                    status if delivered == 0 else None,
+                )
+                delivered += self.frame_samples
+            if delivered:
+                self._filled -= delivered
+                self._pending[: self._filled] = self._pending[
+                    delivered : delivered + self._filled
+                ]
+
+        self.inner.start(convert)
+
+    def stop(self) -> None:
+        self.inner.stop()
+
+
+class _ThreadedSource(AudioSource):
+    """Plays frames from a generator on a background thread with its own clock.
+
+    ``speed`` scales the clock: 1.0 is real time, 4.0 four times faster and 0 as
+    fast as the consumer callback allows.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        frame_samples: int,
+        speed: float = 1.0,
+        loop: bool = False,
+    ) -> None:
+        super().__init__(sample_rate, frame_samples)
+        self.speed = speed
+        self.loop = loop
+        self.frames_delivered = 0
+        self.finished = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _timed_frames(self) -> Iterator[tuple[float, np.ndarray]]:
+        """Yield ``(offset_seconds, frame)``; frames are (frame_samples, 1) int16."""
+        raise NotImplementedError
+
+    def start(self, callback: SourceCallback) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self.finished.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(callback,), name=type(self).__name__, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self.finished.wait(timeout)
+
+    def _run(self, callback: SourceCallback) -> None:
+        try:
+            while not self._stop_event.is_set():
+                self._play_once(callback)
+                if not self.loop:
+                    break
+        except Exception as exc:
+            logger.exception(
+                "Error en la fuente de audio %s: %s", type(self).__name__, exc
+            )
+        finally:
+            self.finished.set()
+
+    def _play_once(self, callback: SourceCallback) -> None:
+        started = time.monotonic()
+        for offset, frame in self._timed_frames():
+            if self._stop_event.is_set():
+                return
+            if self.speed > 0:
+                delay = started + offset / self.speed - time.monotonic()
+                if delay > 0 and self._stop_event.wait(delay):
+                    return
+            callback(frame, self.frame_samples, None, None)
+            self.frames_delivered += 1
+
+    def _frame_samples(
+        self, samples: np.ndarray, start_offset: float = 0.0
+    ) -> Iterator[tuple[float, np.ndarray]]:
+        frame_duration = self.frame_samples / self.sample_rate
+        total = len(samples)
+        for index, start in enumerate(range(0, total, self.frame_samples)):
+            frame = samples[start : start + self.frame_samples]
+            if len(frame) < self.frame_samples:
+                frame = np.pad(frame, (0, self.frame_samples - len(frame)))
+            yield start_offset + index * frame_duration, frame.reshape(-1, 1)
+
+
+class FileSource(_ThreadedSource):
+    """Replays a WAV, raw PCM (``.raw``/``.pcm``) or capture (``.kcap``) file."""
+
+    def __init__(
+        self,
+        path: Path,
+        sample_rate: int,
+        frame_samples: int,
+        speed: float = 1.0,
+        loop: bool = False,
+    ) -> None:
+        super().__init__(sample_rate, frame_samples, speed=speed, loop=loop)
+        self.path = Path(path)
+        if self.path.suffix.lower() != CAPTURE_SUFFIX:
+            self._samples = read_pcm_file(self.path, sample_rate)
+
+    def _timed_frames(self) -> Iterator[tuple[float, np.ndarray]]:
+        if self.path.suffix.lower() == CAPTURE_SUFFIX:
+            # Capturas: se respeta el reloj original, incluidos huecos y jitter
+            for offset, frame in read_capture(self.path, self.sample_rate):
+                for _, chunk in self._frame_samples(frame):
+                    yield offset, chunk
+            return
+        yield from self._frame_samples(self._samples)
+
+
+@dataclass
+class Segment:
+    """One step of a synthetic script."""
+
+    kind: str
+    seconds: float = 1.0
+    frequency: float = 440.0
+    amplitude: float = 0.3
+    path: Optional[Path] = None
+
+
+def tone(seconds: float, frequency: float = 440.0, amplitude: float = 0.3) -> Segment:
+    return Segment("tone", seconds=seconds, frequency=frequency, amplitude=amplitude)
+
+
+def noise(seconds: float, amplitude: float = 0.05) -> Segment:
+    return Segment("noise", seconds=seconds, amplitude=amplitude)
+
+
+def silence(seconds: float) -> Segment:
+    return Segment("silence", seconds=seconds, amplitude=0.0)
+
+
+def clip(path: Path) -> Segment:
+    return Segment("clip", path=Path(path))
+
+
+class SyntheticSource(_ThreadedSource):
+    """Generates tones, noise, silence and pre-recorded clips from a script."""
+
+    def __init__(
+        self,
+        script: Sequence[Segment],
+        sample_rate: int,
+        frame_samples: int,
+        speed: float = 1.0,
+        loop: bool = False,
+        seed: int = 0,
+    ) -> None:
+        super().__init__(sample_rate, frame_samples, speed=speed, loop=loop)
+        self.script = list(script)
+        self.seed = seed
+
+    def render(self) -> np.ndarray:
+        rng = np.random.default_rng(self.seed)
+        parts = [self._render_segment(segment, rng) for segment in self.script]
+        if not parts:
+            return np.zeros(0, dtype=np.int16)
+        return np.concatenate(parts)
+
+    def _render_segment(self, segment: Segment, rng: np.random.Generator) -> np.ndarray:
+        if segment.kind == "clip":
+            if segment.path is None:
+                raise ValueError("Segmento 'clip' sin ruta")
+            return read_pcm_file(segment.path, self.sample_rate)
+        count = int(round(segment.seconds * self.sample_rate))
+        if segment.kind == "silence":
+            return np.zeros(count, dtype=np.int16)
+        if segment.kind == "tone":
+            t = np.arange(count, dtype=np.float64) / self.sample_rate
+            wave_data = np.sin(2 * np.pi * segment.frequency * t)
+        elif segment.kind == "noise":
+            wave_data = rng.uniform(-1.0, 1.0, count)
+        else:
+            raise ValueError(f"Tipo de segmento desconocido: {segment.kind}")
+        return (wave_data * segment.amplitude * 32767).astype(np.int16)
+
+    def _timed_frames(self) -> Iterator[tuple[float, np.ndarray]]:
+        yield from self._frame_samples(self.render())
+
+
+class CaptureSource(AudioSource):
+    """Wraps another source and saves every frame plus its arrival time to a ``.kcap``
+    file.
+
+    The realtime callback only copies the frame into a deque; a writer thread does the
+    I/O.
+    """
+
+    def __init__(
+        self, inner: AudioSource, path: Path, flush_interval: float = 0.2
+    ) -> None:
+        super().__init__(inner.sample_rate, inner.frame_samples)
+        self.inner = inner
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.frames_written = 0
+        self._pending: collections.deque[tuple[float, np.ndarray]] = collections.deque()
+        self._stop_event = threading.Event()
+        self._writer: threading.Thread | None = None
+        self._started_at = 0.0
+
+    def start(self, callback: SourceCallback) -> None:
+        self._stop_event.clear()
+        self._started_at = time.monotonic()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = threading.Thread(
+            target=self._write_loop, name="CaptureWriter", daemon=True
+        )
+        self._writer.start()
+
+        def tap(indata, frames, time_info, status) -> None:
+            self._pending.append((time.monotonic() - self._started_at, indata.copy()))
+            callback(indata, frames, time_info, status)
+
+        self.inner.start(tap)
+        logger.info("Capturando audio en %s", self.path)
+
+    def stop(self) -> None:
+        self.inner.stop()
+        self._stop_event.set()
+        if self._writer:
+            self._writer.join(timeout=5)
+            self._writer = None
+
+    def wait(self, timeout: float | None = None) -> bool:
+        waiter = getattr(self.inner, "wait", None)
+        return waiter(timeout) if waiter else False
+
+    def _write_loop(self) -> None:
+        with open(self.path, "wb") as fh:
+            fh.write(
+                _CAPTURE_HEADER.pack(
+                    CAPTURE_MAGIC, CAPTURE_VERSION, self.sample_rate, self.frame_samples
+                )
+            )
+            while True:
+                stopping = self._stop_event.wait(self.flush_interval)
+                while self._pending:
+                    offset, frame = self._pending.popleft()
+                    samples = np.ascontiguousarray(frame, dtype="<i2").reshape(-1)
+                    fh.write(_CAPTURE_RECORD.pack(offset, len(samples)))
+                    fh.write(samples.tobytes())
+                    self.frames_written += 1
+                fh.flush()
+                if stopping:
+                    return
+
+
+def read_pcm_file(path: Path, sample_rate: int) -> np.ndarray:
+    """Load a 16-bit WAV or headerless PCM file as a mono int16 array."""
+    path = Path(path)
+    if path.suffix.lower() in RAW_SUFFIXES:
+        return np.fromfile(path, dtype="<i2").astype(np.int16)
+    with wave.open(str(path), "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: solo se admite PCM de 16 bits")
+        if wf.getframerate() != sample_rate:
+            raise ValueError(
+                f"{path}: frecuencia {wf.getframerate()} Hz "
+                f"distinta de {sample_rate} Hz"
+            )
+        channels = wf.getnchannels()
+        data = np.frombuffer(wf.readframes(wf.getnframes()), dtype="<i2")
+    if channels > 1:
+        data = data.reshape(-1, channels).mean(axis=1)
+    return data.astype(np.int16)
+
+
+def read_capture(
+    path: Path, sample_rate: int | None = None
+) -> Iterator[tuple[float, np.ndarray]]:
+    """Iterate over ``(offset_seconds, samples)`` records of a ``.kcap`` capture."""
+    with open(path, "rb") as fh:
+        header = fh.read(_CAPTURE_HEADER.size)
+        magic, version, rate, _frame_samples = _CAPTURE_HEADER.unpack(header)
+        if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+            raise ValueError(f"{path}: no es una captura de Kay Listener")
+        if sample_rate is not None and rate != sample_rate:
+            raise ValueError(
+                f"{path}: frecuencia {rate} Hz distinta de {sample_rate} Hz"
+            )
+        while True:
+            record = fh.read(_CAPTURE_RECORD.size)
+            if len(record) < _CAPTURE_RECORD.size:
+                return
+            offset, count = _CAPTURE_RECORD.unpack(record)
+            samples = np.frombuffer(fh.read(count * 2), dtype="<i2").astype(np.int16)
+            yield offset, samples
+
+
+def _device_source(config: AppConfig, frame_samples: int) -> AudioSource:
+    from .config import NATIVE_SAMPLE_RATE
+
+    capture_rate = config.capture_sample_rate
+    if capture_rate == NATIVE_SAMPLE_RATE:
+        capture_rate = DeviceSource.native_rate(config.input_device_index)
+    if not capture_rate or capture_rate == config.sample_rate:
+        return DeviceSource(
+            config.sample_rate, frame_samples, device=config.input_device_index
+        )
+    capture_frames = int(capture_rate * config.frame_duration_seconds)
+    logger.info(
+        "Captura a %s Hz, remuestreada a %s Hz para VAD y Vosk",
+        capture_rate,
+        config.sample_rate,
+    )
+    device = DeviceSource(
+        capture_rate, capture_frames, device=config.input_device_index
+    )
+    return ResamplingSource(device, config.sample_rate, frame_samples)
+
+
+def build_source(config: AppConfig, frame_samples: int) -> AudioSource:
+    """Create the source described by ``config.audio_source``.
+
+    Accepted values: ``device``, ``file:<path>`` and ``synthetic:<silence|noise|tone>``.
+    A device captured at ``config.capture_sample_rate`` is wrapped in a
+    ResamplingSource. When ``config.audio_capture_path`` is set the source is wrapped in
+    a CaptureSource.
+    """
+    spec = (config.audio_source or "device").strip()
+    kind, _, argument = spec.partition(":")
+    kind = kind.lower()
+    source: AudioSource
+    if kind == "device":
+        source = _device_source(config, frame_samples)
+    elif kind == "file":
+        source = FileSource(
+            Path(argument),
+            config.sample_rate,
+            frame_samples,
+            speed=config.audio_source_speed,
+        )
+    elif kind == "synthetic":
+        generators = {"silence": silence(1.0), "noise": noise(1.0), "tone": tone(1.0)}
+        if argument not in generators:
+            raise ValueError(f"Fuente sintética desconocida: {argument}")
+        source = SyntheticSource(
+            [generators[argument]],
+            config.sample_rate,
+            frame_samples,
+            speed=config.audio_source_speed,
+            loop=True,
+        )
+    else:
+        raise ValueError(f"AUDIO_SOURCE no válido: {spec}")
+    if config.audio_capture_path:
+        source = CaptureSource(source, Path(config.audio_capture_path))
+    return source
+
+
+__all__ = [
+    "AudioSource",
+    "CaptureSource",
+    "DeviceSource",
+    "FileSource",
+    "ResamplingSource",
+    "Segment",
+    "SyntheticSource",
+    "build_source",
+    "clip",
+    "noise",
+    "read_capture",
+    "read_pcm_file",
+    "silence",
+    "tone",
+]
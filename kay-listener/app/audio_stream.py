@@ -1,41 +1,111 @@
 from __future__ import annotations
 
-import queue
+import collections
 import threading
 from typing import Optional
 
-import sounddevice as sd
-from loguru import logger
+try:
+    from loguru import logger
+except ImportError:  # pragma: no cover - fallback for testing
 
+    class _DummyLogger:
+        def __getattr__(self, name):
+            def _noop(*args, **kwargs):
+                pass
+
+            return _noop
+
+    logger = _DummyLogger()  # type: ignore[assignment]
+
+from .audio_sources import AudioSource, build_source
 from .config import AppConfig
+from .metrics import metrics
+from .ring_buffer import EventRing, FrameRing, RingReader
+from .utils import RepeatedTimer
+
+# Eventos que el callback deja en el EventRing
+STATUS_EVENT = 1
+
+# Bits de PaStreamCallbackFlags, en el orden de sounddevice.CallbackFlags
+CALLBACK_FLAGS = (
+    "input_underflow",
+    "input_overflow",
+    "output_underflow",
+    "output_overflow",
+    "priming_output",
+)
+
+
+def status_bits(status) -> int:
+    """PortAudio flag bits of a callback ``status``; unknown truthy ones map to 0."""
+    bits = 0
+    for position, name in enumerate(CALLBACK_FLAGS):
+        if getattr(status, name, False):
+            bits |= 1 << position
+    return bits
+
+
+def describe_status(bits: int) -> str:
+    names = [
+        name for position, name in enumerate(CALLBACK_FLAGS) if bits & (1 << position)
+    ]
+    return ", ".join(names) or "desconocido"
 
 
 class AudioStream:
     """Real-time audio capture with subscription support."""
 
-    def __init__(self, config: AppConfig) -> None:
+    # Cada cuánto se vuelcan al log los eventos del callback
+    event_log_interval = 0.5
+
+    def __init__(
+        self,
+        config: AppConfig,
+        source: Optional[AudioSource] = None,
+        device_id: str = "default",
+    ) -> None:
         self.config = config
+        self.device_id = device_id
         self.frame_samples = int(config.sample_rate * config.frame_duration_seconds)
-        self.subscribers: list[queue.Queue[bytes]] = []
+        self.preroll_frames = int(
+            config.preroll_seconds / config.frame_duration_seconds
+        )
+        # El buffer cubre la ventana de pre-roll con un segundo de margen y el audio que
+        # llega mientras el modelo se carga, que se decodifica en cuanto está listo
+        ring_seconds = max(
+            config.ring_buffer_seconds,
+            config.preroll_seconds + 1.0,
+            config.startup_buffer_seconds,
+        )
+        capacity = max(2, int(ring_seconds / config.frame_duration_seconds))
+        self.ring = FrameRing(capacity, self.frame_samples)
+        self.subscribers: list[RingReader] = []
         self._lock = threading.Lock()
-        self._stream: Optional[sd.InputStream] = None
+        self.source = source or build_source(config, self.frame_samples)
+        # El callback no registra nada por sí mismo: anota eventos y este temporizador
+        # los pasa a loguru
+        self.events = EventRing()
+        self._event_log = RepeatedTimer(
+            self.event_log_interval, self.log_events, name="AudioEventLog"
+        )
+        # (ident, native_id) del hilo de PortAudio, que
+        # threading no conoce; lo usa el perfil de CPU
+        self.callback_thread: Optional[tuple[int, int]] = None
         self._running = False
 
     def start(self) -> None:
         if self._running:
             return
-        logger.info("Iniciando captura de audio (%s Hz)", self.config.sample_rate)
+        logger.info(
+            "Iniciando captura de audio (%s Hz, %s, dispositivo %s)",
+            self.config.sample_rate,
+            type(self.source).__name__,
+            self.device_id,
+        )
         try:
-            self._stream = sd.InputStream(
-                samplerate=self.config.sample_rate,
-                blocksize=self.frame_samples,
-                channels=1,
-                dtype="int16",
-                callback=self._callback,
-                device=self.config.input_device_index,
-            )
-            self._stream.start()
+            self.source.start(self._callback)
             self._running = True
+            self._event_log.start()
         except Exception as exc:
             logger.exception("No se pudo iniciar el stream de audio: %s", exc)
             raise
@@ -44,40 +114,88 @@ class AudioStream:
         if not self._running:
             return
         logger.info("Deteniendo captura de audio")
-        if self._stream is not None:
-            self._stream.stop()
-            self._stream.close()
+        self.source.stop()
+        self._event_log.stop()
+        self.log_events()
         with self._lock:
             self.subscribers.clear()
         self._running = False
 
-    def subscribe(self, maxsize: int = 50) -> queue.Queue[bytes]:
-        q: queue.Queue[bytes] = queue.Queue(maxsize=maxsize)
+    @property
+    def frame_index(self) -> int:
+        """Index of the next frame the callback will write."""
+        return self.ring.write_index
+
+    def subscribe(self, start_index: int | None = None, name: str = "") -> RingReader:
+        """Attach a reader at ``start_index`` (default: now).
+
+        Past indexes are honoured while the ring still holds them: always the pre-roll
+        window, and up to ``startup_buffer_seconds`` when a wake word is found in audio
+        buffered during startup. ``name`` labels the reader's dropped-frame metric.
+        """
+        reader = self.ring.reader(
+            start_index,
+            poll_interval=self.config.frame_duration_seconds,
+            name=name,
+            device=self.device_id,
+        )
+        with self._lock:
+            self.subscribers.append(reader)
+        return reader
+
+    def unsubscribe(self, reader: RingReader) -> None:
+        reader.close()
         with self._lock:
-            self.subscribers.append(q)
-        return q
+            if reader in self.subscribers:
+                self.subscribers.remove(reader)
 
-    def unsubscribe(self, q: queue.Queue[bytes]) -> None:
+    def total_overruns(self) -> int:
         with self._lock:
-            if q in self.subscribers:
-                self.subscribers.remove(q)
+            return sum(reader.overruns for reader in self.subscribers)
+
+    def log_events(self) -> int:
+        """Move the events recorded by the callback to loguru and the metrics; returns
+        how many.
+        """
+        events, dropped = self.events.drain()
+        if dropped:
+            metrics.counter(
+                "audio_events_dropped_total",
+                "Callback events discarded because the event ring was full",
+                device=self.device_id,
+            ).inc(dropped)
+            logger.warning(
+                "%s eventos del callback de audio descartados "
+                "(buffer de eventos lleno)",
+                dropped,
+            )
+        statuses = collections.Counter(
+            value for _, code, value in events if code == STATUS_EVENT
+        )
+        for bits, count in statuses.items():
+            metrics.counter(
+                "audio_callback_status_total",
+                "Capture callbacks reporting over/underflow",
+                device=self.device_id,
+            ).inc(count)
+            logger.warning(
+                "Audio callback status: %s (%s veces)", describe_status(bits), count
+            )
+        return len(events)
 
     def _callback(self, indata, frames, time_info, status) -> None:  # pragma: no cover - realtime callback
+        if self.callback_thread is None:
+            self.callback_thread = (threading.get_ident(), threading.get_native_id())
         if status:
-            logger.warning("Audio callback status: %s", status)
-        frame = indata.tobytes()
-        with self._lock:
-            subscribers = list(self.subscribers)
-        for q in subscribers:
-            try:
-                q.put_nowait(frame)
-            except queue.Full:
-                logger.debug("Descartando frame: cola llena")
+            self.events.record(STATUS_EVENT, status_bits(status))
+        self.ring.write(indata)
 
     @staticmethod
     def list_input_devices() -> list[str]:
+        import sounddevice as sd
+
         devices = sd.query_devices()
         return [f"{idx}: {device['name']}" for idx, device in enumerate(devices)]
 
 
-__all__ = ["AudioStream"]
+__all__ = ["AudioStream", "describe_status", "status_bits"]
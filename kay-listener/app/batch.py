@@ -0,0 +1,494 @@
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import glob
+import os
+import shutil
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+try:
+    from loguru import logger
+except ImportError:  # pragma: no cover - fallback for testing
+
+    class _DummyLogger:
+        def __getattr__(self, name):
+            def _noop(*args, **kwargs):
+                pass
+
+            return _noop
+
+    logger = _DummyLogger()  # type: ignore[assignment]
+
+from .audio_sources import RAW_SUFFIXES, AudioSource, SourceCallback, read_pcm_file
+from .audio_stream import AudioStream
+from .config import AppConfig
+from .pcm_buffer import PcmBuffer
+from .recorder import SilenceDetector, create_vad
+from .uploader import UploadMeta
+from .utils import save_json, timestamp_iso
+from .wake_detector import WakeDetector, shared_model
+
+AUDIO_SUFFIXES = {".wav"} | RAW_SUFFIXES
+READ_BLOCK_FRAMES = 500  # 10 s por lectura con frames de 20 ms
+
+
+@dataclass
+class Utterance:
+    """One recording cut from an archive: wake word, then speech until silence.
+
+    ``timestamp_iso`` takes the archive's modification time as the moment its
+    recording started, plus the offset of the utterance.
+    """
+
+    source: str
+    index: int
+    wake_seconds: float
+    start_seconds: float
+    duration_ms: int
+    clip: str
+    codec: str
+    content_type: str
+    timestamp_iso: str
+    uploaded: Optional[bool] = None
+
+    def upload_meta(self, wake_word: str) -> UploadMeta:
+        return UploadMeta(
+            duration_ms=self.duration_ms,
+            wake_word=wake_word,
+            timestamp_iso=self.timestamp_iso,
+            codec=self.codec,
+            content_type=self.content_type,
+            device_id=f"batch:{Path(self.source).name}",
+        )
+
+
+class ArchiveSource(AudioSource):
+    """Source fed one frame at a time by the caller instead of a clock or device."""
+
+    def __init__(self, sample_rate: int, frame_samples: int) -> None:
+        super().__init__(sample_rate, frame_samples)
+        self._callback: Optional[SourceCallback] = None
+
+    def start(self, callback: SourceCallback) -> None:
+        self._callback = callback
+
+    def stop(self) -> None:
+        self._callback = None
+
+    def push(self, frame: np.ndarray) -> None:
+        assert self._callback is not None
+        self._callback(frame.reshape(-1, 1), len(frame), None, None)
+
+
+def iter_frames(
+    path: Path, sample_rate: int, frame_samples: int
+) -> Iterator[np.ndarray]:
+    """Yield int16 frames of ``frame_samples``, reading WAV files in blocks; the last
+    one is zero-padded.
+    """
+    path = Path(path)
+    if path.suffix.lower() in RAW_SUFFIXES:
+        blocks: Iterable[np.ndarray] = [read_pcm_file(path, sample_rate)]
+    else:
+        blocks = _wav_blocks(path, sample_rate, frame_samples * READ_BLOCK_FRAMES)
+    carry = np.zeros(0, dtype=np.int16)
+    for block in blocks:
+        samples = np.concatenate([carry, block]) if len(carry) else block
+        usable = len(samples) - len(samples) % frame_samples
+        for start in range(0, usable, frame_samples):
+            yield samples[start : start + frame_samples]
+        carry = samples[usable:]
+    if len(carry):
+        yield np.concatenate(
+            [carry, np.zeros(frame_samples - len(carry), dtype=np.int16)]
+        )
+
+
+def _wav_blocks(
+    path: Path, sample_rate: int, block_samples: int
+) -> Iterator[np.ndarray]:
+    with wave.open(str(path), "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: solo se admite PCM de 16 bits")
+        if wf.getframerate() != sample_rate:
+            raise ValueError(
+                f"{path}: frecuencia {wf.getframerate()} Hz "
+                f"distinta de {sample_rate} Hz"
+            )
+        channels = wf.getnchannels()
+        while True:
+            data = np.frombuffer(wf.readframes(block_samples), dtype="<i2")
+            if not len(data):
+                return
+            if channels > 1:
+                data = data.reshape(-1, channels).mean(axis=1).astype(np.int16)
+            yield data
+
+
+def segment_file(
+    path: Path, config: AppConfig, output_dir: Path, model_path: Optional[Path] = None
+) -> dict:
+    """Run wake word detection and silence endpointing over one archive, writing a clip
+    per utterance.
+
+    The wake word goes through the real ``WakeDetector`` (gate, batching, text
+    normalization) and recordings end like ``Recorder`` ends them, on
+    ``silence_seconds`` of VAD silence or ``max_recording_seconds``.
+    """
+    path = Path(path)
+    started = time.perf_counter()
+    frame_samples = int(config.sample_rate * config.frame_duration_seconds)
+    frame_seconds = config.frame_duration_seconds
+    # Sin pre-roll ni buffer de arranque: el detector consume cada frame al escribirse
+    config = dataclasses.replace(
+        config, ring_buffer_seconds=1.0, preroll_seconds=0.0, startup_buffer_seconds=0.0
+    )
+    source = ArchiveSource(config.sample_rate, frame_samples)
+    stream = AudioStream(config, source=source, device_id=f"batch:{path.name}")
+    wakes: list[int] = []
+    detector = WakeDetector(
+        config=config, audio_stream=stream, on_wake=wakes.append, model_path=model_path
+    )
+    detector.load()
+    from .audio_codecs import get_encoder
+
+    encoder = get_encoder(config.audio_codec, config.sample_rate)
+    vad = create_vad(config.vad_aggressiveness)
+    max_frames = int(config.max_recording_seconds / frame_seconds)
+    utterances: list[Utterance] = []
+    recording: Optional[PcmBuffer] = None
+    silence_detector: Optional[SilenceDetector] = None
+    wake_frame = start_frame = total_frames = voiced_frames = 0
+    frame_count = 0
+
+    def finish() -> None:
+        nonlocal recording
+        assert recording is not None
+        if voiced_frames:
+            utterances.append(
+                _write_clip(
+                    path,
+                    output_dir,
+                    recording,
+                    encoder,
+                    config,
+                    len(utterances),
+                    wake_frame,
+                    start_frame,
+                    total_frames,
+                )
+            )
+        recording.discard()
+        recording = None
+        detector.resume()
+        detector.reset()
+
+    def record(frame) -> None:
+        nonlocal total_frames, voiced_frames
+        assert recording is not None and silence_detector is not None
+        recording.extend(frame)
+        total_frames += 1
+        try:
+            is_voice = vad.is_speech(bytes(frame), config.sample_rate)
+        except Exception as exc:
+            logger.warning("Error en VAD: %s", exc)
+            is_voice = False
+        voiced_frames += int(is_voice)
+        if (silence_detector.mark(is_voice) and voiced_frames) or (
+            max_frames and total_frames >= max_frames
+        ):
+            finish()
+
+    stream.start()
+    try:
+        for position, frame in enumerate(
+            iter_frames(path, config.sample_rate, frame_samples)
+        ):
+            frame_count = position + 1
+            source.push(frame)
+            queued = detector.next_frame()
+            if queued is None:
+                continue
+            if recording is not None:
+                record(queued)
+                continue
+            if detector.feed(queued):
+                recording = PcmBuffer(
+                    config.sample_rate,
+                    int(config.recording_spill_mb * 1024 * 1024),
+                    directory=output_dir,
+                )
+                silence_detector = SilenceDetector(
+                    config.silence_seconds, frame_seconds
+                )
+                # La orden empieza donde terminó la wake word, quizá antes de este frame
+                start_frame = max(wakes[-1], stream.ring.oldest_index())
+                wake_frame, total_frames, voiced_frames = position, 0, 0
+                for index in range(start_frame, position + 1):
+                    if recording is not None:
+                        record(stream.ring.view(index))
+        if recording is not None:
+            # El archivo terminó a mitad de una grabación: se guarda lo que haya
+            finish()
+    finally:
+        if recording is not None:
+            recording.discard()
+        detector.stop()
+        stream.stop()
+    audio_seconds = frame_count * frame_seconds
+    elapsed = time.perf_counter() - started
+    return {
+        "file": str(path),
+        "audio_seconds": round(audio_seconds, 3),
+        "wall_seconds": round(elapsed, 3),
+        "realtime_factor": round(audio_seconds / elapsed, 2) if elapsed else 0.0,
+        "wake_words": len(wakes),
+        "utterances": [dataclasses.asdict(item) for item in utterances],
+    }
+
+
+def _write_clip(
+    source: Path,
+    output_dir: Path,
+    recording: PcmBuffer,
+    encoder,
+    config: AppConfig,
+    index: int,
+    wake_frame: int,
+    start_frame: int,
+    total_frames: int,
+) -> Utterance:
+    frame_seconds = config.frame_duration_seconds
+    utterance = Utterance(
+        source=str(source),
+        index=index,
+        wake_seconds=round(wake_frame * frame_seconds, 3),
+        start_seconds=round(start_frame * frame_seconds, 3),
+        duration_ms=int(total_frames * frame_seconds * 1000),
+        clip="",
+        codec=encoder.name,
+        content_type=encoder.content_type,
+        timestamp_iso=timestamp_iso(
+            source.stat().st_mtime + start_frame * frame_seconds
+        ),
+    )
+    extension = utterance.upload_meta(config.wake_word).file_extension
+    clip_path = output_dir / f"{source.stem}_{index:04d}.{extension}"
+    if recording.spilled and encoder.name == "wav":
+        shutil.move(str(recording.finalize_wav()), clip_path)
+    else:
+        with recording.pcm() as pcm:
+            clip_path.write_bytes(encoder.encode(pcm))
+    utterance.clip = str(clip_path)
+    return utterance
+
+
+def collect_inputs(patterns: Iterable[str]) -> list[Path]:
+    """Expand directories (recursively) and glob patterns into a sorted list of audio
+    files.
+    """
+    found: set[Path] = set()
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            candidates: Iterable[Path] = path.rglob("*")
+        else:
+            candidates = (Path(item) for item in glob.glob(pattern, recursive=True))
+        found.update(
+            item
+            for item in candidates
+            if item.is_file() and item.suffix.lower() in AUDIO_SUFFIXES
+        )
+    return sorted(found)
+
+
+_WORKER: dict = {}
+
+
+def _init_worker(
+    config: AppConfig, output_dir: Path, model_path: Optional[Path]
+) -> None:
+    # Un modelo por proceso: los segment_file del worker reutilizan el mismo vosk.Model
+    _WORKER.update(config=config, output_dir=output_dir, model_path=model_path)
+    if model_path is not None:
+        shared_model(model_path)
+
+
+def _segment_in_worker(path: Path) -> dict:
+    return segment_file(
+        path, _WORKER["config"], _WORKER["output_dir"], _WORKER["model_path"]
+    )
+
+
+def run_batch(
+    files: list[Path],
+    config: AppConfig,
+    output_dir: Path,
+    model_path: Optional[Path],
+    workers: int = 0,
+    uploader=None,
+) -> dict:
+    """Segment ``files`` across a process pool and write ``manifest.json`` to
+    ``output_dir``.
+
+    With ``uploader`` set, every clip is sent (or queued in the outbox) from this
+    process as soon as its file is done.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or min(len(files), os.cpu_count() or 1) or 1
+    started = time.perf_counter()
+    results: list[dict] = []
+    errors: list[dict] = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(config, output_dir, model_path),
+    ) as pool:
+        futures = {pool.submit(_segment_in_worker, path): path for path in files}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as exc:
+                logger.error("No se pudo procesar %s: %s", path, exc)
+                errors.append({"file": str(path), "error": str(exc)})
+                continue
+            if uploader is not None:
+                for item in result["utterances"]:
+                    utterance = Utterance(**item)
+                    meta = utterance.upload_meta(config.wake_word)
+                    item["uploaded"] = uploader.upload(
+                        Path(utterance.clip).read_bytes(), meta, notify=False
+                    )
+            logger.info(
+                "%s: %s grabaciones (%.1fx tiempo real)",
+                path.name,
+                len(result["utterances"]),
+                result["realtime_factor"],
+            )
+            results.append(result)
+    elapsed = time.perf_counter() - started
+    results.sort(key=lambda item: item["file"])
+    audio_seconds = sum(item["audio_seconds"] for item in results)
+    manifest = {
+        "summary": {
+            "files": len(files),
+            "failed": len(errors),
+            "utterances": sum(len(item["utterances"]) for item in results),
+            "workers": workers,
+            "audio_seconds": round(audio_seconds, 3),
+            "wall_seconds": round(elapsed, 3),
+            "realtime_factor": round(audio_seconds / elapsed, 2) if elapsed else 0.0,
+        },
+        "files": results,
+        "errors": errors,
+    }
+    save_json(output_dir / "manifest.json", manifest)
+    return manifest
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Segmenta archivos de audio por wake word y silencio"
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="Directorios, archivos o patrones glob (WAV de 16 bits, .raw, .pcm)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        required=True,
+        help="Carpeta para los clips y manifest.json",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Procesos en paralelo (por defecto, uno por CPU)",
+    )
+    parser.add_argument(
+        "--model", type=Path, help="Modelo Vosk (por defecto, models/vosk-es)"
+    )
+    parser.add_argument(
+        "--upload",
+        action="store_true",
+        help="Enviar cada clip al webhook (o al outbox)",
+    )
+    return parser
+
+
+def main() -> None:
+    from .config import load_config
+    from .logger import configure_logging
+
+    args = build_parser().parse_args()
+    config = load_config()
+    configure_logging(config.log_level)
+    files = collect_inputs(args.inputs)
+    if not files:
+        raise SystemExit("No se encontraron archivos de audio")
+    model_path = args.model
+    if model_path is None:
+        from scripts.download_vosk_model import ensure_model
+
+        model_path = ensure_model(show_progress=True)
+    uploader = None
+    if args.upload:
+        from .journal import OutboxJournal
+        from .uploader import Uploader
+        from .utils import NotificationManager
+
+        # Outbox propio junto a los clips: el de la app es del proceso que la ejecuta
+        journal = OutboxJournal(
+            args.output / "outbox",
+            dead_letter=args.output / "dead_letter",
+            quota_bytes=int(config.outbox_quota_mb * 1024 * 1024),
+            eviction=config.outbox_eviction,
+        )
+        uploader = Uploader(config, NotificationManager(), journal=journal)
+        if journal.pending_count():
+            logger.info(
+                "Reintentando %s envíos pendientes de una ejecución anterior",
+                journal.pending_count(),
+            )
+            uploader.process_outbox_once()
+    manifest = run_batch(
+        files, config, args.output, model_path, workers=args.workers, uploader=uploader
+    )
+    if uploader is not None and uploader.journal.pending_count():
+        logger.warning(
+            "%s clips quedan en %s; se reintentan al volver a ejecutar "
+            "con la misma --output",
+            uploader.journal.pending_count(),
+            uploader.journal.directory,
+        )
+    summary = manifest["summary"]
+    print(
+        f"{summary['utterances']} grabaciones de {summary['files']} archivos "
+        f"en {summary['wall_seconds']}s ({summary['realtime_factor']}x tiempo real) "
+        f"-> {args.output / 'manifest.json'}"
+    )
+
+
+__all__ = [
+    "ArchiveSource",
+    "Utterance",
+    "collect_inputs",
+    "iter_frames",
+    "run_batch",
+    "segment_file",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,9 @@ except ImportError:  # pragma: no cover - fallback for testing
 
 import os
 
+# CAPTURE_SAMPLE_RATE=native: capturar a la frecuencia por defecto del dispositivo
+NATIVE_SAMPLE_RATE = 0
+
 
 @dataclass
 class AppConfig:
@@ -26,11 +29,65 @@ class AppConfig:
     auto_start_spooler: bool
     spooler_interval_seconds: float = 60.0
     max_retry_attempts: int = 3
+    audio_source: str = "device"
+    # Frecuencia del dispositivo; None = SAMPLE_RATE, NATIVE_SAMPLE_RATE = la nativa
+    capture_sample_rate: Optional[int] = None
+    audio_source_speed: float = 1.0
+    audio_capture_path: Optional[str] = None
+    ring_buffer_seconds: float = 10.0
+    preroll_seconds: float = 2.0
+    stream_segment_seconds: float = 0.0
+    audio_codec: str = "wav"
+    outbox_workers: int = 4
+    webhook_batch_url: Optional[str] = None
+    outbox_batch_max_items: int = 50
+    outbox_batch_max_mb: float = 8.0
+    delivery_check: bool = True
+    upload_workers: int = 2
+    upload_queue_size: int = 8
+    outbox_max_attempts: int = 8
+    outbox_backoff_seconds: float = 30.0
+    outbox_quota_mb: float = 500.0
+    outbox_eviction: str = "drop-oldest"
+    wake_gate: bool = True
+    wake_gate_margin_db: float = 6.0
+    wake_batch_ms: int = 100
+    wake_partial_interval_ms: int = 200
+    wake_max_lag_ms: int = 1000
+    endpointer: str = "adaptive"
+    endpoint_min_silence_ms: int = 600
+    endpoint_vosk: bool = False
+    trim_silence: bool = True
+    trim_padding_ms: int = 300
+    max_recording_seconds: float = 3600.0
+    recording_spill_mb: float = 16.0
+    metrics_port: int = 9464
+    metrics_snapshot_seconds: float = 60.0
+    # Ventana y periodo de muestreo del perfil de CPU (--profile o menú de bandeja)
+    profile_seconds: float = 30.0
+    profile_interval_ms: int = 10
+    input_devices: tuple[Optional[int], ...] = ()
+    # Variantes de la wake word que se aceptan además de WAKE_WORD y las integradas
+    wake_variants: tuple[str, ...] = ()
+    config_reload_seconds: float = 2.0
+    startup_buffer_seconds: float = 30.0
 
     @property
     def frame_duration_seconds(self) -> float:
         return self.frame_duration_ms / 1000.0
 
+    @property
+    def device_indices(self) -> list[Optional[int]]:
+        """Input devices to capture from: ``INPUT_DEVICES`` if set, else the single
+        device.
+        """
+        return list(dict.fromkeys(self.input_devices)) or [self.input_device_index]
+
+
+def device_label(index: Optional[int]) -> str:
+    """Identifier of an input device in metadata, logs and metrics."""
+    return "default" if index is None else str(index)
+
 
 def _parse_bool(value: str, default: bool) -> bool:
     if value is None:
@@ -55,13 +112,33 @@ def _parse_device_index(raw: Optional[str]) -> Optional[int]:
         return None
 
 
-def load_config(env_path: Optional[Path] = None) -> AppConfig:
+def _parse_sample_rate(raw: Optional[str]) -> Optional[int]:
+    raw = (raw or "").strip().lower()
+    if not raw:
+        return None
+    if raw == "native":
+        return NATIVE_SAMPLE_RATE
+    return int(raw)
+
+
+def _parse_device_list(raw: Optional[str]) -> tuple[Optional[int], ...]:
+    if not raw:
+        return ()
+    return tuple(_parse_device_index(item) for item in raw.split(",") if item.strip())
+
+
+def load_config(env_path: Optional[Path] = None, override: bool = False) -> AppConfig:
+    """Build the config from ``.env`` and the environment.
+
+    With ``override`` (live reload), values in ``.env`` replace those already in the
+    environment.
+    """
     env_file = env_path or Path.cwd() / ".env"
     if env_file.exists():
-        load_dotenv(env_file)
+        load_dotenv(env_file, override=override)
     else:
         # Load environment variables from the current process if .env is missing
-        load_dotenv()
+        load_dotenv(override=override)
 
     webhook_url = os.getenv("WEBHOOK_URL", "").strip()
     wake_word = os.getenv("WAKE_WORD", "oye kay").strip() or "oye kay"
@@ -69,9 +146,53 @@ def load_config(env_path: Optional[Path] = None) -> AppConfig:
     vad_aggressiveness = int(os.getenv("VAD_AGGRESSIVENESS", "2"))
     silence_seconds = float(os.getenv("SILENCE_SECONDS", "5"))
     input_device = _parse_device_index(os.getenv("INPUT_DEVICE_INDEX"))
+    input_devices = _parse_device_list(os.getenv("INPUT_DEVICES"))
+    wake_variants = tuple(
+        item.strip()
+        for item in os.getenv("WAKE_VARIANTS", "").split(",")
+        if item.strip()
+    )
+    config_reload_seconds = float(os.getenv("CONFIG_RELOAD_SECONDS", "2"))
+    startup_buffer_seconds = float(os.getenv("STARTUP_BUFFER_SECONDS", "30"))
     log_level = os.getenv("LOG_LEVEL", "INFO").upper()
     auto_start_spooler = _parse_bool(os.getenv("AUTO_START_SPOOLER", "true"), True)
     frame_duration_ms = 20
+    audio_source = os.getenv("AUDIO_SOURCE", "device").strip() or "device"
+    capture_sample_rate = _parse_sample_rate(os.getenv("CAPTURE_SAMPLE_RATE"))
+    audio_source_speed = float(os.getenv("AUDIO_SOURCE_SPEED", "1"))
+    audio_capture_path = os.getenv("AUDIO_CAPTURE_PATH", "").strip() or None
+    preroll_seconds = float(os.getenv("PREROLL_SECONDS", "2"))
+    stream_segment_seconds = float(os.getenv("STREAM_SEGMENT_SECONDS", "0"))
+    audio_codec = os.getenv("AUDIO_CODEC", "wav").strip().lower() or "wav"
+    outbox_workers = int(os.getenv("OUTBOX_WORKERS", "4"))
+    webhook_batch_url = os.getenv("WEBHOOK_BATCH_URL", "").strip() or None
+    outbox_batch_max_items = int(os.getenv("OUTBOX_BATCH_MAX_ITEMS", "50"))
+    outbox_batch_max_mb = float(os.getenv("OUTBOX_BATCH_MAX_MB", "8"))
+    delivery_check = _parse_bool(os.getenv("DELIVERY_CHECK", "true"), True)
+    upload_workers = int(os.getenv("UPLOAD_WORKERS", "2"))
+    upload_queue_size = int(os.getenv("UPLOAD_QUEUE_SIZE", "8"))
+    outbox_max_attempts = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+    outbox_backoff_seconds = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))
+    outbox_quota_mb = float(os.getenv("OUTBOX_QUOTA_MB", "500"))
+    outbox_eviction = (
+        os.getenv("OUTBOX_EVICTION", "drop-oldest").strip().lower() or "drop-oldest"
+    )
+    wake_gate = _parse_bool(os.getenv("WAKE_GATE", "true"), True)
+    wake_gate_margin_db = float(os.getenv("WAKE_GATE_MARGIN_DB", "6"))
+    wake_batch_ms = int(os.getenv("WAKE_BATCH_MS", "100"))
+    wake_partial_interval_ms = int(os.getenv("WAKE_PARTIAL_INTERVAL_MS", "200"))
+    wake_max_lag_ms = int(os.getenv("WAKE_MAX_LAG_MS", "1000"))
+    endpointer = os.getenv("ENDPOINTER", "adaptive").strip().lower() or "adaptive"
+    endpoint_min_silence_ms = int(os.getenv("ENDPOINT_MIN_SILENCE_MS", "600"))
+    endpoint_vosk = _parse_bool(os.getenv("ENDPOINT_VOSK", "false"), False)
+    trim_silence = _parse_bool(os.getenv("TRIM_SILENCE", "true"), True)
+    trim_padding_ms = int(os.getenv("TRIM_PADDING_MS", "300"))
+    max_recording_seconds = float(os.getenv("MAX_RECORDING_SECONDS", "3600"))
+    recording_spill_mb = float(os.getenv("RECORDING_SPILL_MB", "16"))
+    metrics_port = int(os.getenv("METRICS_PORT", "9464"))
+    metrics_snapshot_seconds = float(os.getenv("METRICS_SNAPSHOT_SECONDS", "60"))
+    profile_seconds = float(os.getenv("PROFILE_SECONDS", "30"))
+    profile_interval_ms = int(os.getenv("PROFILE_INTERVAL_MS", "10"))
 
     return AppConfig(
         webhook_url=webhook_url,
@@ -83,6 +204,44 @@ def load_config(env_path: Optional[Path] = None) -> AppConfig:
         input_device_index=input_device,
         log_level=log_level,
         auto_start_spooler=auto_start_spooler,
+        audio_source=audio_source,
+        capture_sample_rate=capture_sample_rate,
+        audio_source_speed=audio_source_speed,
+        audio_capture_path=audio_capture_path,
+        preroll_seconds=preroll_seconds,
+        stream_segment_seconds=stream_segment_seconds,
+        audio_codec=audio_codec,
+        outbox_workers=outbox_workers,
+        webhook_batch_url=webhook_batch_url,
+        outbox_batch_max_items=outbox_batch_max_items,
+        outbox_batch_max_mb=outbox_batch_max_mb,
+        delivery_check=delivery_check,
+        upload_workers=upload_workers,
+        upload_queue_size=upload_queue_size,
+        outbox_max_attempts=outbox_max_attempts,
+        outbox_backoff_seconds=outbox_backoff_seconds,
+        outbox_quota_mb=outbox_quota_mb,
+        outbox_eviction=outbox_eviction,
+        wake_gate=wake_gate,
+        wake_gate_margin_db=wake_gate_margin_db,
+        wake_batch_ms=wake_batch_ms,
+        wake_partial_interval_ms=wake_partial_interval_ms,
+        wake_max_lag_ms=wake_max_lag_ms,
+        endpointer=endpointer,
+        endpoint_min_silence_ms=endpoint_min_silence_ms,
+        endpoint_vosk=endpoint_vosk,
+        trim_silence=trim_silence,
+        trim_padding_ms=trim_padding_ms,
+        max_recording_seconds=max_recording_seconds,
+        recording_spill_mb=recording_spill_mb,
+        metrics_port=metrics_port,
+        metrics_snapshot_seconds=metrics_snapshot_seconds,
+        profile_seconds=profile_seconds,
+        profile_interval_ms=profile_interval_ms,
+        input_devices=input_devices,
+        wake_variants=wake_variants,
+        config_reload_seconds=config_reload_seconds,
+        startup_buffer_seconds=startup_buffer_seconds,
     )
 
 
@@ -92,5 +251,11 @@ def project_root() -> Path:
 
 def ensure_directories() -> None:
     root = project_root()
-    for folder in (root / "logs", root / "outbox", root / "models", root / "models" / "vosk-es"):
+    for folder in (
+        root / "logs",
+        root / "outbox",
+        root / "dead_letter",
+        root / "models",
+        root / "models" / "vosk-es",
+    ):
         folder.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import dataclasses
+from pathlib import Path
+from typing import Callable, Optional
+
+try:
+    from loguru import logger
+except ImportError:  # pragma: no cover - fallback for testing
+
+    class _DummyLogger:
+        def __getattr__(self, name):
+            def _noop(*args, **kwargs):
+                pass
+
+            return _noop
+
+    logger = _DummyLogger()  # type: ignore[assignment]
+
+from .config import AppConfig, load_config
+from .utils import RepeatedTimer
+
+# Ajustes que la app aplica en caliente; el resto (dispositivo, frecuencias,
+# códec, cuota...) exige reiniciar
+RELOADABLE_FIELDS = frozenset(
+    {
+        "webhook_url",
+        "webhook_batch_url",
+        "delivery_check",
+        "wake_word",
+        "wake_variants",
+        "vad_aggressiveness",
+        "wake_gate_margin_db",
+        "wake_batch_ms",
+        "wake_partial_interval_ms",
+        "wake_max_lag_ms",
+        "silence_seconds",
+        "endpointer",
+        "endpoint_min_silence_ms",
+        "endpoint_vosk",
+        "trim_silence",
+        "trim_padding_ms",
+        "max_recording_seconds",
+        "log_level",
+        "profile_seconds",
+        "profile_interval_ms",
+        "auto_start_spooler",
+        "spooler_interval_seconds",
+        "max_retry_attempts",
+        "outbox_workers",
+        "outbox_max_attempts",
+        "outbox_backoff_seconds",
+        "outbox_batch_max_items",
+        "outbox_batch_max_mb",
+    }
+)
+
+
+def config_changes(current: AppConfig, new: AppConfig) -> dict[str, object]:
+    """Fields whose value differs in ``new``, with their new value."""
+    return {
+        item.name: getattr(new, item.name)
+        for item in dataclasses.fields(AppConfig)
+        if getattr(current, item.name) != getattr(new, item.name)
+    }
+
+
+class ConfigWatcher:
+    """Polls ``.env`` and calls ``on_change`` with the reloaded config whenever the file
+    changes.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        on_change: Callable[[AppConfig], object],
+        interval: float = 2.0,
+    ) -> None:
+        self.path = Path(path)
+        self.on_change = on_change
+        self._signature = self._stat()
+        self._timer = RepeatedTimer(interval, self.check, name="ConfigWatcher")
+
+    def start(self) -> None:
+        self._timer.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+
+    def check(self) -> bool:
+        """Reload once if the file changed since the last check; True when ``on_change``
+        ran.
+        """
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            config = load_config(self.path, override=True)
+        except Exception as exc:
+            logger.error("No se pudo recargar %s: %s", self.path, exc)
+            return False
+        self.on_change(config)
+        return True
+
+    def _stat(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+
+__all__ = ["ConfigWatcher", "RELOADABLE_FIELDS", "config_changes"]
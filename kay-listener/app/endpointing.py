@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+from .vad import frame_energy_dbfs
+
+
+class AdaptiveEndpointer:
+    """End-of-utterance detector whose required silence adapts to each recording.
+
+    Drop-in for ``SilenceDetector``: ``mark(is_voice, frame)`` returns True once the
+    recording should end. Frame energy (dBFS) feeds two running estimates, the
+    noise floor (non-voice frames) and the speech level (voice frames). After the
+    last voice frame it waits only ``min_silence_ms`` when the audio falls back to
+    the floor, and up to ``max_silence_seconds`` while what follows still sits near
+    the speech level (a filled pause, breathing) or the utterance is still very
+    short. It never ends on a pause shorter than ``pause_factor`` times the longest
+    pause the speaker already made in this recording. With a Vosk ``recognizer``,
+    a final result after speech counts as a clear end.
+    """
+
+    def __init__(
+        self,
+        frame_duration_ms: int,
+        max_silence_seconds: float,
+        min_silence_ms: int = 600,
+        noise_floor_db: Optional[float] = None,
+        noise_adapt: float = 0.005,
+        speech_adapt: float = 0.1,
+        silence_adapt: float = 0.2,
+        min_span_db: float = 10.0,
+        short_utterance_ms: int = 1000,
+        pause_factor: float = 1.5,
+        recognizer=None,
+    ) -> None:
+        self.max_frames = max(1, int(max_silence_seconds * 1000 / frame_duration_ms))
+        self.min_frames = min(
+            self.max_frames, max(1, min_silence_ms // frame_duration_ms)
+        )
+        self.short_utterance_frames = max(1, short_utterance_ms // frame_duration_ms)
+        self.noise_adapt = noise_adapt
+        self.speech_adapt = speech_adapt
+        self.silence_adapt = silence_adapt
+        self.min_span_db = min_span_db
+        self.pause_factor = pause_factor
+        self.recognizer = recognizer
+        self.noise_floor_db = -55.0 if noise_floor_db is None else noise_floor_db
+        self.speech_level_db: Optional[float] = None
+        self.voiced_frames = 0
+        self.consecutive_silence = 0
+        self.longest_pause = 0
+        self.required_frames = self.max_frames
+        self._silence_db = self.noise_floor_db
+        self._boundary = False
+
+    def mark(self, is_voice: bool, frame=None) -> bool:
+        energy = (
+            float(frame_energy_dbfs(np.frombuffer(frame, dtype=np.int16)))
+            if frame is not None
+            else None
+        )
+        if self.recognizer is not None and frame is not None and self.voiced_frames:
+            self._feed(frame, is_voice)
+        if is_voice:
+            if self.consecutive_silence and self.voiced_frames:
+                # Una pausa dentro del enunciado: las
+                # siguientes deben superarla antes de cortar
+                self.longest_pause = max(self.longest_pause, self.consecutive_silence)
+            self.voiced_frames += 1
+            self.consecutive_silence = 0
+            self._boundary = False
+            if energy is not None:
+                if self.speech_level_db is None:
+                    self.speech_level_db = energy
+                else:
+                    self.speech_level_db += self.speech_adapt * (
+                        energy - self.speech_level_db
+                    )
+            return False
+        if energy is not None:
+            # El suelo de ruido baja de inmediato y sube despacio: una duda no lo mueve
+            if energy < self.noise_floor_db:
+                self.noise_floor_db = energy
+            else:
+                self.noise_floor_db += self.noise_adapt * (energy - self.noise_floor_db)
+            if self.consecutive_silence == 0:
+                self._silence_db = energy
+            else:
+                self._silence_db += self.silence_adapt * (energy - self._silence_db)
+        self.consecutive_silence += 1
+        self.required_frames = self._required()
+        return self.consecutive_silence >= self.required_frames
+
+    def _required(self) -> int:
+        if not self.voiced_frames:
+            return self.max_frames
+        if self._boundary:
+            return self.min_frames
+        hesitation = max(0.0, 1.0 - self.voiced_frames / self.short_utterance_frames)
+        if self.speech_level_db is not None:
+            span = max(self.speech_level_db - self.noise_floor_db, self.min_span_db)
+            residual = (self._silence_db - self.noise_floor_db) / span
+            hesitation = max(hesitation, min(1.0, max(0.0, residual)))
+        required = self.min_frames + round(
+            (self.max_frames - self.min_frames) * hesitation
+        )
+        required = max(required, int(self.longest_pause * self.pause_factor))
+        return min(required, self.max_frames)
+
+    def _feed(self, frame, is_voice: bool) -> None:
+        try:
+            final = self.recognizer.AcceptWaveform(bytes(frame))
+        except Exception:
+            self.recognizer = None
+            return
+        # Vosk cierra un resultado final cuando su endpointing ve el fin del enunciado
+        if final and not is_voice:
+            self._boundary = True
+
+
+__all__ = ["AdaptiveEndpointer"]
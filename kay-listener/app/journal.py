@@ -0,0 +1,494 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+try:
+    from loguru import logger
+except ImportError:  # pragma: no cover - fallback for testing
+
+    class _DummyLogger:
+        def __getattr__(self, name):
+            def _noop(*args, **kwargs):
+                pass
+
+            return _noop
+
+    logger = _DummyLogger()  # type: ignore[assignment]
+
+from .metrics import metrics
+from .utils import load_json, save_json
+
+JOURNAL_NAME = "journal.sqlite3"
+LOCK_NAME = "outbox.lock"
+# La fila se inserta antes de escribir el audio; pasa a pending cuando el archivo ya
+# tiene su nombre final
+WRITING = "writing"
+PENDING = "pending"
+INFLIGHT = "inflight"
+# Una fila "writing" más antigua que esto es de un proceso que murió a mitad de escribir
+STALE_WRITE_SECONDS = 60.0
+DROP_OLDEST = "drop-oldest"
+DROP_NEWEST = "drop-newest"
+EVICTION_POLICIES = (DROP_OLDEST, DROP_NEWEST)
+# Cuánto se recuerdan las claves ya confirmadas por el servidor
+DELIVERED_RETENTION_SECONDS = 30 * 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    state TEXT NOT NULL,
+    lane TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL DEFAULT 0,
+    audio_file TEXT,
+    meta TEXT NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (state, next_attempt_at, id);
+CREATE INDEX IF NOT EXISTS jobs_lane ON jobs (lane, id);
+CREATE TABLE IF NOT EXISTS delivered (
+    idempotency_key TEXT PRIMARY KEY,
+    acked_at REAL NOT NULL
+);
+"""
+
+# Elegible: el trabajo más antiguo de su carril (sesión), con la espera ya vencida.
+# Un trabajo anterior en vuelo o aún escribiéndose bloquea el carril; una fila
+# "writing" abandonada deja de bloquearlo pasado STALE_WRITE_SECONDS.
+_NEXT_DUE = """
+SELECT * FROM jobs AS job
+WHERE job.state = ? AND job.next_attempt_at <= ?
+  AND job.id = (
+    SELECT MIN(other.id) FROM jobs AS other
+    WHERE other.lane = job.lane AND (other.state != ? OR other.created_at >= ?)
+  )
+ORDER BY job.next_attempt_at, job.id
+LIMIT 1
+"""
+
+
+@dataclass
+class JournalJob:
+    id: int
+    created_at: float
+    lane: str
+    attempts: int
+    next_attempt_at: float
+    size: int
+    audio_path: Optional[Path]
+    meta: dict
+    last_error: str = ""
+
+    @property
+    def name(self) -> str:
+        return self.audio_path.name if self.audio_path else f"job_{self.id}"
+
+
+class OutboxJournal:
+    """SQLite index of the outbox: job state, attempts, size and next retry time.
+
+    Audio stays in ``directory`` as one file per job. The row is inserted first in the
+    ``writing`` state, then the audio is written to a temporary name, renamed and the
+    row marked pending, so every file in the outbox has a row from the moment it
+    exists. ``recover()`` re-queues jobs that were in flight and removes files no row
+    refers to. It only runs in the process holding the outbox lock file, so opening
+    the journal from a second process (batch mode, a benchmark) never touches the
+    jobs of the running app.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        dead_letter: Path,
+        quota_bytes: int = 0,
+        eviction: str = DROP_OLDEST,
+    ) -> None:
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Política de desalojo desconocida: {eviction}")
+        self.directory = Path(directory)
+        self.dead_letter = Path(dead_letter)
+        self.quota_bytes = quota_bytes
+        self.eviction = eviction
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            str(self.directory / JOURNAL_NAME),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(_SCHEMA)
+        self._lock_file = self._acquire_owner_lock()
+        if self.owner:
+            self.recover()
+        else:
+            logger.info(
+                "Outbox %s en uso por otro proceso: no se ejecuta la recuperación",
+                self.directory,
+            )
+
+    @property
+    def owner(self) -> bool:
+        """True when this process holds the outbox lock and is in charge of recovery."""
+        return self._lock_file is not None
+
+    def add(
+        self,
+        audio: bytes | Path | None,
+        meta: dict,
+        extension: str = "wav",
+        lane: str | None = None,
+    ) -> JournalJob | None:
+        """Atomically store a new job; returns None when the quota policy rejects it.
+
+        ``audio`` may be a finished file, which is moved into the outbox instead of
+        copied.
+        """
+        if isinstance(audio, Path):
+            size = audio.stat().st_size
+        else:
+            size = len(audio) if audio is not None else 0
+        if not self._make_room(size):
+            logger.error(
+                "Outbox lleno (%s bytes): trabajo descartado", self.quota_bytes
+            )
+            metrics.counter(
+                "outbox_dropped_total",
+                "Jobs lost to the outbox quota",
+                reason="rejected",
+            ).inc()
+            return None
+        audio_file = (
+            f"job_{uuid.uuid4().hex}.{extension}" if audio is not None else None
+        )
+        values = (
+            time.time(),
+            lane or f"job:{uuid.uuid4().hex}",
+            size,
+            audio_file,
+            json.dumps(meta, ensure_ascii=False),
+        )
+        insert = (
+            "INSERT INTO jobs (created_at, state, lane, size, audio_file, meta) "
+            "VALUES (?, ?, ?, ?, ?, ?)"
+        )
+        with self._lock:
+            job_id = self._db.execute(
+                insert, (values[0], WRITING if audio_file else PENDING, *values[1:])
+            ).lastrowid
+        if audio_file is not None:
+            assert audio is not None
+            try:
+                if isinstance(audio, Path):
+                    self._move_atomic(audio, self.directory / audio_file)
+                else:
+                    self._write_atomic(self.directory / audio_file, audio)
+            except Exception:
+                with self._lock:
+                    self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                raise
+            with self._lock:
+                updated = self._db.execute(
+                    "UPDATE jobs SET state = ? WHERE id = ? AND state = ?",
+                    (PENDING, job_id, WRITING),
+                ).rowcount
+                if not updated:
+                    # La recuperación de otro proceso dio la
+                    # fila por abandonada: se vuelve a registrar
+                    job_id = self._db.execute(
+                        insert, (values[0], PENDING, *values[1:])
+                    ).lastrowid
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._to_job(row)
+
+    def claim_next_due(self, now: float | None = None) -> JournalJob | None:
+        """Mark the next due job as in flight and return it (None if nothing is due)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._db.execute(
+                _NEXT_DUE, (PENDING, now, WRITING, now - STALE_WRITE_SECONDS)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET state = ? WHERE id = ?", (INFLIGHT, row["id"])
+            )
+        return self._to_job(row)
+
+    def complete(self, job: JournalJob) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE id = ?", (job.id,))
+        if job.audio_path:
+            job.audio_path.unlink(missing_ok=True)
+
+    def release(self, job: JournalJob) -> None:
+        """Return a claimed job to the queue untouched (no attempt is counted)."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET state = ? WHERE id = ?", (PENDING, job.id)
+            )
+
+    def retry(self, job: JournalJob, next_attempt_at: float, error: str = "") -> None:
+        job.attempts += 1
+        job.next_attempt_at = next_attempt_at
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET state = ?, attempts = ?, next_attempt_at = ?, "
+                "last_error = ? WHERE id = ?",
+                (PENDING, job.attempts, next_attempt_at, error, job.id),
+            )
+
+    def dead_letter_job(self, job: JournalJob, reason: str) -> None:
+        """Move the job's audio plus a JSON description to the dead-letter directory."""
+        logger.error("Moviendo %s a dead-letter: %s", job.name, reason)
+        self.dead_letter.mkdir(parents=True, exist_ok=True)
+        stem = job.audio_path.stem if job.audio_path else job.name
+        if job.audio_path and job.audio_path.exists():
+            shutil.move(
+                str(job.audio_path), str(self.dead_letter / job.audio_path.name)
+            )
+        payload = dict(job.meta)
+        payload.update(attempts=job.attempts + 1, dead_letter_reason=reason)
+        save_json(self.dead_letter / f"{stem}.json", payload)
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE id = ?", (job.id,))
+
+    def mark_delivered(self, key: str) -> None:
+        """Remember that the server acknowledged the upload identified by ``key``."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO delivered (idempotency_key, acked_at) "
+                "VALUES (?, ?)",
+                (key, time.time()),
+            )
+
+    def is_delivered(self, key: str) -> bool:
+        with self._lock:
+            return (
+                self._db.execute(
+                    "SELECT 1 FROM delivered WHERE idempotency_key = ?", (key,)
+                ).fetchone()
+                is not None
+            )
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def due_count(self, now: float | None = None) -> int:
+        """Pending jobs whose retry time has passed (in-flight and writing rows are
+        not due).
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = ? AND next_attempt_at <= ?",
+                (PENDING, now),
+            ).fetchone()[0]
+
+    def pending_bytes(self) -> int:
+        with self._lock:
+            return self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM jobs"
+            ).fetchone()[0]
+
+    def oldest_created_at(self) -> float | None:
+        with self._lock:
+            return self._db.execute("SELECT MIN(created_at) FROM jobs").fetchone()[0]
+
+    def recover(self) -> None:
+        """Re-queue in-flight jobs, import legacy JSON sidecars, drop orphan files and
+        old delivery keys.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET state = ? WHERE state = ?", (PENDING, INFLIGHT)
+            )
+            self._db.execute(
+                "DELETE FROM delivered WHERE acked_at < ?",
+                (now - DELIVERED_RETENTION_SECONDS,),
+            )
+            writing = self._db.execute(
+                "SELECT * FROM jobs WHERE state = ?", (WRITING,)
+            ).fetchall()
+        for row in writing:
+            if (self.directory / row["audio_file"]).exists():
+                # El audio llegó a su nombre final antes
+                # del cierre: el trabajo está completo
+                with self._lock:
+                    self._db.execute(
+                        "UPDATE jobs SET state = ? WHERE id = ?", (PENDING, row["id"])
+                    )
+            elif row["created_at"] < now - STALE_WRITE_SECONDS:
+                with self._lock:
+                    self._db.execute("DELETE FROM jobs WHERE id = ?", (row["id"],))
+        self._import_legacy_jobs()
+        # Primero los archivos y después las filas: todo archivo creado antes del
+        # listado ya tiene su fila
+        files = list(self.directory.glob("job_*"))
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE audio_file IS NOT NULL"
+            ).fetchall()
+        referenced = {row["audio_file"] for row in rows}
+        for path in files:
+            if path.name.removesuffix(".part") not in referenced:
+                logger.warning("Eliminando archivo huérfano del outbox: %s", path.name)
+                path.unlink(missing_ok=True)
+        for row in rows:
+            if (
+                row["state"] != WRITING
+                and not (self.directory / row["audio_file"]).exists()
+            ):
+                self.dead_letter_job(self._to_job(row), "audio faltante")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _acquire_owner_lock(self):
+        """Take the outbox lock file without waiting; returns its open handle, or None
+        if another process holds it.
+        """
+        handle = open(self.directory / LOCK_NAME, "a+")
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+        return handle
+
+    def _make_room(self, incoming: int) -> bool:
+        if not self.quota_bytes:
+            return True
+        if incoming > self.quota_bytes:
+            return False
+        used = self.pending_bytes()
+        if used + incoming <= self.quota_bytes:
+            return True
+        if self.eviction == DROP_NEWEST:
+            return False
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE state = ? ORDER BY id", (PENDING,)
+            ).fetchall()
+        for row in rows:
+            if used + incoming <= self.quota_bytes:
+                break
+            job = self._to_job(row)
+            logger.warning(
+                "Cuota del outbox superada: desalojando %s (%s bytes)",
+                job.name,
+                job.size,
+            )
+            self.complete(job)
+            metrics.counter(
+                "outbox_dropped_total",
+                "Jobs lost to the outbox quota",
+                reason="evicted",
+            ).inc()
+            used -= job.size
+        return used + incoming <= self.quota_bytes
+
+    def _import_legacy_jobs(self) -> None:
+        for meta_path in sorted(self.directory.glob("job_*.json")):
+            try:
+                meta = load_json(meta_path)
+            except Exception as exc:
+                logger.error("No se pudo leer %s: %s", meta_path, exc)
+                self.dead_letter.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(meta_path), str(self.dead_letter / meta_path.name))
+                continue
+            audio_file = None
+            size = 0
+            if meta.get("event") != "session_end":
+                audio_path = meta_path.with_suffix(
+                    "."
+                    + ("flac" if meta.get("content_type") == "audio/flac" else "wav")
+                )
+                if not audio_path.exists():
+                    logger.warning("Archivo de audio faltante para %s", meta_path)
+                    self.dead_letter.mkdir(parents=True, exist_ok=True)
+                    shutil.move(str(meta_path), str(self.dead_letter / meta_path.name))
+                    continue
+                audio_file = audio_path.name
+                size = audio_path.stat().st_size
+            with self._lock:
+                self._db.execute(
+                    "INSERT INTO jobs "
+                    "(created_at, state, lane, size, audio_file, meta) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        meta_path.stat().st_mtime,
+                        PENDING,
+                        meta.get("session_id") or f"job:{meta_path.stem}",
+                        size,
+                        audio_file,
+                        json.dumps(meta, ensure_ascii=False),
+                    ),
+                )
+            meta_path.unlink()
+            logger.info("Trabajo heredado importado al journal: %s", meta_path.name)
+
+    def _to_job(self, row: sqlite3.Row) -> JournalJob:
+        return JournalJob(
+            id=row["id"],
+            created_at=row["created_at"],
+            lane=row["lane"],
+            attempts=row["attempts"],
+            next_attempt_at=row["next_attempt_at"],
+            size=row["size"],
+            audio_path=self.directory / row["audio_file"]
+            if row["audio_file"]
+            else None,
+            meta=json.loads(row["meta"]),
+            last_error=row["last_error"] or "",
+        )
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        tmp_path = path.with_name(path.name + ".part")
+        with open(tmp_path, "wb") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _move_atomic(source: Path, path: Path) -> None:
+        tmp_path = path.with_name(path.name + ".part")
+        # Rename si está en el mismo disco; copia si no
+        shutil.move(str(source), str(tmp_path))
+        with open(tmp_path, "rb") as fh:
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+
+
+__all__ = ["DROP_NEWEST", "DROP_OLDEST", "JournalJob", "OutboxJournal"]
@@ -0,0 +1,372 @@
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
+
+try:
+    from loguru import logger
+except ImportError:  # pragma: no cover - fallback for testing
+
+    class _DummyLogger:
+        def __getattr__(self, name):
+            def _noop(*args, **kwargs):
+                pass
+
+            return _noop
+
+    logger = _DummyLogger()  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# Límites en segundos: de un frame de audio (20 ms) a una subida lenta
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+DURATION_BUCKETS = (
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+    600.0,
+    1800.0,
+    3600.0,
+)
+
+
+def _label_key(labels: dict[str, str]) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Counter:
+    """Monotonic count (frames dropped, uploads sent, ...)."""
+
+    kind = "counter"
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> float:
+        return self._value
+
+
+class Gauge:
+    """Point-in-time value, either set explicitly or read from a callback at snapshot
+    time.
+    """
+
+    kind = "gauge"
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception as exc:
+                logger.debug("No se pudo leer la métrica: %s", exc)
+                return float("nan")
+        return self._value
+
+    def snapshot(self) -> float:
+        return self.value
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum, min/max and bucket-interpolated
+    percentiles.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._min = float("inf")
+        self._max = float("-inf")
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._count += 1
+            self._sum += value
+            self._min = min(self._min, value)
+            self._max = max(self._max, value)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def percentile(self, fraction: float) -> float:
+        """Estimate by linear interpolation inside the bucket holding the rank."""
+        with self._lock:
+            if not self._count:
+                return 0.0
+            rank = fraction * self._count
+            seen = 0
+            for position, count in enumerate(self._counts):
+                if count and seen + count >= rank:
+                    lower = (
+                        self.buckets[position - 1]
+                        if position
+                        else min(self._min, self.buckets[0])
+                    )
+                    upper = (
+                        self.buckets[position]
+                        if position < len(self.buckets)
+                        else self._max
+                    )
+                    lower, upper = max(lower, self._min), min(upper, self._max)
+                    return lower + (upper - lower) * (rank - seen) / count
+                seen += count
+            return self._max
+
+    def snapshot(self) -> dict:
+        p50, p95, p99 = (self.percentile(fraction) for fraction in (0.5, 0.95, 0.99))
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(
+                self.buckets + (float("inf"),), self._counts, strict=True
+            ):
+                cumulative += count
+                buckets["+Inf" if bound == float("inf") else f"{bound:g}"] = cumulative
+            return {
+                "count": self._count,
+                "sum": round(self._sum, 6),
+                "min": round(self._min, 6) if self._count else 0.0,
+                "max": round(self._max, 6) if self._count else 0.0,
+                "p50": round(p50, 6),
+                "p95": round(p95, 6),
+                "p99": round(p99, 6),
+                "buckets": buckets,
+            }
+
+
+class MetricsRegistry:
+    """Process-wide named metrics, optionally split by labels (e.g.
+    ``subscriber="wake"``).
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, dict[tuple, Counter | Gauge | Histogram]] = {}
+        self._help: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str = "", **labels: str) -> Counter:
+        return self._get(name, help, labels, Counter)
+
+    def gauge(self, name: str, help: str = "", **labels: str) -> Gauge:
+        return self._get(name, help, labels, Gauge)
+
+    def histogram(
+        self,
+        name: str,
+        help: str = "",
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+        **labels: str,
+    ) -> Histogram:
+        return self._get(name, help, labels, lambda: Histogram(buckets))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+            self._help.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = [(name, dict(series)) for name, series in self._metrics.items()]
+        result = {}
+        for name, series in sorted(items):
+            values = []
+            for key, metric in series.items():
+                values.append({"labels": dict(key), "value": metric.snapshot()})
+            kind = next(iter(series.values())).kind
+            result[name] = {
+                "type": kind,
+                "help": self._help.get(name, ""),
+                "series": values,
+            }
+        return {"timestamp": time.time(), "pid": os.getpid(), "metrics": result}
+
+    def prometheus_text(self) -> str:
+        """Text exposition format, for scraping by a standard collector."""
+        lines = []
+        for name, entry in self.snapshot()["metrics"].items():
+            metric_name = f"kay_{name}"
+            if entry["help"]:
+                lines.append(f"# HELP {metric_name} {entry['help']}")
+            lines.append(f"# TYPE {metric_name} {entry['type']}")
+            for series in entry["series"]:
+                labels = series["labels"]
+                value = series["value"]
+                if entry["type"] != "histogram":
+                    lines.append(f"{metric_name}{_format_labels(labels)} {value}")
+                    continue
+                for bound, count in value["buckets"].items():
+                    bucket_labels = _format_labels({**labels, "le": bound})
+                    lines.append(f"{metric_name}_bucket{bucket_labels} {count}")
+                lines.append(
+                    f"{metric_name}_sum{_format_labels(labels)} {value['sum']}"
+                )
+                lines.append(
+                    f"{metric_name}_count{_format_labels(labels)} {value['count']}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".part")
+        tmp_path.write_text(
+            json.dumps(self.snapshot(), ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        os.replace(tmp_path, path)
+
+    def _get(self, name: str, help: str, labels: dict[str, str], factory):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._metrics.setdefault(name, {})
+            metric = series.get(key)
+            if metric is None:
+                metric = series[key] = factory()
+            if help:
+                self._help[name] = help
+            return metric
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return "{" + body + "}"
+
+
+def _handler_class(registry: MetricsRegistry):
+    # http.server arrastra email/http.client: solo se importa si el endpoint está activo
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - http.server API
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if path in ("", "/metrics"):
+                body = json.dumps(registry.snapshot(), ensure_ascii=False).encode(
+                    "utf-8"
+                )
+                content_type = "application/json"
+            elif path == "/metrics/prometheus":
+                body = registry.prometheus_text().encode("utf-8")
+                content_type = "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+    return MetricsHandler
+
+
+class MetricsServer:
+    """Serves the registry as JSON on ``/metrics`` (and Prometheus text on
+    ``/metrics/prometheus``).
+    """
+
+    def __init__(
+        self, registry: MetricsRegistry, port: int, host: str = "127.0.0.1"
+    ) -> None:
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> bool:
+        from http.server import ThreadingHTTPServer
+
+        try:
+            self._server = ThreadingHTTPServer(
+                (self.host, self.port), _handler_class(self.registry)
+            )
+        except OSError as exc:
+            logger.warning(
+                "No se pudo abrir el endpoint de métricas en %s:%s: %s",
+                self.host,
+                self.port,
+                exc,
+            )
+            return False
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(
+            target=self._server.serve_forever, name="MetricsServer", daemon=True
+        ).start()
+        logger.info(
+            "Métricas disponibles en http://%s:%s/metrics", self.host, self.port
+        )
+        return True
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+metrics = MetricsRegistry()
+
+__all__ = [
+    "Counter",
+    "DURATION_BUCKETS",
+    "Gauge",
+    "Histogram",
+    "LATENCY_BUCKETS",
+    "MetricsRegistry",
+    "MetricsServer",
+    "metrics",
+]
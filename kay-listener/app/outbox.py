@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import dataclasses
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+try:
+    from loguru import logger
+except ImportError:  # pragma: no cover - fallback for testing
+
+    class _DummyLogger:
+        def __getattr__(self, name):
+            def _noop(*args, **kwargs):
+                pass
+
+            return _noop
+
+    logger = _DummyLogger()  # type: ignore[assignment]
+
+from .journal import JournalJob
+from .metrics import metrics
+from .uploader import REJECTED, SENT, UNCERTAIN, Uploader, UploadMeta
+
+MAX_BACKOFF_SECONDS = 3600.0
+
+
+@dataclass
+class DrainReport:
+    total: int = 0
+    sent: int = 0
+    retried: int = 0
+    dead_lettered: int = 0
+    deferred: int = 0
+    already_delivered: int = 0
+    elapsed_seconds: float = 0.0
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.retried + self.dead_lettered + self.already_delivered
+
+    def add(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+        metrics.counter(
+            "outbox_processed_total",
+            "Outbox jobs handled by the drainer",
+            outcome=counter,
+        ).inc(amount)
+
+
+class OutboxDrainer:
+    """Sends outbox jobs through a bounded worker pool.
+
+    Workers repeatedly claim the next due job from the journal, so each job gets one
+    POST per pass; failures are retried on later passes with exponential backoff up to
+    ``max_attempts``. Jobs that exhaust their attempts, are rejected by the server (4xx)
+    or are malformed go to dead-letter, so a single bad job never blocks the rest.
+
+    With ``WEBHOOK_BATCH_URL`` set, each worker claims up to ``batch_max_items`` jobs
+    (and ``batch_max_bytes`` of audio) and sends them in one request; if the server
+    turns batches down, the same jobs are sent one by one.
+
+    Jobs whose idempotency key the server already acknowledged are completed without
+    a POST. Jobs whose last attempt may have reached the server are sent on their own,
+    so ``Uploader.send`` can ask the server before uploading the audio again.
+    """
+
+    def __init__(
+        self,
+        uploader: Uploader,
+        workers: int = 4,
+        max_attempts: int = 8,
+        backoff_seconds: float = 30.0,
+        progress: Optional[Callable[[DrainReport], None]] = None,
+        batch_max_items: int = 0,
+        batch_max_bytes: int = 0,
+    ) -> None:
+        self.uploader = uploader
+        self.journal = uploader.journal
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.progress = progress or self._log_progress
+        self.batch_max_items = max(0, batch_max_items)
+        self.batch_max_bytes = batch_max_bytes
+
+    def drain_once(self) -> DrainReport:
+        report = DrainReport(total=self.journal.due_count())
+        if not report.total:
+            report.deferred = self.journal.pending_count()
+            return report
+        if not self.uploader.config.webhook_url:
+            logger.debug("WEBHOOK_URL no configurada, outbox sin procesar")
+            report.deferred = self.journal.pending_count()
+            return report
+
+        started = time.monotonic()
+        # Cada pasada solo atiende lo que ya vencía al
+        # empezar; los reintentos esperan a la siguiente
+        pass_started_at = time.time()
+        logger.info(
+            "Procesando outbox: %s trabajos en %s hilos", report.total, self.workers
+        )
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="OutboxWorker"
+        ) as pool:
+            for _ in range(min(self.workers, report.total)):
+                pool.submit(self._worker, report, pass_started_at)
+        report.elapsed_seconds = time.monotonic() - started
+        report.deferred = self.journal.pending_count()
+        logger.info(
+            "Outbox procesado en %.1fs: %s enviados, %s reintentos pendientes, "
+            "%s a dead-letter, %s aplazados",
+            report.elapsed_seconds,
+            report.sent,
+            report.retried,
+            report.dead_lettered,
+            report.deferred,
+        )
+        return report
+
+    def _worker(self, report: DrainReport, now: float) -> None:
+        try:
+            while True:
+                if self.batch_max_items > 1 and self.uploader.batch_supported:
+                    jobs = self._claim_batch(now)
+                    if not jobs:
+                        return
+                    self._process_batch(jobs, report)
+                    self.progress(report)
+                    continue
+                job = self.journal.claim_next_due(now)
+                if job is None:
+                    return
+                self._process(job, report)
+                self.progress(report)
+        except (
+            Exception
+        ) as exc:  # pragma: no cover - defensive, workers must not die silently
+            logger.exception("Error procesando outbox: %s", exc)
+
+    def _claim_batch(self, now: float) -> list[JournalJob]:
+        jobs: list[JournalJob] = []
+        size = 0
+        while len(jobs) < self.batch_max_items:
+            job = self.journal.claim_next_due(now)
+            if job is None:
+                break
+            if jobs and self.batch_max_bytes and size + job.size > self.batch_max_bytes:
+                # No cabe: queda para el siguiente lote
+                self.journal.release(job)
+                break
+            jobs.append(job)
+            size += job.size
+        return jobs
+
+    def _process_batch(self, jobs: list[JournalJob], report: DrainReport) -> None:
+        items = []
+        for job in jobs:
+            prepared = self._prepare(job, report)
+            if prepared is not None:
+                items.append((job, *prepared))
+        if not items:
+            return
+        for job, meta, audio in [item for item in items if item[1].delivery_unknown]:
+            self._settle(
+                job, self.uploader.send(audio, meta, attempts=1, notify=False), report
+            )
+        items = [item for item in items if not item[1].delivery_unknown]
+        if len(items) <= 1:
+            for job, meta, audio in items:
+                self._settle(
+                    job,
+                    self.uploader.send(audio, meta, attempts=1, notify=False),
+                    report,
+                )
+            return
+        logger.info("Enviando lote de %s trabajos desde outbox", len(items))
+        outcomes = self.uploader.send_batch(
+            [(job.name, audio, meta) for job, meta, audio in items]
+        )
+        for job, meta, audio in items:
+            status = (
+                outcomes[job.name]
+                if outcomes is not None
+                else self.uploader.send(audio, meta, attempts=1, notify=False)
+            )
+            self._settle(job, status, report)
+
+    def _prepare(
+        self, job: JournalJob, report: DrainReport
+    ) -> Optional[tuple[UploadMeta, Optional[Path]]]:
+        """Metadata and audio file of a claimed job, or None after dead-lettering a
+        broken one.
+        """
+        try:
+            meta = UploadMeta.from_dict(job.meta, self.uploader.config.wake_word)
+            # El audio se envía leyendo del archivo, sin cargarlo entero en memoria
+            audio = (
+                job.audio_path if job.audio_path and job.audio_path.exists() else None
+            )
+        except Exception as exc:
+            self.journal.dead_letter_job(job, f"trabajo dañado: {exc}")
+            report.add("dead_lettered")
+            return None
+        if meta.has_audio and audio is None:
+            self.journal.dead_letter_job(job, "audio faltante")
+            report.add("dead_lettered")
+            return None
+        # Los trabajos antiguos no traen clave: se calcula aquí a partir del audio
+        meta = meta.with_idempotency_key(audio)
+        if meta.idempotency_key and self.journal.is_delivered(meta.idempotency_key):
+            logger.info("%s ya fue entregado: se completa sin reenviar", job.name)
+            self.journal.complete(job)
+            report.add("already_delivered")
+            return None
+        if job.last_error == UNCERTAIN and not meta.delivery_unknown:
+            meta = dataclasses.replace(meta, delivery_unknown=True)
+        return meta, audio
+
+    def _process(self, job: JournalJob, report: DrainReport) -> None:
+        prepared = self._prepare(job, report)
+        if prepared is None:
+            return
+        meta, audio = prepared
+        logger.info("Reintentando envío desde outbox: %s", job.name)
+        self._settle(
+            job, self.uploader.send(audio, meta, attempts=1, notify=False), report
+        )
+
+    def _settle(self, job: JournalJob, status: str, report: DrainReport) -> None:
+        if status == SENT:
+            self.journal.complete(job)
+            report.add("sent")
+        elif status == REJECTED:
+            self.journal.dead_letter_job(job, "rechazado por el servidor")
+            report.add("dead_lettered")
+        elif job.attempts + 1 >= self.max_attempts:
+            self.journal.dead_letter_job(job, f"{job.attempts + 1} intentos fallidos")
+            report.add("dead_lettered")
+        else:
+            delay = min(MAX_BACKOFF_SECONDS, self.backoff_seconds * 2**job.attempts)
+            self.journal.retry(job, time.time() + delay, status)
+            report.add("retried")
+
+    def _log_progress(self, report: DrainReport) -> None:
+        processed = report.processed
+        if processed == report.total or processed % 25 == 0:
+            logger.info("Outbox: %s/%s trabajos procesados", processed, report.total)
+
+
+__all__ = ["DrainReport", "OutboxDrainer"]
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import contextlib
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+WAV_HEADER_SIZE = 44
+_WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
+
+
+def wav_header(sample_rate: int, data_bytes: int) -> bytes:
+    """Canonical 44-byte header for 16-bit mono PCM."""
+    return _WAV_HEADER.pack(
+        b"RIFF",
+        36 + data_bytes,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,
+        1,
+        sample_rate,
+        sample_rate * 2,
+        2,
+        16,
+        b"data",
+        data_bytes,
+    )
+
+
+class PcmBuffer:
+    """Growable PCM store that moves to a temporary WAV file past ``spill_threshold``
+    bytes.
+
+    Once spilled, audio is appended to a file preallocated in ``chunk_bytes`` steps
+    behind a placeholder header, so memory use stays flat however long the recording
+    runs. ``finalize_wav()`` trims the file and patches the header in place.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        spill_threshold: int,
+        directory: Optional[Path] = None,
+        chunk_bytes: int = 8 * 1024 * 1024,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.spill_threshold = spill_threshold
+        self.directory = directory
+        self.chunk_bytes = chunk_bytes
+        self.path: Optional[Path] = None
+        self._memory = bytearray()
+        self._file: Optional[IO[bytes]] = None
+        self._size = 0
+        self._allocated = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+    def extend(self, data) -> None:
+        if self._file is None:
+            self._memory.extend(data)
+            self._size = len(self._memory)
+            if self.spill_threshold and self._size >= self.spill_threshold:
+                self._spill()
+            return
+        end = WAV_HEADER_SIZE + self._size + len(data)
+        if end > self._allocated:
+            self._allocated = end + self.chunk_bytes
+            self._file.truncate(self._allocated)
+        self._file.seek(WAV_HEADER_SIZE + self._size)
+        self._file.write(data)
+        self._size += len(data)
+
+    def read(self, start: int, end: int) -> bytes:
+        """Copy of the PCM bytes in ``[start, end)``."""
+        end = min(end, self._size)
+        if self._file is None:
+            return bytes(self._memory[start:end])
+        self._file.flush()
+        self._file.seek(WAV_HEADER_SIZE + start)
+        return self._file.read(max(0, end - start))
+
+    def trim(self, start: int, end: int, chunk: int = 1024 * 1024) -> None:
+        """Keep only the PCM bytes in ``[start, end)``, in place.
+
+        A spilled buffer shifts the kept span to the front of its file ``chunk``
+        bytes at a time, so trimming never loads the recording into memory.
+        """
+        end = min(end, self._size)
+        start = min(start, end)
+        if self._file is None:
+            del self._memory[end:]
+            del self._memory[:start]
+            self._size = len(self._memory)
+            return
+        if start:
+            self._file.flush()
+            for offset in range(start, end, chunk):
+                self._file.seek(WAV_HEADER_SIZE + offset)
+                data = self._file.read(min(chunk, end - offset))
+                self._file.seek(WAV_HEADER_SIZE + offset - start)
+                self._file.write(data)
+        self._size = end - start
+
+    @contextlib.contextmanager
+    def pcm(self) -> Iterator[memoryview]:
+        """Zero-copy view of all PCM; memory-mapped when the buffer has spilled."""
+        if self._file is None:
+            view = memoryview(self._memory)
+            try:
+                yield view
+            finally:
+                view.release()
+            return
+        self._file.flush()
+        mapped = mmap.mmap(
+            self._file.fileno(), WAV_HEADER_SIZE + self._size, access=mmap.ACCESS_READ
+        )
+        whole = memoryview(mapped)
+        view = whole[WAV_HEADER_SIZE:]
+        try:
+            yield view
+        finally:
+            view.release()
+            whole.release()
+            mapped.close()
+
+    def finalize_wav(self) -> Path:
+        """Close the spill file as a valid WAV and hand its path to the caller."""
+        if self._file is None or self.path is None:
+            raise RuntimeError("El buffer no se ha volcado a disco")
+        self._file.truncate(WAV_HEADER_SIZE + self._size)
+        self._file.seek(0)
+        self._file.write(wav_header(self.sample_rate, self._size))
+        self._file.close()
+        self._file = None
+        path, self.path = self.path, None
+        return path
+
+    def discard(self) -> None:
+        self._memory = bytearray()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+            self.path = None
+
+    def _spill(self) -> None:
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(prefix="rec_", suffix=".wav", dir=self.directory)
+        self.path = Path(name)
+        self._file = os.fdopen(fd, "w+b")
+        self._allocated = WAV_HEADER_SIZE + self._size + self.chunk_bytes
+        self._file.truncate(self._allocated)
+        self._file.write(wav_header(self.sample_rate, 0))
+        self._file.write(self._memory)
+        self._memory = bytearray()
+
+
+__all__ = ["PcmBuffer", "WAV_HEADER_SIZE", "wav_header"]
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import collections
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from .utils import logs_dir
+
+# Cada cuánto (s) se relee el CPU de cada hilo:
+# leerlo en cada muestra costaría más que muestrear
+CPU_READ_SECONDS = 0.1
+
+
+@dataclass
+class ThreadInfo:
+    name: str
+    ident: int
+    native_id: Optional[int]
+
+
+@dataclass
+class ThreadProfile:
+    name: str
+    native_id: Optional[int]
+    samples: int
+    cpu_seconds: Optional[float]
+    cpu_percent: Optional[float]
+    top_functions: list[tuple[str, int]] = field(default_factory=list)
+
+
+@dataclass
+class ProfileReport:
+    started: str
+    duration_seconds: float
+    interval_seconds: float
+    samples: int
+    process_cpu_seconds: float
+    threads: list[ThreadProfile]
+    stacks: dict[str, int]
+
+    def collapsed(self) -> str:
+        """One ``thread;outer;...;inner count`` line per stack, for flamegraph.pl or
+        speedscope.
+        """
+        return "".join(
+            f"{stack} {count}\n" for stack, count in sorted(self.stacks.items())
+        )
+
+    def summary(self) -> str:
+        lines = [
+            f"Perfil de {self.duration_seconds:.1f} s, {self.samples} muestras, "
+            f"CPU del proceso {self.process_cpu_seconds:.2f} s "
+            f"({100 * self.process_cpu_seconds / max(self.duration_seconds, 1e-9):.1f}"
+            " % de un núcleo)"
+        ]
+        for thread in self.threads:
+            cpu = (
+                "    n/d"
+                if thread.cpu_percent is None
+                else f"{thread.cpu_percent:6.1f}%"
+            )
+            top = ", ".join(
+                f"{name} ({count})" for name, count in thread.top_functions[:3]
+            )
+            lines.append(f"  {thread.name:<28} {cpu}  {top}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data.pop("stacks")
+        return data
+
+
+def thread_cpu_seconds(native_id: Optional[int]) -> Optional[float]:
+    """User plus kernel CPU time of an OS thread of this process, or None where it
+    cannot be read.
+    """
+    if native_id is None:
+        return None
+    if sys.platform == "win32":  # pragma: no cover - Windows only
+        return _windows_thread_cpu(native_id)
+    try:
+        stat = Path(f"/proc/self/task/{native_id}/stat").read_text()
+        fields = stat.rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _windows_thread_cpu(
+    native_id: int,
+) -> Optional[float]:  # pragma: no cover - Windows only
+    if sys.platform != "win32":
+        return None
+    import ctypes
+    from ctypes import wintypes
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.OpenThread.restype = wintypes.HANDLE
+    kernel32.OpenThread.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+    handle = kernel32.OpenThread(
+        0x0800, False, native_id
+    )  # THREAD_QUERY_LIMITED_INFORMATION
+    if not handle:
+        return None
+    try:
+        times = [wintypes.FILETIME() for _ in range(4)]
+        if not kernel32.GetThreadTimes(handle, *(ctypes.byref(item) for item in times)):
+            return None
+        kernel, user = times[2], times[3]
+        # FILETIME cuenta intervalos de 100 ns
+        return (
+            sum(
+                (item.dwHighDateTime << 32 | item.dwLowDateTime)
+                for item in (kernel, user)
+            )
+            / 1e7
+        )
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def known_threads(extra: Iterable[ThreadInfo] = ()) -> dict[int, ThreadInfo]:
+    """Threads by ``ident``: the ones ``threading`` knows plus ``extra`` (e.g. the
+    PortAudio callback).
+    """
+    threads = {
+        thread.ident: ThreadInfo(thread.name, thread.ident, thread.native_id)
+        for thread in threading.enumerate()
+        if thread.ident is not None
+    }
+    for info in extra:
+        threads[info.ident] = info
+    return threads
+
+
+class SamplingProfiler:
+    """Statistical profiler: samples the Python stack of every thread at a fixed
+    interval.
+
+    Uses ``sys._current_frames`` from the thread that calls ``run``, so nothing is
+    installed in the profiled threads and the cost is only paid while a window is
+    open. Sample counts show where each thread spends its time (running or waiting);
+    the per-thread CPU time read from the OS tells which of them actually burn CPU.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.01,
+        extra_threads: Optional[Callable[[], Iterable[ThreadInfo]]] = None,
+    ) -> None:
+        self.interval = interval
+        self.extra_threads = extra_threads or (lambda: ())
+        self._labels: dict[object, str] = {}
+
+    def run(
+        self, duration: float, stop_event: Optional[threading.Event] = None
+    ) -> ProfileReport:
+        own = threading.get_ident()
+        threads = known_threads(self.extra_threads())
+        cpu_start = {
+            ident: thread_cpu_seconds(info.native_id) for ident, info in threads.items()
+        }
+        cpu_last = dict(cpu_start)
+        stacks: collections.Counter[tuple[int, tuple[str, ...]]] = collections.Counter()
+        cpu_every = max(1, round(CPU_READ_SECONDS / self.interval))
+        process_start = time.process_time()
+        started_at = time.perf_counter()
+        deadline = started_at + duration
+        next_sample = started_at
+        samples = 0
+        while True:
+            now = time.perf_counter()
+            if now >= deadline or (stop_event is not None and stop_event.is_set()):
+                break
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stacks[ident, self._stack(frame)] += 1
+                if ident not in threads:
+                    threads.update(known_threads(self.extra_threads()))
+            samples += 1
+            if samples % cpu_every == 0:
+                # Los hilos que terminan durante la ventana
+                # (RecorderThread) conservan su última lectura
+                for ident, info in list(threads.items()):
+                    cpu = thread_cpu_seconds(info.native_id)
+                    if cpu is not None:
+                        cpu_last[ident] = cpu
+            next_sample += self.interval
+            time.sleep(max(0.0, min(next_sample, deadline) - time.perf_counter()))
+        elapsed = time.perf_counter() - started_at
+        for ident, info in threads.items():
+            cpu = thread_cpu_seconds(info.native_id)
+            if cpu is not None:
+                cpu_last[ident] = cpu
+        return self._report(
+            threads,
+            stacks,
+            cpu_start,
+            cpu_last,
+            samples,
+            elapsed,
+            time.process_time() - process_start,
+        )
+
+    def _stack(self, frame) -> tuple[str, ...]:
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = f"{Path(code.co_filename).stem}:{code.co_qualname}".replace(
+                    " ", "_"
+                ).replace(";", "_")
+                self._labels[code] = label
+            labels.append(label)
+            frame = frame.f_back
+        labels.reverse()
+        return tuple(labels)
+
+    def _report(
+        self, threads, stacks, cpu_start, cpu_last, samples, elapsed, process_cpu
+    ) -> ProfileReport:
+        names = {ident: info.name for ident, info in threads.items()}
+        per_thread: dict[int, collections.Counter[str]] = collections.defaultdict(
+            collections.Counter
+        )
+        counts: collections.Counter[int] = collections.Counter()
+        collapsed: collections.Counter[str] = collections.Counter()
+        for (ident, stack), count in stacks.items():
+            name = names.get(ident, f"Thread-{ident}")
+            counts[ident] += count
+            if stack:
+                per_thread[ident][stack[-1]] += count
+            collapsed[
+                ";".join((name.replace(" ", "_").replace(";", "_"),) + stack)
+            ] += count
+        profiles = []
+        for ident in set(counts) | {
+            ident for ident in cpu_last if cpu_last[ident] is not None
+        }:
+            info = threads.get(ident)
+            cpu = None
+            if cpu_last.get(ident) is not None:
+                # Un hilo creado durante la ventana no
+                # tiene lectura inicial: todo su CPU cuenta
+                cpu = cpu_last[ident] - (cpu_start.get(ident) or 0.0)
+            profiles.append(
+                ThreadProfile(
+                    name=names.get(ident, f"Thread-{ident}"),
+                    native_id=info.native_id if info else None,
+                    samples=counts[ident],
+                    cpu_seconds=None if cpu is None else round(cpu, 4),
+                    cpu_percent=None
+                    if cpu is None
+                    else round(100 * cpu / max(elapsed, 1e-9), 2),
+                    top_functions=per_thread[ident].most_common(5),
+                )
+            )
+        profiles.sort(
+            key=lambda item: (
+                item.cpu_seconds is None,
+                -(item.cpu_seconds or 0.0),
+                -item.samples,
+            )
+        )
+        return ProfileReport(
+            started=time.strftime(
+                "%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - elapsed)
+            ),
+            duration_seconds=round(elapsed, 3),
+            interval_seconds=self.interval,
+            samples=samples,
+            process_cpu_seconds=round(process_cpu, 4),
+            threads=profiles,
+            stacks=dict(collapsed),
+        )
+
+
+def write_profile(
+    report: ProfileReport, directory: Optional[Path] = None
+) -> tuple[Path, Path]:
+    """Save ``profile_<time>.collapsed`` and ``profile_<time>.json`` (per-thread
+    summary) in ``logs/``.
+    """
+    directory = directory or logs_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = "profile_" + report.started.replace(":", "").replace("-", "")
+    collapsed_path = directory / f"{stem}.collapsed"
+    summary_path = directory / f"{stem}.json"
+    collapsed_path.write_text(report.collapsed(), encoding="utf-8")
+    summary_path.write_text(
+        json.dumps(report.to_dict(), indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    return collapsed_path, summary_path
+
+
+__all__ = [
+    "ProfileReport",
+    "SamplingProfiler",
+    "ThreadInfo",
+    "ThreadProfile",
+    "thread_cpu_seconds",
+    "write_profile",
+]
@@ -1,22 +1,11 @@
 from __future__ import annotations
 
-try:
-    import webrtcvad
-except ImportError:  # pragma: no cover - fallback for testing
-    class _VadFallback:
-        def __init__(self, aggressiveness: int) -> None:
-            self.aggressiveness = aggressiveness
-
-        def is_speech(self, frame: bytes, sample_rate: int) -> bool:
-            return True
-
-    webrtcvad = type("webrtcvad", (), {"Vad": _VadFallback})()  # type: ignore[assignment]
-
-import io
 import queue
 import threading
-import wave
+import time
 from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
 
 try:
     from loguru import logger
@@ -28,11 +17,13 @@ except ImportError:  # pragma: no cover - fallback for testing
 
             return _noop
 
-    logger = _DummyLogger()
+    logger = _DummyLogger()  # type: ignore[assignment]
 
 from typing import TYPE_CHECKING
 
 from .config import AppConfig
+from .metrics import DURATION_BUCKETS, metrics
+from .pcm_buffer import PcmBuffer
 
 if TYPE_CHECKING:
     from .audio_stream import AudioStream
@@ -44,6 +35,36 @@ class RecordingResult:
     duration_ms: int
     wake_word: str
     timestamp_iso: str
+    codec: str = "wav"
+    content_type: str = "audio/wav"
+    audio_path: Optional[Path] = None
+    # Duración antes de recortar el silencio; None si no se recortó nada
+    original_duration_ms: Optional[int] = None
+
+    @property
+    def audio(self) -> bytes | Path:
+        """Encoded audio, or the WAV file of a recording that spilled to disk."""
+        return self.audio_path if self.audio_path is not None else self.audio_bytes
+
+
+class _VadFallback:
+    def __init__(self, aggressiveness: int) -> None:
+        self.aggressiveness = aggressiveness
+
+    def is_speech(self, frame: bytes, sample_rate: int) -> bool:
+        return True
+
+
+ENDPOINTERS = ("adaptive", "fixed")
+
+
+def create_vad(aggressiveness: int):
+    """Build a webrtcvad.Vad, importing it on first use (it drags in pkg_resources)."""
+    try:
+        import webrtcvad
+    except ImportError:  # pragma: no cover - fallback for testing
+        return _VadFallback(aggressiveness)
+    return webrtcvad.Vad(aggressiveness)
 
 
 class SilenceDetector:
@@ -53,7 +74,7 @@ class SilenceDetector:
         self.required_frames = max(1, int(silence_seconds / frame_duration))
         self.consecutive_silence = 0
 
-    def mark(self, is_voice: bool) -> bool:
+    def mark(self, is_voice: bool, frame=None) -> bool:
         if is_voice:
             self.consecutive_silence = 0
         else:
@@ -61,97 +82,303 @@ class SilenceDetector:
         return self.consecutive_silence >= self.required_frames
 
 
+def voiced_span(
+    first_voiced: int, last_voiced: int, total_frames: int, padding_frames: int
+) -> tuple[int, int]:
+    """Frame range ``[start, end)`` covering the voiced frames plus ``padding_frames``
+    on each side.
+    """
+    return max(0, first_voiced - padding_frames), min(
+        total_frames, last_voiced + 1 + padding_frames
+    )
+
+
 class Recorder:
     def __init__(self, config: AppConfig, audio_stream: AudioStream) -> None:
+        if config.endpointer not in ENDPOINTERS:
+            raise ValueError(f"Endpointer desconocido: {config.endpointer}")
         self.config = config
         self.audio_stream = audio_stream
-        self.vad = webrtcvad.Vad(config.vad_aggressiveness)
+        self.vad = create_vad(config.vad_aggressiveness)
+        # Los rellena la app: ruido de fondo del gate y reconocedor para ENDPOINT_VOSK
+        self.noise_floor: Callable[[], float | None] | None = None
+        self.boundary_recognizer: Callable[[], object | None] | None = None
+        from .audio_codecs import get_encoder  # Lazy import: numpy solo cuando se graba
+
+        self.encoder = get_encoder(config.audio_codec, config.sample_rate)
+        from .utils import recording_spill_dir
+
+        # Los restos de grabaciones interrumpidas los borra la app al arrancar
+        self.spill_dir = recording_spill_dir()
+
+    def _new_endpointer(self):
+        """AdaptiveEndpointer for ``ENDPOINTER=adaptive``; the fixed SilenceDetector
+        otherwise or without numpy.
+        """
+        config = self.config
+        if config.endpointer == "adaptive":
+            try:
+                from .endpointing import AdaptiveEndpointer  # Lazy import: numpy
+            except ImportError:  # pragma: no cover - fallback for testing
+                logger.warning(
+                    "numpy no disponible: se usa el corte fijo por SILENCE_SECONDS"
+                )
+            else:
+                recognizer = None
+                if config.endpoint_vosk and self.boundary_recognizer is not None:
+                    recognizer = self.boundary_recognizer()
+                return AdaptiveEndpointer(
+                    config.frame_duration_ms,
+                    config.silence_seconds,
+                    min_silence_ms=config.endpoint_min_silence_ms,
+                    noise_floor_db=self.noise_floor()
+                    if self.noise_floor is not None
+                    else None,
+                    recognizer=recognizer,
+                )
+        return SilenceDetector(config.silence_seconds, config.frame_duration_seconds)
+
+    def _new_buffer(self) -> PcmBuffer:
+        return PcmBuffer(
+            self.config.sample_rate,
+            spill_threshold=int(self.config.recording_spill_mb * 1024 * 1024),
+            directory=self.spill_dir,
+        )
+
+    def record_until_silence(
+        self,
+        stop_event: threading.Event | None = None,
+        start_index: int | None = None,
+        on_segment: Callable[[bytes, int], None] | None = None,
+        triggered_at: float | None = None,
+    ) -> RecordingResult | None:
+        """Record until silence.
 
-    def record_until_silence(self, stop_event: threading.Event | None = None) -> RecordingResult | None:
-        frame_queue = self.audio_stream.subscribe(maxsize=200)
-        raw_audio = bytearray()
-        silence_detector = SilenceDetector(self.config.silence_seconds, self.config.frame_duration_seconds)
+        With ``on_segment`` set, every ``stream_segment_seconds`` of PCM (and the
+        remaining tail once recording ends) is handed over as ``(pcm_bytes,
+        duration_ms)`` while capture continues. ``triggered_at`` (``time.monotonic()``
+        of the wake word) feeds the wake-to-record-start latency metric.
+        """
+        # start_index permite empezar justo donde terminó la wake word (pre-roll)
+        frame_queue = self.audio_stream.subscribe(start_index, name="recorder")
+        raw_audio = self._new_buffer()
+        endpointer = self._new_endpointer()
+        max_frames = int(
+            self.config.max_recording_seconds / self.config.frame_duration_seconds
+        )
         total_frames = 0
         voiced_frames = 0
+        first_voiced = last_voiced = 0
+        segment_frames = max(
+            1,
+            int(
+                self.config.stream_segment_seconds / self.config.frame_duration_seconds
+            ),
+        )
+        segment_start = 0
         try:
-            while True:
-                if stop_event and stop_event.is_set():
-                    logger.info("Grabación cancelada")
-                    return None
-                try:
-                    frame = frame_queue.get(timeout=1)
-                except queue.Empty:
-                    continue
-                total_frames += 1
-                raw_audio.extend(frame)
-                is_voice = False
-                try:
-                    is_voice = self.vad.is_speech(bytes(frame), self.config.sample_rate)
-                except Exception as exc:
-                    logger.warning("Error en VAD: %s", exc)
-                if is_voice:
-                    voiced_frames += 1
-                finished = silence_detector.mark(is_voice)
-                if finished and voiced_frames > 0:
-                    break
-                if total_frames * self.config.frame_duration_seconds > 120:
-                    logger.warning("Tiempo máximo de grabación alcanzado")
-                    break
-        finally:
-            self.audio_stream.unsubscribe(frame_queue)
+            try:
+                while True:
+                    if stop_event and stop_event.is_set():
+                        logger.info("Grabación cancelada")
+                        return None
+                    try:
+                        frame = frame_queue.get(timeout=1)
+                    except queue.Empty:
+                        continue
+                    total_frames += 1
+                    if total_frames == 1 and triggered_at is not None:
+                        metrics.histogram(
+                            "wake_to_record_start_seconds",
+                            "Wake word detection to first recorded frame",
+                        ).observe(time.monotonic() - triggered_at)
+                    was_spilled = raw_audio.spilled
+                    raw_audio.extend(frame)
+                    if raw_audio.spilled and not was_spilled:
+                        logger.info(
+                            "Grabación larga: volcando audio a %s", raw_audio.path
+                        )
+                    is_voice = False
+                    try:
+                        is_voice = self.vad.is_speech(
+                            bytes(frame), self.config.sample_rate
+                        )
+                    except Exception as exc:
+                        logger.warning("Error en VAD: %s", exc)
+                    if is_voice:
+                        if not voiced_frames:
+                            first_voiced = total_frames - 1
+                        last_voiced = total_frames - 1
+                        voiced_frames += 1
+                    if on_segment and total_frames - segment_start >= segment_frames:
+                        segment_start = self._emit_segment(
+                            on_segment, raw_audio, segment_start, total_frames
+                        )
+                    finished = endpointer.mark(is_voice, frame)
+                    if finished and voiced_frames > 0:
+                        metrics.histogram(
+                            "endpoint_silence_seconds",
+                            "Silence waited after the last word "
+                            "before closing a recording",
+                        ).observe(
+                            endpointer.consecutive_silence
+                            * self.config.frame_duration_seconds
+                        )
+                        break
+                    if max_frames and total_frames >= max_frames:
+                        logger.warning(
+                            "Tiempo máximo de grabación alcanzado (%ss)",
+                            self.config.max_recording_seconds,
+                        )
+                        break
+            finally:
+                self.audio_stream.unsubscribe(frame_queue)
 
-        if voiced_frames == 0:
-            logger.warning("No se detectó voz tras la wake word")
-            return None
-
-        duration_ms = int(total_frames * self.config.frame_duration_seconds * 1000)
-        wav_bytes = self._encode_wav(bytes(raw_audio))
-        from .utils import timestamp_iso  # Lazy import to avoid cycles
+            if on_segment and total_frames > segment_start:
+                self._emit_segment(on_segment, raw_audio, segment_start, total_frames)
 
-        return RecordingResult(
-            audio_bytes=wav_bytes,
-            duration_ms=duration_ms,
-            wake_word=self.config.wake_word,
-            timestamp_iso=timestamp_iso(),
-        )
+            if voiced_frames == 0:
+                logger.warning("No se detectó voz tras la wake word")
+                metrics.counter(
+                    "recordings_total",
+                    "Finished recordings by outcome",
+                    outcome="no_voice",
+                ).inc()
+                return None
+            metrics.counter(
+                "recordings_total", "Finished recordings by outcome", outcome="recorded"
+            ).inc()
+            metrics.histogram(
+                "recording_duration_seconds",
+                "Length of recorded utterances",
+                buckets=DURATION_BUCKETS,
+            ).observe(total_frames * self.config.frame_duration_seconds)
+            span = None
+            # En modo streaming los segmentos ya salieron completos: no se recorta
+            if self.config.trim_silence and on_segment is None:
+                padding_frames = int(
+                    self.config.trim_padding_ms / self.config.frame_duration_ms
+                )
+                span = voiced_span(
+                    first_voiced, last_voiced, total_frames, padding_frames
+                )
+            # Los segmentos ya llevan todo el audio: no se codifica la grabación entera
+            return self._finish(
+                raw_audio, total_frames, span, encode=on_segment is None
+            )
+        finally:
+            raw_audio.discard()
 
     def record_seconds(self, seconds: float) -> RecordingResult | None:
-        frame_queue = self.audio_stream.subscribe(maxsize=200)
-        raw_audio = bytearray()
+        frame_queue = self.audio_stream.subscribe(name="mic_test")
+        raw_audio = self._new_buffer()
         frames_needed = int(seconds / self.config.frame_duration_seconds)
         total_frames = 0
         try:
-            while total_frames < frames_needed:
-                try:
-                    frame = frame_queue.get(timeout=1)
-                except queue.Empty:
-                    continue
-                raw_audio.extend(frame)
-                total_frames += 1
+            try:
+                while total_frames < frames_needed:
+                    try:
+                        frame = frame_queue.get(timeout=1)
+                    except queue.Empty:
+                        continue
+                    raw_audio.extend(frame)
+                    total_frames += 1
+            finally:
+                self.audio_stream.unsubscribe(frame_queue)
+
+            if not len(raw_audio):
+                return None
+            return self._finish(raw_audio, total_frames)
         finally:
-            self.audio_stream.unsubscribe(frame_queue)
+            raw_audio.discard()
 
-        if not raw_audio:
-            return None
-        duration_ms = int(total_frames * self.config.frame_duration_seconds * 1000)
-        wav_bytes = self._encode_wav(bytes(raw_audio))
-        from .utils import timestamp_iso
+    def _finish(
+        self,
+        raw_audio: PcmBuffer,
+        total_frames: int,
+        span: tuple[int, int] | None = None,
+        encode: bool = True,
+    ) -> RecordingResult:
+        """Encode the recording, first cutting it down to the ``span`` frame range when
+        given.
+
+        Without ``encode`` the result only carries the duration and metadata.
+        """
+        from .utils import timestamp_iso  # Lazy import to avoid cycles
 
+        original_duration_ms = None
+        if span is not None and span != (0, total_frames):
+            start, end = span
+            frame_bytes = self.audio_stream.frame_samples * 2
+            raw_audio.trim(start * frame_bytes, end * frame_bytes)
+            original_duration_ms = int(
+                total_frames * self.config.frame_duration_seconds * 1000
+            )
+            trimmed_seconds = (
+                total_frames - (end - start)
+            ) * self.config.frame_duration_seconds
+            metrics.histogram(
+                "recording_trimmed_seconds",
+                "Silence cut from recordings before encoding",
+                buckets=DURATION_BUCKETS,
+            ).observe(trimmed_seconds)
+            logger.debug(
+                "Silencio recortado: %s frames al inicio, %s al final",
+                start,
+                total_frames - end,
+            )
+            total_frames = end - start
+        duration_ms = int(total_frames * self.config.frame_duration_seconds * 1000)
+        audio_bytes = b""
+        audio_path = None
+        if encode and raw_audio.spilled and self.encoder.name == "wav":
+            # El archivo temporal ya es el WAV final: solo falta cerrar el encabezado
+            audio_path = raw_audio.finalize_wav()
+        elif encode:
+            with raw_audio.pcm() as pcm:
+                audio_bytes = self.encode(pcm)
         return RecordingResult(
-            audio_bytes=wav_bytes,
+            audio_bytes=audio_bytes,
             duration_ms=duration_ms,
             wake_word=self.config.wake_word,
             timestamp_iso=timestamp_iso(),
+            codec=self.encoder.name,
+            content_type=self.encoder.content_type,
+            audio_path=audio_path,
+            original_duration_ms=original_duration_ms,
         )
 
-    def _encode_wav(self, pcm_bytes: bytes) -> bytes:
-        buffer = io.BytesIO()
-        with wave.open(buffer, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(self.config.sample_rate)
-            wf.writeframes(pcm_bytes)
-        return buffer.getvalue()
+    def _emit_segment(
+        self,
+        on_segment: Callable[[bytes, int], None],
+        raw_audio: PcmBuffer,
+        start_frame: int,
+        end_frame: int,
+    ) -> int:
+        frame_bytes = self.audio_stream.frame_samples * 2
+        pcm = raw_audio.read(start_frame * frame_bytes, end_frame * frame_bytes)
+        on_segment(
+            pcm,
+            int((end_frame - start_frame) * self.config.frame_duration_seconds * 1000),
+        )
+        return end_frame
+
+    def encode(self, pcm_bytes: bytes | memoryview) -> bytes:
+        audio_bytes = self.encoder.encode(pcm_bytes)
+        stats = self.encoder.stats
+        logger.debug(
+            "Audio codificado en %s: %.2f ms por segundo de audio, compresión %.1fx",
+            self.encoder.name,
+            stats.ms_per_audio_second,
+            stats.compression_ratio,
+        )
+        return audio_bytes
 
 
-__all__ = ["Recorder", "RecordingResult", "SilenceDetector"]
+__all__ = [
+    "ENDPOINTERS",
+    "Recorder",
+    "RecordingResult",
+    "SilenceDetector",
+    "voiced_span",
+]
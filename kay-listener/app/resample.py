@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+
+class PolyphaseResampler:
+    """Streaming rational resampler (``out_rate / in_rate = up / down``) for int16 mono
+    audio.
+
+    A Kaiser-windowed sinc low-pass is split into ``up`` phases. Each output sample
+    is the dot product of one phase with the last taps of input, and a whole block
+    is computed at once with NumPy. The tail of the previous block and the fractional
+    position carry over between calls, so any chunking of the input produces the
+    same output as one call with all of it.
+
+    The history and every intermediate array live in buffers sized for the largest
+    block seen so far, so steady-state calls from the audio callback do not allocate.
+    """
+
+    def __init__(
+        self,
+        in_rate: int,
+        out_rate: int,
+        half_width: int = 16,
+        cutoff: float = 0.9,
+        beta: float = 8.6,
+    ) -> None:
+        divisor = math.gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        # half_width pasos por cero a cada lado, en la más baja de las dos frecuencias
+        self.taps = max(
+            1, math.ceil(2 * half_width * max(self.up, self.down) / self.up)
+        )
+        length = self.taps * self.up
+        fc = cutoff * 0.5 / max(self.up, self.down)
+        n = np.arange(length) - (length - 1) / 2
+        prototype = 2 * fc * np.sinc(2 * fc * n) * np.kaiser(length, beta) * self.up
+        # _phases[p, k] = prototype[p + k * up]; k recorre la entrada hacia atrás
+        self._phases = prototype.reshape(self.taps, self.up).T.astype(np.float32)
+        self._lags = np.arange(self.taps)
+        self._offset = 0
+        self._block = -1
+        self._input = np.zeros(0, dtype=np.float32)
+        self._reserve(0)
+
+    @property
+    def delay_seconds(self) -> float:
+        """Group delay the filter adds to the stream."""
+        return (self.taps * self.up - 1) / 2 / (self.up * self.in_rate)
+
+    def max_output(self, input_samples: int) -> int:
+        """Upper bound of the samples one ``process`` call returns for ``input_samples``
+        of input.
+        """
+        return input_samples * self.up // self.down + 1
+
+    def reset(self) -> None:
+        self._input[: self.taps - 1] = 0
+        self._offset = 0
+
+    def _reserve(self, input_samples: int) -> None:
+        """Size the work buffers for ``input_samples`` per block; they only grow."""
+        if input_samples <= self._block:
+            return
+        history = self.taps - 1
+        outputs = self.max_output(input_samples)
+        grown = np.zeros(history + input_samples, dtype=np.float32)
+        if self._block >= 0:
+            grown[:history] = self._input[:history]
+        self._input = grown
+        self._block = input_samples
+        self._steps = self.down * np.arange(outputs)
+        self._positions = np.empty(outputs, dtype=np.intp)
+        self._base = np.empty(outputs, dtype=np.intp)
+        self._phase = np.empty(outputs, dtype=np.intp)
+        self._indexes = np.empty((outputs, self.taps), dtype=np.intp)
+        self._window = np.empty((outputs, self.taps), dtype=np.float32)
+        self._weights = np.empty((outputs, self.taps), dtype=np.float32)
+        self._output = np.empty(outputs, dtype=np.float32)
+
+    def process(self, samples: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """Resample the next block; returns int16 samples at ``out_rate``.
+
+        With ``out`` (int16, at least ``max_output(len(samples))`` long) the samples are
+        written there and a view of the filled part is returned, without allocating.
+        """
+        samples = np.asarray(samples).reshape(-1)
+        self._reserve(len(samples))
+        history = self.taps - 1
+        total = history + len(samples)
+        x = self._input
+        x[history:total] = samples
+        # Posiciones en la señal interpolada (``up`` veces más densa) relativas a x[0]
+        start = self._offset + history * self.up
+        limit = total * self.up
+        count = (limit - 1 - start) // self.down + 1 if start < limit else 0
+        positions = np.add(self._steps[:count], start, out=self._positions[:count])
+        base, phase = np.divmod(
+            positions, self.up, out=(self._base[:count], self._phase[:count])
+        )
+        indexes = np.subtract(base[:, None], self._lags, out=self._indexes[:count])
+        window = np.take(x, indexes, out=self._window[:count])
+        weights = np.take(self._phases, phase, axis=0, out=self._weights[:count])
+        np.multiply(window, weights, out=window)
+        output = np.sum(window, axis=1, out=self._output[:count])
+        np.rint(output, out=output)
+        np.clip(output, -32768, 32767, out=output)
+        self._offset = start + self.down * count - limit
+        if history:
+            x[:history] = x[total - history : total]
+        if out is None:
+            return output.astype(np.int16)
+        out[:count] = output
+        return out[:count]
+
+
+__all__ = ["PolyphaseResampler"]
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+
+import numpy as np
+
+try:
+    from loguru import logger
+except ImportError:  # pragma: no cover - fallback for testing
+
+    class _DummyLogger:
+        def __getattr__(self, name):
+            def _noop(*args, **kwargs):
+                pass
+
+            return _noop
+
+    logger = _DummyLogger()  # type: ignore[assignment]
+
+from .metrics import metrics
+
+
+class FrameRing:
+    """Preallocated ring of fixed-size int16 frames shared by every reader.
+
+    There is a single writer (the audio callback): it copies the frame into the next
+    slot and then publishes it by bumping ``write_index``. The writer never looks at
+    the readers' cursors, so its cost does not depend on how many are attached; it only
+    wakes the ones blocked in ``RingReader.get``, and never waits for a lock to do so.
+    """
+
+    def __init__(self, capacity: int, frame_samples: int) -> None:
+        if capacity < 2:
+            raise ValueError("El buffer circular necesita al menos 2 frames")
+        self.capacity = capacity
+        self.frame_samples = frame_samples
+        self._buffer = np.zeros((capacity, frame_samples), dtype=np.int16)
+        # Vistas creadas una sola vez: leer un frame no asigna memoria
+        self._views = [
+            memoryview(self._buffer[slot]).cast("B") for slot in range(capacity)
+        ]
+        self.write_index = 0
+        self._published = threading.Condition(threading.Lock())
+
+    def write(self, indata: np.ndarray) -> int:
+        """Store one frame and return its absolute index."""
+        index = self.write_index
+        slot = self._buffer[index % self.capacity]
+        samples = indata.reshape(-1)
+        count = min(len(samples), self.frame_samples)
+        slot[:count] = samples[:count]
+        if count < self.frame_samples:
+            slot[count:] = 0
+        self.write_index = index + 1
+        # Si un lector tiene el lock no se espera: lo despierta su propio timeout
+        if self._published.acquire(blocking=False):
+            try:
+                self._published.notify_all()
+            finally:
+                self._published.release()
+        return index
+
+    def wait_for(
+        self, index: int, timeout: float, reader: RingReader | None = None
+    ) -> bool:
+        """Block until frame ``index`` is published, ``timeout`` passes or ``reader`` is
+        closed.
+
+        Returns True if the frame is readable.
+        """
+        with self._published:
+            # closed se comprueba con el lock tomado: un
+            # close() no puede colarse antes del wait
+            if self.write_index <= index and not (reader is not None and reader.closed):
+                self._published.wait(timeout)
+            return self.write_index > index
+
+    def wake_readers(self) -> None:
+        with self._published:
+            self._published.notify_all()
+
+    def view(self, index: int) -> memoryview:
+        """Zero-copy bytes view of frame ``index``; valid until the writer laps it."""
+        return self._views[index % self.capacity]
+
+    def array(self, index: int) -> np.ndarray:
+        return self._buffer[index % self.capacity]
+
+    def oldest_index(self) -> int:
+        """Oldest frame index that is still safe to read."""
+        return max(0, self.write_index - self.capacity + 1)
+
+    def reader(
+        self,
+        start_index: int | None = None,
+        poll_interval: float = 0.02,
+        name: str = "",
+        device: str = "default",
+    ) -> RingReader:
+        if start_index is None:
+            start_index = self.write_index
+        return RingReader(
+            self, max(start_index, self.oldest_index()), poll_interval, name, device
+        )
+
+
+class EventRing:
+    """Preallocated single-producer ring of ``(time, code, value)`` events.
+
+    Meant for the realtime audio callback: ``record`` only stores numbers into
+    NumPy arrays sized up front and bumps ``write_index``, with no lock, string
+    formatting or container growth. A background thread calls ``drain`` and does
+    the logging. When the consumer falls ``capacity`` events behind, new events are
+    discarded and counted in ``dropped`` instead of blocking the producer.
+    """
+
+    def __init__(self, capacity: int = 256) -> None:
+        if capacity < 1:
+            raise ValueError("El buffer de eventos necesita al menos 1 evento")
+        self.capacity = capacity
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._codes = np.zeros(capacity, dtype=np.int32)
+        self._values = np.zeros(capacity, dtype=np.int64)
+        self.write_index = 0
+        self.read_index = 0
+        self.dropped = 0
+        self._dropped_seen = 0
+
+    def record(self, code: int, value: int = 0) -> bool:
+        """Store one event (producer side); False when it was dropped because the ring
+        is full.
+        """
+        index = self.write_index
+        if index - self.read_index >= self.capacity:
+            self.dropped += 1
+            return False
+        slot = index % self.capacity
+        self._times[slot] = time.monotonic()
+        self._codes[slot] = code
+        self._values[slot] = value
+        # Se publica al final: el consumidor nunca ve un evento a medio escribir
+        self.write_index = index + 1
+        return True
+
+    def drain(self) -> tuple[list[tuple[float, int, int]], int]:
+        """Take the pending events (consumer side) and how many were dropped since the
+        last drain.
+        """
+        start, end = self.read_index, self.write_index
+        events = []
+        for index in range(start, end):
+            slot = index % self.capacity
+            events.append(
+                (
+                    float(self._times[slot]),
+                    int(self._codes[slot]),
+                    int(self._values[slot]),
+                )
+            )
+        self.read_index = end
+        dropped = self.dropped
+        new_drops, self._dropped_seen = dropped - self._dropped_seen, dropped
+        return events, new_drops
+
+
+class RingReader:
+    """Independent read cursor over a FrameRing.
+
+    Mirrors the subset of the ``queue.Queue`` API the consumers use (``get`` raising
+    ``queue.Empty``), so switching from per-subscriber queues is transparent. Frames the
+    writer overwrote before this reader got to them are counted in ``overruns``.
+
+    A blocking ``get`` sleeps until the writer publishes the next frame. The writer
+    skips the wake-up when it cannot take the lock at once, so ``poll_interval`` (one
+    frame period in AudioStream) bounds how long a missed wake-up can delay a read; an
+    idle reader wakes at most once per ``poll_interval``.
+    """
+
+    def __init__(
+        self,
+        ring: FrameRing,
+        start_index: int,
+        poll_interval: float,
+        name: str = "",
+        device: str = "default",
+    ) -> None:
+        self.ring = ring
+        self.name = name or "anonymous"
+        self.device = device
+        self.cursor = start_index
+        self.poll_interval = poll_interval
+        self.overruns = 0
+        self.frames_read = 0
+        self.last_index = start_index - 1
+        self.closed = False
+
+    def get(self, block: bool = True, timeout: float | None = None) -> memoryview:
+        ring = self.ring
+        if self.cursor >= ring.write_index:
+            if not block:
+                raise queue.Empty
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self.cursor >= ring.write_index:
+                if self.closed:
+                    raise queue.Empty
+                wait = self.poll_interval
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        raise queue.Empty
+                ring.wait_for(self.cursor, wait, self)
+        lag = ring.write_index - self.cursor
+        if lag >= ring.capacity:
+            skipped = lag - ring.capacity + 1
+            self.overruns += skipped
+            self.cursor += skipped
+            metrics.counter(
+                "frames_dropped_total",
+                "Frames overwritten before a subscriber read them",
+                subscriber=self.name,
+                device=self.device,
+            ).inc(skipped)
+            logger.warning(
+                "Lector del buffer de audio desbordado: %s frames perdidos", skipped
+            )
+        index = self.cursor
+        self.cursor = index + 1
+        self.last_index = index
+        self.frames_read += 1
+        return ring.view(index)
+
+    def get_nowait(self) -> memoryview:
+        return self.get(block=False)
+
+    def qsize(self) -> int:
+        return max(0, self.ring.write_index - self.cursor)
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def close(self) -> None:
+        self.closed = True
+        self.ring.wake_readers()
+
+
+__all__ = ["EventRing", "FrameRing", "RingReader"]
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import dataclasses
+import queue
+import threading
+import uuid
+from typing import Callable
+
+try:
+    from loguru import logger
+except ImportError:  # pragma: no cover - fallback for testing
+
+    class _DummyLogger:
+        def __getattr__(self, name):
+            def _noop(*args, **kwargs):
+                pass
+
+            return _noop
+
+    logger = _DummyLogger()  # type: ignore[assignment]
+
+from .uploader import SEGMENT, SENT, SESSION_END, UNCERTAIN, Uploader, UploadMeta
+
+_FINISH = object()
+
+
+class SegmentedUploadSession:
+    """Uploads the segments of a recording while it is still being captured.
+
+    Segments share a ``session_id`` and carry an increasing ``segment_seq``; the
+    session is closed with a data-only ``session_end`` marker. Uploads run on a
+    worker thread so capture never waits on the network. Once a segment fails, it
+    and everything after it (marker included) go to the outbox, which replays them
+    in order.
+    """
+
+    def __init__(
+        self,
+        uploader: Uploader,
+        encode: Callable[[bytes], bytes],
+        wake_word: str,
+        timestamp_iso: str,
+        codec: str = "wav",
+        content_type: str = "audio/wav",
+        device_id: str | None = None,
+    ) -> None:
+        self.uploader = uploader
+        self.device_id = device_id
+        self.encode = encode
+        self.codec = codec
+        self.content_type = content_type
+        self.wake_word = wake_word
+        self.timestamp_iso = timestamp_iso
+        self.session_id = uuid.uuid4().hex
+        self.segments_sent = 0
+        self.segments_spooled = 0
+        self._next_seq = 0
+        self._spooling = False
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="SegmentUploader", daemon=True
+        )
+        self._thread.start()
+        logger.info("Sesión de subida progresiva %s iniciada", self.session_id)
+
+    def add_segment(self, pcm_bytes: bytes, duration_ms: int) -> None:
+        meta = self._meta(SEGMENT, duration_ms)
+        self._queue.put((pcm_bytes, meta))
+
+    def finish(self, total_duration_ms: int, timeout: float | None = None) -> bool:
+        """Queue the end-of-session marker and wait for the worker; True if nothing was
+        spooled.
+        """
+        self._queue.put((_FINISH, self._meta(SESSION_END, total_duration_ms)))
+        self._thread.join(timeout)
+        return not self._spooling
+
+    def _meta(self, event: str, duration_ms: int) -> UploadMeta:
+        meta = UploadMeta(
+            duration_ms=duration_ms,
+            wake_word=self.wake_word,
+            timestamp_iso=self.timestamp_iso,
+            session_id=self.session_id,
+            segment_seq=self._next_seq,
+            event=event,
+            codec=self.codec,
+            content_type=self.content_type,
+            device_id=self.device_id,
+        )
+        self._next_seq += 1
+        return meta
+
+    def _run(self) -> None:
+        while True:
+            pcm_bytes, meta = self._queue.get()
+            audio_bytes = None if pcm_bytes is _FINISH else self.encode(pcm_bytes)
+            if not self._spooling:
+                outcome = self.uploader.upload_outcome(
+                    audio_bytes, meta, enqueue_on_fail=False, notify=False
+                )
+                if outcome == SENT:
+                    self.segments_sent += 1
+                else:
+                    logger.warning(
+                        "Sesión %s: segmento %s fallido, pasando al outbox",
+                        self.session_id,
+                        meta.segment_seq,
+                    )
+                    self._spooling = True
+                    # El POST pudo llegar: el outbox confirmará antes de reenviar.
+                    meta = dataclasses.replace(
+                        meta, delivery_unknown=outcome == UNCERTAIN
+                    )
+            if self._spooling:
+                self.uploader.enqueue_job(audio_bytes, meta)
+                self.segments_spooled += 1
+            if pcm_bytes is _FINISH:
+                logger.info(
+                    "Sesión %s cerrada (%s enviados, %s encolados)",
+                    self.session_id,
+                    self.segments_sent,
+                    self.segments_spooled,
+                )
+                return
+
+
+__all__ = ["SegmentedUploadSession"]
@@ -7,13 +7,6 @@ from typing import Callable
 
 from loguru import logger
 
-try:  # pragma: no cover - UI component
-    from PIL import Image
-    import pystray
-except Exception:  # pragma: no cover - fallback when dependencies missing
-    Image = None
-    pystray = None
-
 
 class TrayIcon:  # pragma: no cover - requires Windows environment
     def __init__(
@@ -23,6 +16,7 @@ class TrayIcon:  # pragma: no cover - requires Windows environment
         toggle_listening: Callable[[], None],
         test_microphone: Callable[[], None],
         open_logs: Callable[[], None],
+        profile_cpu: Callable[[], object],
         on_exit: Callable[[], None],
     ) -> None:
         self.icon_path = icon_path
@@ -30,26 +24,38 @@ class TrayIcon:  # pragma: no cover - requires Windows environment
         self.toggle_listening = toggle_listening
         self.test_microphone = test_microphone
         self.open_logs = open_logs
+        self.profile_cpu = profile_cpu
         self.on_exit = on_exit
-        self.icon: pystray.Icon | None = None
+        self.status = "Iniciando..."
+        self.icon = None
+
+    def _build_icon(self) -> None:
+        # pystray y PIL solo se importan al mostrar el icono, no al cargar la app
+        try:
+            import pystray
+            from PIL import Image
+        except Exception:  # pragma: no cover - fallback when dependencies missing
+            Image = None  # noqa: N806
+            pystray = None
         if pystray and Image:
-            image = self._load_image(icon_path)
+            image = self._load_image(Image, self.icon_path)
             self.icon = pystray.Icon(
                 "Kay Listener",
                 image,
-                "Kay Listener",
+                f"Kay Listener - {self.status}",
                 menu=pystray.Menu(
+                    pystray.MenuItem(lambda item: self.status, None, enabled=False),
                     pystray.MenuItem(lambda item: self._toggle_label(), self._on_toggle),
                     pystray.MenuItem("Probar micrófono", self._on_test),
                     pystray.MenuItem("Abrir carpeta logs", self._on_open_logs),
+                    pystray.MenuItem("Perfilar CPU", self._on_profile),
                     pystray.MenuItem("Salir", self._on_exit),
                 ),
             )
         else:
             logger.warning("pystray o PIL no disponibles, no se creará icono de bandeja")
 
-    def _load_image(self, icon_path: Path | None):
-        assert Image is not None  # pragma: no cover - guarded in __init__
+    def _load_image(self, Image, icon_path: Path | None):  # noqa: N803 - PIL module
         if icon_path and icon_path.exists():
             try:
                 return Image.open(icon_path)
@@ -58,6 +64,13 @@ class TrayIcon:  # pragma: no cover - requires Windows environment
         logger.info("Usando icono de bandeja por defecto")
         return Image.new("RGBA", (64, 64), (40, 40, 40, 255))
 
+    def set_status(self, status: str) -> None:
+        """Show ``status`` as the tooltip and the first (disabled) menu entry."""
+        self.status = status
+        if self.icon:
+            self.icon.title = f"Kay Listener - {status}"
+            self.icon.update_menu()
+
     def _toggle_label(self) -> str:
         return "Pausar escucha" if self.is_listening() else "Iniciar escucha"
 
@@ -70,12 +83,17 @@ class TrayIcon:  # pragma: no cover - requires Windows environment
     def _on_open_logs(self, icon, item) -> None:
         self.open_logs()
 
+    def _on_profile(self, icon, item) -> None:
+        self.profile_cpu()
+
     def _on_exit(self, icon, item) -> None:
         self.on_exit()
         if self.icon:
             self.icon.stop()
 
     def run(self) -> None:
+        if self.icon is None:
+            self._build_icon()
         if self.icon:
             self.icon.run_detached()
 
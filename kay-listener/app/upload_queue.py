@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Callable, Optional
+
+try:
+    from loguru import logger
+except ImportError:  # pragma: no cover - fallback for testing
+
+    class _DummyLogger:
+        def __getattr__(self, name):
+            def _noop(*args, **kwargs):
+                pass
+
+            return _noop
+
+    logger = _DummyLogger()  # type: ignore[assignment]
+
+from .metrics import metrics
+from .uploader import AudioPayload, Uploader, UploadMeta
+
+_STOP = object()
+
+
+class UploadQueue:
+    """Bounded hand-off between the recorder threads and the network.
+
+    Finished recordings are uploaded by ``workers`` background threads, so a
+    slow or unreachable webhook never keeps the microphone busy. When the queue
+    is full, or after ``stop()``, recordings go straight to the outbox instead.
+    """
+
+    def __init__(self, uploader: Uploader, workers: int = 2, maxsize: int = 8) -> None:
+        self.uploader = uploader
+        self.workers = max(1, workers)
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+        self._threads: list[threading.Thread] = []
+        self._closed = False
+        self._lock = threading.Lock()
+        metrics.gauge(
+            "upload_queue_depth", "Recordings waiting for an upload worker"
+        ).set_function(self._queue.qsize)
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        for position in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"UploadWorker-{position}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def submit(
+        self,
+        audio: AudioPayload,
+        meta: UploadMeta,
+        on_sent: Optional[Callable[[], None]] = None,
+    ) -> bool:
+        """Queue one recording for upload; False if it had to go to the outbox instead.
+
+        The queue owns ``audio`` from here on, like ``Uploader.upload`` does for files.
+        """
+        with self._lock:
+            if not self._closed:
+                try:
+                    self._queue.put_nowait((audio, meta, on_sent))
+                    return True
+                except queue.Full:
+                    reason = "full"
+            else:
+                reason = "closed"
+        logger.warning(
+            "Cola de subida %s: grabación al outbox",
+            "llena" if reason == "full" else "cerrada",
+        )
+        self._spill(audio, meta, reason)
+        return False
+
+    def join(self) -> None:
+        """Wait until every queued recording has been uploaded or spooled."""
+        self._queue.join()
+
+    def stop(self, timeout: float = 5.0) -> int:
+        """Move recordings still waiting to the outbox and stop the workers; returns how
+        many were moved.
+        """
+        with self._lock:
+            if self._closed:
+                return 0
+            self._closed = True
+        spilled = 0
+        while True:
+            try:
+                audio, meta, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._spill(audio, meta, "closed")
+            self._queue.task_done()
+            spilled += 1
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+        if spilled:
+            logger.info("%s grabaciones pendientes de subir pasan al outbox", spilled)
+        return spilled
+
+    def _spill(self, audio: AudioPayload, meta: UploadMeta, reason: str) -> None:
+        metrics.counter(
+            "upload_queue_spilled_total",
+            "Recordings sent to the outbox without an upload attempt",
+            reason=reason,
+        ).inc()
+        self.uploader.enqueue_job(audio, meta)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                audio, meta, on_sent = item
+                if self.uploader.upload(audio, meta):
+                    logger.info("Grabación enviada (%sms)", meta.duration_ms)
+                    if on_sent is not None:
+                        on_sent()
+                else:
+                    logger.info("Grabación encolada (%sms)", meta.duration_ms)
+            except Exception as exc:
+                logger.exception("Error en el worker de subida: %s", exc)
+            finally:
+                self._queue.task_done()
+
+
+__all__ = ["UploadQueue"]
@@ -1,25 +1,12 @@
 from __future__ import annotations
 
-try:
-    import requests
-except ImportError:  # pragma: no cover - fallback for testing
-    class _RequestsFallback:
-        class RequestException(Exception):
-            pass
-
-        class ConnectionError(RequestException):
-            pass
-
-        class Session:  # type: ignore[override]
-            def post(self, *args, **kwargs):
-                raise NotImplementedError("Requests no disponible")
-
-    requests = _RequestsFallback()  # type: ignore[assignment]
-
+import dataclasses
+import hashlib
+import json
 import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import IO, TYPE_CHECKING, Optional, Union
 
 try:
     from loguru import logger
@@ -31,10 +18,70 @@ except ImportError:  # pragma: no cover - fallback for testing
 
             return _noop
 
-    logger = _DummyLogger()
+    logger = _DummyLogger()  # type: ignore[assignment]
 
 from .config import AppConfig
-from .utils import NotificationManager, load_json, outbox_dir, save_json
+from .journal import JournalJob, OutboxJournal
+from .metrics import metrics
+from .utils import NotificationManager, dead_letter_dir, outbox_dir
+
+if TYPE_CHECKING:
+    import requests
+
+    from .outbox import DrainReport
+
+
+class _RequestsFallback:
+    class RequestException(Exception):
+        pass
+
+    class ConnectionError(RequestException):
+        pass
+
+    class ReadTimeout(RequestException):
+        pass
+
+    class Session:  # type: ignore[override]
+        def post(self, *args, **kwargs):
+            raise NotImplementedError("Requests no disponible")
+
+
+_requests = None
+
+
+def load_requests():
+    """Import requests on first use: it is one of the slowest imports of the app."""
+    global _requests
+    if _requests is None:
+        try:
+            import requests as module
+        except ImportError:  # pragma: no cover - fallback for testing
+            module = _RequestsFallback()
+        _requests = module
+    return _requests
+
+
+def __getattr__(name: str):
+    # ``from app.uploader import requests`` funciona sin importarlo al cargar el módulo
+    if name == "requests":
+        return load_requests()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+SEGMENT = "segment"
+SESSION_END = "session_end"
+SENT = "sent"
+RETRY = "retry"
+REJECTED = "rejected"
+# El servidor pudo recibir el envío sin que llegara la respuesta (timeout de lectura,
+UNCERTAIN = "uncertain"
+DELIVERY_CHECK = "delivery_check"
+_EXTENSIONS = {"audio/flac": "flac"}
+# Respuestas con las que el servidor indica que no tiene endpoint de lotes
+BATCH_UNSUPPORTED_STATUS = {404, 405, 410, 415, 501}
+
+# Audio codificado en memoria o un archivo ya terminado (grabación larga volcada)
+AudioPayload = Union[bytes, Path]
 
 
 @dataclass
@@ -42,14 +89,128 @@ class UploadMeta:
     duration_ms: int
     wake_word: str
     timestamp_iso: str
+    session_id: Optional[str] = None
+    segment_seq: Optional[int] = None
+    event: str = "recording"
+    codec: str = "wav"
+    content_type: str = "audio/wav"
+    device_id: Optional[str] = None
+    original_duration_ms: Optional[int] = None
+    content_sha256: Optional[str] = None
+    idempotency_key: Optional[str] = None
+    delivery_unknown: bool = False
 
     def to_payload(self) -> dict[str, str]:
-        return {
+        payload = {
             "source": "desktop-kay",
             "timestamp_iso": self.timestamp_iso,
             "wake_word": self.wake_word,
             "duration_ms": str(self.duration_ms),
+            "codec": self.codec,
         }
+        if self.device_id:
+            payload["device_id"] = self.device_id
+        if self.original_duration_ms is not None:
+            payload["original_duration_ms"] = str(self.original_duration_ms)
+        if self.idempotency_key:
+            payload["idempotency_key"] = self.idempotency_key
+            payload["content_sha256"] = self.content_sha256 or ""
+        if self.session_id:
+            payload["session_id"] = self.session_id
+            payload["segment_seq"] = str(self.segment_seq)
+            payload["event"] = self.event
+        return payload
+
+    @property
+    def has_audio(self) -> bool:
+        return self.event != SESSION_END
+
+    @property
+    def file_extension(self) -> str:
+        return _EXTENSIONS.get(self.content_type, "wav")
+
+    def to_dict(self) -> dict:
+        return {
+            "duration_ms": self.duration_ms,
+            "wake_word": self.wake_word,
+            "timestamp_iso": self.timestamp_iso,
+            "session_id": self.session_id,
+            "segment_seq": self.segment_seq,
+            "event": self.event,
+            "codec": self.codec,
+            "content_type": self.content_type,
+            "device_id": self.device_id,
+            "original_duration_ms": self.original_duration_ms,
+            "content_sha256": self.content_sha256,
+            "idempotency_key": self.idempotency_key,
+            "delivery_unknown": self.delivery_unknown,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict, default_wake_word: str = "") -> UploadMeta:
+        segment_seq = payload.get("segment_seq")
+        return cls(
+            duration_ms=int(payload.get("duration_ms", 0)),
+            wake_word=str(payload.get("wake_word", default_wake_word)),
+            timestamp_iso=str(payload.get("timestamp_iso", "")),
+            session_id=payload.get("session_id"),
+            segment_seq=None if segment_seq is None else int(segment_seq),
+            event=str(payload.get("event", "recording")),
+            codec=str(payload.get("codec", "wav")),
+            content_type=str(payload.get("content_type", "audio/wav")),
+            device_id=payload.get("device_id"),
+            original_duration_ms=payload.get("original_duration_ms"),
+            content_sha256=payload.get("content_sha256"),
+            idempotency_key=payload.get("idempotency_key"),
+            delivery_unknown=bool(payload.get("delivery_unknown", False)),
+        )
+
+    def with_idempotency_key(self, audio: AudioPayload | None) -> UploadMeta:
+        """Copy carrying the audio's SHA-256 and a key that identifies this exact
+        upload.
+        """
+        if self.idempotency_key:
+            return self
+        content = content_digest(audio)
+        identity = "|".join(
+            [
+                content,
+                self.timestamp_iso,
+                self.device_id or "",
+                self.session_id or "",
+                "" if self.segment_seq is None else str(self.segment_seq),
+                self.event,
+            ]
+        )
+        key = hashlib.sha256(identity.encode("utf-8")).hexdigest()[:32]
+        return dataclasses.replace(self, content_sha256=content, idempotency_key=key)
+
+
+def content_digest(audio: AudioPayload | None) -> str:
+    """SHA-256 of the encoded audio; files are hashed in chunks, without loading them
+    whole.
+    """
+    digest = hashlib.sha256()
+    if isinstance(audio, Path):
+        with open(audio, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                digest.update(chunk)
+    elif audio is not None:
+        digest.update(audio)
+    return digest.hexdigest()
+
+
+def _maybe_delivered(requests, exc: Exception) -> bool:
+    """True for failures after the request body may already have reached the server."""
+    ambiguous = tuple(
+        error
+        for error in (
+            getattr(requests, "ReadTimeout", None),
+            getattr(requests, "ChunkedEncodingError", None),
+        )
+        if error
+    )
+    return bool(ambiguous) and isinstance(exc, ambiguous)
 
 
 class UploadError(Exception):
@@ -62,94 +223,393 @@ class Uploader:
         config: AppConfig,
         notifier: NotificationManager,
         session: Optional[requests.Session] = None,
+        journal: Optional[OutboxJournal] = None,
     ) -> None:
         self.config = config
         self.notifier = notifier
-        self.session = session or requests.Session()
-        self._outbox = outbox_dir()
+        self._session = session
+        self.journal = journal or OutboxJournal(
+            outbox_dir(),
+            dead_letter=dead_letter_dir(),
+            quota_bytes=int(config.outbox_quota_mb * 1024 * 1024),
+            eviction=config.outbox_eviction,
+        )
+        self._outbox = self.journal.directory
+        # Se desactiva en cuanto el servidor responde que no admite lotes
+        self.batch_supported = bool(config.webhook_batch_url)
+        self.delivery_check_supported = config.delivery_check
+        journal = self.journal
+        metrics.gauge("outbox_jobs", "Jobs waiting in the outbox").set_function(
+            journal.pending_count
+        )
+        metrics.gauge("outbox_bytes", "Audio bytes waiting in the outbox").set_function(
+            journal.pending_bytes
+        )
+        metrics.gauge(
+            "outbox_oldest_age_seconds", "Age of the oldest outbox job"
+        ).set_function(
+            lambda: time.time() - (journal.oldest_created_at() or time.time())
+        )
 
-    def upload(self, audio_bytes: bytes, meta: UploadMeta, *, enqueue_on_fail: bool = True) -> bool:
-        if not self.config.webhook_url:
-            logger.warning("WEBHOOK_URL no configurada. Encolando automáticamente.")
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            self._session = load_requests().Session()
+        return self._session
+
+    @session.setter
+    def session(self, session: requests.Session) -> None:
+        self._session = session
+
+    def upload(
+        self,
+        audio: AudioPayload | None,
+        meta: UploadMeta,
+        *,
+        enqueue_on_fail: bool = True,
+        notify: bool = True,
+    ) -> bool:
+        """POST one recording (or a data-only session marker when ``audio`` is None).
+
+        When ``audio`` is a file and ``enqueue_on_fail`` is set, the uploader owns it:
+        the file is moved into the outbox on failure and removed otherwise.
+        """
+        outcome = self.upload_outcome(
+            audio, meta, enqueue_on_fail=enqueue_on_fail, notify=notify
+        )
+        return outcome == SENT
+
+    def upload_outcome(
+        self,
+        audio: AudioPayload | None,
+        meta: UploadMeta,
+        *,
+        enqueue_on_fail: bool = True,
+        notify: bool = True,
+    ) -> str:
+        """Like ``upload`` but returns SENT, RETRY, UNCERTAIN or REJECTED, so a
+        caller that spools the payload itself knows whether to mark it
+        ``delivery_unknown``.
+        """
+        try:
+            meta = meta.with_idempotency_key(audio)
+            if not self.config.webhook_url:
+                logger.warning("WEBHOOK_URL no configurada. Encolando automáticamente.")
+                if enqueue_on_fail:
+                    self.enqueue_job(audio, meta)
+                return RETRY
+
+            status = self.send(
+                audio, meta, attempts=self.config.max_retry_attempts, notify=notify
+            )
+            if status in (SENT, REJECTED):
+                return status
+
+            logger.error("No se pudo subir el audio tras varios intentos. Encolando.")
+            if notify:
+                self.notifier.show("Kay Listener", "Audio encolado por error de red")
             if enqueue_on_fail:
-                self.enqueue_job(audio_bytes, meta)
-            return False
+                self.enqueue_job(
+                    audio,
+                    dataclasses.replace(meta, delivery_unknown=status == UNCERTAIN),
+                )
+            return status
+        finally:
+            if enqueue_on_fail and isinstance(audio, Path):
+                audio.unlink(missing_ok=True)
 
-        for attempt in range(1, self.config.max_retry_attempts + 1):
+    def send(
+        self,
+        audio: AudioPayload | None,
+        meta: UploadMeta,
+        *,
+        attempts: int = 1,
+        notify: bool = True,
+    ) -> str:
+        """Try the POST up to ``attempts`` times; returns SENT, RETRY, UNCERTAIN or
+        REJECTED.
+
+        UNCERTAIN means some attempt may have reached the server. A retry after such
+        an attempt first asks the server whether it already has the recording
+        (``confirm_delivery``) instead of sending the audio again.
+        """
+        requests = load_requests()
+        request_seconds = metrics.histogram(
+            "upload_request_seconds", "Duration of one webhook POST"
+        )
+        uncertain = meta.delivery_unknown
+        for attempt in range(1, attempts + 1):
+            if uncertain and self.confirm_delivery(meta):
+                self._acknowledged(meta)
+                metrics.counter("uploads_total", "Upload outcomes", result=SENT).inc()
+                return SENT
+            audio_file: Optional[IO[bytes]] = None
+            started = time.monotonic()
             try:
-                response = self.session.post(
-                    self.config.webhook_url,
-                    files={
+                files = None
+                if audio is not None:
+                    if isinstance(audio, Path):
+                        audio_file = open(audio, "rb")
+                        content: IO[bytes] | bytes = audio_file
+                    else:
+                        content = audio
+                    files = {
                         "audio": (
-                            "recording.wav",
-                            audio_bytes,
-                            "audio/wav",
+                            f"recording.{meta.file_extension}",
+                            content,
+                            meta.content_type,
                         )
-                    },
+                    }
+                response = self.session.post(
+                    self.config.webhook_url,
+                    files=files,
                     data=meta.to_payload(),
                     timeout=15,
                 )
+                request_seconds.observe(time.monotonic() - started)
                 if 200 <= response.status_code < 300:
+                    self._acknowledged(meta)
                     logger.info("Audio enviado correctamente (%s)", response.status_code)
-                    self.notifier.show("Kay Listener", f"Audio enviado ({response.status_code})")
-                    return True
+                    if notify:
+                        self.notifier.show(
+                            "Kay Listener", f"Audio enviado ({response.status_code})"
+                        )
+                    metrics.counter(
+                        "uploads_total", "Upload outcomes", result=SENT
+                    ).inc()
+                    return SENT
                 if response.status_code >= 500:
                     raise UploadError(f"Error del servidor {response.status_code}")
                 else:
                     logger.error("Error permanente %s: %s", response.status_code, response.text)
-                    self.notifier.show("Kay Listener", f"Error al subir: {response.status_code}")
-                    return False
+                    if notify:
+                        self.notifier.show(
+                            "Kay Listener", f"Error al subir: {response.status_code}"
+                        )
+                    metrics.counter(
+                        "uploads_total", "Upload outcomes", result=REJECTED
+                    ).inc()
+                    return REJECTED
             except (requests.RequestException, UploadError) as exc:
+                uncertain = uncertain or _maybe_delivered(requests, exc)
                 wait_time = 2 ** (attempt - 1)
                 logger.warning("Intento %s fallido al subir audio: %s", attempt, exc)
-                if attempt == self.config.max_retry_attempts:
+                metrics.counter(
+                    "upload_failed_attempts_total",
+                    "Webhook POSTs that failed with a network or 5xx error",
+                ).inc()
+                if attempt == attempts:
                     break
                 time.sleep(wait_time)
+            finally:
+                if audio_file is not None:
+                    audio_file.close()
+        status = UNCERTAIN if uncertain else RETRY
+        metrics.counter("uploads_total", "Upload outcomes", result=status).inc()
+        return status
 
-        logger.error("No se pudo subir el audio tras varios intentos. Encolando.")
-        self.notifier.show("Kay Listener", "Audio encolado por error de red")
-        if enqueue_on_fail:
-            self.enqueue_job(audio_bytes, meta)
-        return False
-
-    def enqueue_job(self, audio_bytes: bytes, meta: UploadMeta) -> Path:
-        timestamp = int(time.time())
-        base_name = f"job_{timestamp}_{int(time.time() * 1000)}"
-        wav_path = self._outbox / f"{base_name}.wav"
-        meta_path = self._outbox / f"{base_name}.json"
-        wav_path.write_bytes(audio_bytes)
-        save_json(
-            meta_path,
-            {
-                "duration_ms": meta.duration_ms,
-                "wake_word": meta.wake_word,
-                "timestamp_iso": meta.timestamp_iso,
-            },
-        )
-        logger.info("Envío encolado en %s", wav_path)
-        return wav_path
+    def confirm_delivery(self, meta: UploadMeta) -> bool | None:
+        """Ask the webhook whether it already stored ``meta.idempotency_key``, without
+        sending audio.
 
-    def process_outbox_once(self) -> None:
-        for json_file in sorted(self._outbox.glob("*.json")):
-            try:
-                payload = load_json(json_file)
-            except Exception as exc:
-                logger.error("No se pudo leer %s: %s", json_file, exc)
-                continue
-            wav_path = json_file.with_suffix(".wav")
-            if not wav_path.exists():
-                logger.warning("Archivo WAV faltante para %s", json_file)
-                json_file.unlink(missing_ok=True)
-                continue
-            meta = UploadMeta(
-                duration_ms=int(payload.get("duration_ms", 0)),
-                wake_word=str(payload.get("wake_word", self.config.wake_word)),
-                timestamp_iso=str(payload.get("timestamp_iso", "")),
+        The server answers ``{"delivered": true|false}``. Returns None when the
+        check is disabled, fails or the server does not implement it.
+        """
+        if not (self.delivery_check_supported and meta.idempotency_key):
+            return None
+        requests = load_requests()
+        data = {
+            "source": "desktop-kay",
+            "event": DELIVERY_CHECK,
+            "idempotency_key": meta.idempotency_key,
+            "content_sha256": meta.content_sha256 or "",
+        }
+        try:
+            response = self.session.post(self.config.webhook_url, data=data, timeout=15)
+        except requests.RequestException as exc:
+            logger.debug("Comprobación de entrega fallida: %s", exc)
+            return None
+        try:
+            delivered = (
+                json.loads(response.text)["delivered"]
+                if response.status_code == 200
+                else None
+            )
+        except (ValueError, KeyError, TypeError):
+            delivered = None
+        if not isinstance(delivered, bool):
+            if response.status_code < 500:
+                logger.info(
+                    "El servidor no admite comprobaciones de entrega (%s)",
+                    response.status_code,
+                )
+                self.delivery_check_supported = False
+            return None
+        metrics.counter(
+            "delivery_checks_total",
+            "Delivery checks before re-sending",
+            result="delivered" if delivered else "missing",
+        ).inc()
+        if delivered:
+            logger.info(
+                "El servidor ya tenía el envío %s: no se reenvía el audio",
+                meta.idempotency_key,
+            )
+        return delivered
+
+    def _acknowledged(self, meta: UploadMeta) -> None:
+        if meta.idempotency_key:
+            self.journal.mark_delivered(meta.idempotency_key)
+
+    def send_batch(
+        self, items: list[tuple[str, AudioPayload | None, UploadMeta]]
+    ) -> dict[str, str] | None:
+        """POST several jobs in one multipart request to ``WEBHOOK_BATCH_URL``.
+
+        ``items`` are ``(item_id, audio, meta)``. The request carries a ``manifest``
+        field (JSON: one entry per item with its id, metadata and the name of its audio
+        part) plus one ``audio_<n>`` file part per item with audio. The server answers
+        ``{"results": [{"id": ..., "status": <http status>}]}``; the return value maps
+        each id to SENT, RETRY, UNCERTAIN or REJECTED. Returns None when the server does
+        not take batches, so the caller falls back to one POST per job. A 2xx whose body
+        cannot be read may still have stored the clips: every item is then UNCERTAIN, so
+        each one is confirmed with the server before its audio goes again.
+        """
+        url = self.config.webhook_batch_url
+        if not url:
+            # Sin URL de lotes (p. ej. tras recargar
+            # la configuración): se envía uno a uno
+            self.batch_supported = False
+            return None
+        requests = load_requests()
+        manifest = []
+        files: list[tuple[str, tuple[str, IO[bytes] | bytes, str]]] = []
+        opened: list[IO[bytes]] = []
+        try:
+            for position, (item_id, audio, meta) in enumerate(items):
+                part = None
+                if audio is not None:
+                    part = f"audio_{position}"
+                    if isinstance(audio, Path):
+                        opened.append(open(audio, "rb"))
+                        content: IO[bytes] | bytes = opened[-1]
+                    else:
+                        content = audio
+                    files.append(
+                        (
+                            part,
+                            (
+                                f"{item_id}.{meta.file_extension}",
+                                content,
+                                meta.content_type,
+                            ),
+                        )
+                    )
+                manifest.append(
+                    {"id": item_id, "meta": meta.to_payload(), "part": part}
+                )
+            started = time.monotonic()
+            response = self.session.post(
+                url,
+                files=files or None,
+                data={
+                    "source": "desktop-kay",
+                    "manifest": json.dumps(manifest, ensure_ascii=False),
+                },
+                timeout=60,
+            )
+            metrics.histogram(
+                "upload_batch_request_seconds", "Duration of one batched webhook POST"
+            ).observe(time.monotonic() - started)
+        except requests.RequestException as exc:
+            logger.warning("Envío por lotes fallido (%s trabajos): %s", len(items), exc)
+            # Igual que en send(): si el lote pudo llegar,
+            # cada trabajo se comprueba antes de reenviarlo
+            failed = UNCERTAIN if _maybe_delivered(requests, exc) else RETRY
+            return self._count_outcomes({item_id: failed for item_id, _, _ in items})
+        finally:
+            for audio_file in opened:
+                audio_file.close()
+        if response.status_code in BATCH_UNSUPPORTED_STATUS:
+            logger.warning(
+                "El servidor no admite envíos por lotes (%s): se envía uno a uno",
+                response.status_code,
             )
-            logger.info("Reintentando envío desde outbox: %s", wav_path)
-            success = self.upload(wav_path.read_bytes(), meta, enqueue_on_fail=False)
-            if success:
-                wav_path.unlink(missing_ok=True)
-                json_file.unlink(missing_ok=True)
-            else:
-                break
+            self.batch_supported = False
+            return None
+        if response.status_code >= 500:
+            logger.warning(
+                "Error del servidor %s en envío por lotes", response.status_code
+            )
+            return self._count_outcomes({item_id: RETRY for item_id, _, _ in items})
+        if not 200 <= response.status_code < 300:
+            # Otros 4xx (p. ej. 413 por tamaño): este
+            # lote se reintenta trabajo a trabajo
+            logger.warning(
+                "Lote rechazado (%s): se envía uno a uno", response.status_code
+            )
+            return None
+        try:
+            results = {
+                str(entry["id"]): int(entry["status"])
+                for entry in json.loads(response.text)["results"]
+            }
+        except (ValueError, KeyError, TypeError) as exc:
+            # El servidor aceptó la petición: reenviar
+            # ahora podría duplicar clips ya guardados
+            logger.warning(
+                "Respuesta de lote no válida (%s): "
+                "se comprobará cada trabajo antes de reenviarlo",
+                exc,
+            )
+            self.batch_supported = False
+            return self._count_outcomes({item_id: UNCERTAIN for item_id, _, _ in items})
+        outcomes = {}
+        for item_id, _, meta in items:
+            status = results.get(item_id, 503)
+            outcomes[item_id] = (
+                SENT
+                if 200 <= status < 300
+                else REJECTED
+                if 400 <= status < 500
+                else RETRY
+            )
+            if outcomes[item_id] == SENT:
+                self._acknowledged(meta)
+        logger.info("Lote de %s trabajos enviado", len(items))
+        return self._count_outcomes(outcomes)
+
+    def _count_outcomes(self, outcomes: dict[str, str]) -> dict[str, str]:
+        """Count each batch item under the result the outbox will act on."""
+        for outcome in (SENT, RETRY, UNCERTAIN, REJECTED):
+            count = sum(1 for value in outcomes.values() if value == outcome)
+            if count:
+                metrics.counter("uploads_total", "Upload outcomes", result=outcome).inc(
+                    count
+                )
+        return outcomes
+
+    def enqueue_job(
+        self, audio: AudioPayload | None, meta: UploadMeta
+    ) -> JournalJob | None:
+        meta = meta.with_idempotency_key(audio)
+        job = self.journal.add(
+            audio, meta.to_dict(), extension=meta.file_extension, lane=meta.session_id
+        )
+        if job is not None:
+            metrics.counter("outbox_enqueued_total", "Jobs written to the outbox").inc()
+            logger.info("Envío encolado en %s", job.name)
+        return job
+
+    def process_outbox_once(self) -> DrainReport:
+        from .outbox import OutboxDrainer  # Lazy import to avoid cycles
+
+        drainer = OutboxDrainer(
+            self,
+            workers=self.config.outbox_workers,
+            max_attempts=self.config.outbox_max_attempts,
+            backoff_seconds=self.config.outbox_backoff_seconds,
+            batch_max_items=self.config.outbox_batch_max_items,
+            batch_max_bytes=int(self.config.outbox_batch_max_mb * 1024 * 1024),
+        )
+        return drainer.drain_once()
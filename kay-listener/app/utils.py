@@ -16,10 +16,11 @@ except ImportError:  # pragma: no cover - fallback for testing
                 pass
             return _noop
 
-    logger = _DummyLogger()
+    logger = _DummyLogger()  # type: ignore[assignment]
 
 
 from .config import project_root
+from .metrics import metrics
 
 
 class NotificationManager:
@@ -45,8 +46,9 @@ class NotificationManager:
             logger.warning("No se pudo mostrar notificación: %s", exc)
 
 
-def timestamp_iso() -> str:
-    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+def timestamp_iso(epoch: float | None = None) -> str:
+    """UTC timestamp of ``epoch`` (now by default) in ISO 8601."""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch))
 
 
 def base_dir() -> Path:
@@ -63,6 +65,33 @@ def outbox_dir() -> Path:
     return directory
 
 
+def recording_spill_dir() -> Path:
+    # Junto al outbox, en el mismo disco: encolar una grabación larga es un rename
+    directory = base_dir() / "recording_tmp"
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def remove_stale_spill_files(directory: Path | None = None) -> int:
+    """Delete recordings left in ``recording_tmp`` by a crash; returns how many were
+    removed.
+
+    Only the app calls this, once at startup: the batch tool, the benchmark or a second
+    instance share the folder and would otherwise delete a live recording.
+    """
+    removed = 0
+    for stale in (directory or recording_spill_dir()).glob("rec_*.wav"):
+        stale.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+def dead_letter_dir() -> Path:
+    directory = base_dir() / "dead_letter"
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
 def normalize_text(value: str) -> str:
     normalized = unicodedata.normalize("NFD", value)
     stripped = "".join(ch for ch in normalized if not unicodedata.combining(ch))
@@ -76,9 +105,12 @@ def normalize_wake_variants(variants: Iterable[str]) -> set[str]:
 class RepeatedTimer:
     """Simple repeated timer utility for the spooler."""
 
-    def __init__(self, interval: float, function, *args, **kwargs) -> None:
+    def __init__(
+        self, interval: float, function, *args, name: str = "SpoolerTimer", **kwargs
+    ) -> None:
         self.interval = interval
         self.function = function
+        self.name = name
         self.args = args
         self.kwargs = kwargs
         self._thread: threading.Thread | None = None
@@ -88,7 +120,7 @@ class RepeatedTimer:
         if self._thread and self._thread.is_alive():
             return
         self._stop_event.clear()
-        self._thread = threading.Thread(target=self._run, name="SpoolerTimer", daemon=True)
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
         self._thread.start()
 
     def _run(self) -> None:
@@ -106,6 +138,32 @@ class RepeatedTimer:
             self._thread = None
 
 
+class StartupTimer:
+    """Records how long each startup phase took, in the log and as metrics."""
+
+    def __init__(self, started: float | None = None) -> None:
+        self.started = time.perf_counter() if started is None else started
+        self.phases: dict[str, float] = {}
+        self._last = self.started
+
+    def mark(self, phase: str) -> float:
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._last = now
+        self.phases[phase] = elapsed
+        metrics.gauge(
+            "startup_phase_seconds", "Duration of each startup phase", phase=phase
+        ).set(elapsed)
+        logger.info(
+            "Arranque: %s en %.2fs (total %.2fs)", phase, elapsed, now - self.started
+        )
+        return elapsed
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started
+
+
 def save_json(path: Path, data: dict) -> None:
     path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
 
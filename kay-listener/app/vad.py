@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import collections
+
+import numpy as np
+
+# Energía de referencia: seno a escala completa (0 dBFS) sobre int16
+_FULL_SCALE = 32768.0
+_ENERGY_FLOOR_DB = -100.0
+
+
+def frame_energy_dbfs(frames: np.ndarray) -> np.ndarray:
+    """RMS level in dBFS of each row of a 2-D int16 array (or of a single 1-D frame)."""
+    samples = np.asarray(frames, dtype=np.float32) / _FULL_SCALE
+    mean_square = np.mean(samples * samples, axis=-1)
+    return 10.0 * np.log10(np.maximum(mean_square, 10 ** (_ENERGY_FLOOR_DB / 10)))
+
+
+class SpeechGate:
+    """Cheap two-stage speech gate placed in front of the wake word recognizer.
+
+    Stage one compares the frame energy with an adaptive noise floor; only frames
+    that clear it are checked by webrtcvad. When the gate opens, the last
+    ``lookback_ms`` of audio is released first so the recognizer sees the onset,
+    and it stays open for ``hangover_ms`` after the last speech frame so Vosk gets
+    the trailing silence it needs to close a result.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        frame_duration_ms: int,
+        aggressiveness: int = 2,
+        margin_db: float = 6.0,
+        min_energy_dbfs: float = -55.0,
+        hangover_ms: int = 400,
+        lookback_ms: int = 300,
+        noise_adapt: float = 0.05,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.margin_db = margin_db
+        self.min_energy_dbfs = min_energy_dbfs
+        self.noise_adapt = noise_adapt
+        self.hangover_frames = max(1, hangover_ms // frame_duration_ms)
+        self.noise_floor_db = min_energy_dbfs
+        self.is_open = False
+        self.frames_seen = 0
+        self.frames_passed = 0
+        self._hangover = 0
+        self._lookback: collections.deque[bytes] = collections.deque(
+            maxlen=max(0, lookback_ms // frame_duration_ms)
+        )
+        self._vad = self._create_vad(aggressiveness)
+
+    @staticmethod
+    def _create_vad(aggressiveness: int):
+        try:
+            import webrtcvad  # Lazy import: pulls in pkg_resources
+        except ImportError:  # pragma: no cover - fallback for testing
+            return None
+        return webrtcvad.Vad(aggressiveness)
+
+    def set_aggressiveness(self, aggressiveness: int) -> None:
+        self._vad = self._create_vad(aggressiveness)
+
+    @property
+    def pass_ratio(self) -> float:
+        return self.frames_passed / self.frames_seen if self.frames_seen else 0.0
+
+    def reset(self) -> None:
+        self.is_open = False
+        self._hangover = 0
+        self._lookback.clear()
+
+    def is_speech(self, frame) -> bool:
+        samples = np.frombuffer(frame, dtype=np.int16)
+        energy = float(frame_energy_dbfs(samples))
+        speech = energy >= max(
+            self.min_energy_dbfs, self.noise_floor_db + self.margin_db
+        )
+        if speech and self._vad is not None:
+            try:
+                speech = self._vad.is_speech(bytes(frame), self.sample_rate)
+            except Exception:
+                speech = True
+        if not speech:
+            # Solo el audio que no parece voz alimenta la estimación del ruido de fondo
+            if energy < self.noise_floor_db:
+                self.noise_floor_db = energy
+            else:
+                self.noise_floor_db += self.noise_adapt * (energy - self.noise_floor_db)
+        return speech
+
+    def process(self, frame) -> list[bytes]:
+        """Return the frames (possibly none) that should reach the recognizer."""
+        self.frames_seen += 1
+        if self.is_speech(frame):
+            self._hangover = self.hangover_frames
+            if not self.is_open:
+                self.is_open = True
+                released = list(self._lookback) + [bytes(frame)]
+                self._lookback.clear()
+                self.frames_passed += len(released)
+                return released
+        elif self.is_open:
+            self._hangover -= 1
+            if self._hangover <= 0:
+                self.is_open = False
+        if self.is_open or self._hangover > 0:
+            self.frames_passed += 1
+            return [bytes(frame)]
+        self._lookback.append(bytes(frame))
+        return []
+
+
+__all__ = ["SpeechGate", "frame_energy_dbfs"]
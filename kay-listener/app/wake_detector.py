@@ -1,19 +1,44 @@
 from __future__ import annotations
 
+import collections
 import json
 import queue
 import threading
+import time
 from pathlib import Path
-from typing import Callable
+from typing import TYPE_CHECKING, Callable, Collection
 
 from loguru import logger
-from vosk import KaldiRecognizer, Model
 
 from .audio_stream import AudioStream
 from .config import AppConfig
+from .metrics import metrics
 from .utils import normalize_text, normalize_wake_variants
+from .vad import SpeechGate
+
+if TYPE_CHECKING:
+    from vosk import KaldiRecognizer, Model
 
 WAKE_VARIANTS = ["oye kay", "oye kei", "oye key", "oye quey"]
+GATE_REPORT_FRAMES = 3000  # 60 s con frames de 20 ms
+
+_MODELS: dict[str, Model] = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def shared_model(model_path: Path) -> Model:
+    """Load each Vosk model once per process so every device's recognizer reuses it."""
+    key = str(Path(model_path).resolve())
+    with _MODELS_LOCK:
+        model = _MODELS.get(key)
+        if model is None:
+            from vosk import (
+                Model,  # Lazy import: la librería nativa solo se carga con el modelo
+            )
+
+            logger.info("Cargando modelo Vosk desde %s", model_path)
+            model = _MODELS[key] = Model(model_path=str(model_path))
+        return model
 
 
 class WakeDetector:
@@ -21,29 +46,185 @@ class WakeDetector:
         self,
         config: AppConfig,
         audio_stream: AudioStream,
-        on_wake: Callable[[], None],
-        model_path: Path,
+        on_wake: Callable[[int], None],
+        model_path: Path | None = None,
     ) -> None:
+        """Subscribe to ``audio_stream`` right away so audio is buffered while the model
+        loads.
+
+        ``on_wake`` receives the ring index of the first frame after the wake word.
+        ``model_path`` may be filled in later, before ``load()``/``start()``.
+        """
         self.config = config
         self.audio_stream = audio_stream
+        self.device_id = audio_stream.device_id
         self.on_wake = on_wake
         self.model_path = model_path
         self._model: Model | None = None
         self._recognizer: KaldiRecognizer | None = None
-        self._queue = audio_stream.subscribe()
+        self._queue = audio_stream.subscribe(name="wake")
+        # Frames pendientes de procesar por Vosk: cuánto va por detrás del micrófono
+        metrics.gauge(
+            "subscriber_queue_depth",
+            "Frames waiting in a ring subscriber",
+            subscriber="wake",
+            device=self.device_id,
+        ).set_function(self._queue.qsize)
+        self._feed_seconds = metrics.histogram(
+            "vosk_feed_seconds",
+            "Time Vosk takes to accept one batch of frames",
+            device=self.device_id,
+        )
+        self._partial_checks = metrics.counter(
+            "wake_partial_checks_total",
+            "PartialResult() calls on the recognizer",
+            device=self.device_id,
+        )
+        self._configure_batching()
+        self._pending = bytearray()
+        # Índice en el buffer circular de cada frame de _pending y de los últimos frames
+        # que recibió Vosk: traduce el fin de la wake word (segundos del flujo de Vosk)
+        # al frame donde empieza la orden
+        self._pending_indexes: list[int] = []
+        self._fed_indexes: collections.deque[int] = collections.deque(
+            maxlen=audio_stream.ring.capacity
+        )
+        self._fed_frames = 0
+        self._window_start: int | None = None
+        self._since_partial_ms = 0.0
+        self._degraded = False
+        self._degraded_gauge = metrics.gauge(
+            "wake_degraded",
+            "1 while the detector skips partials to catch up",
+            device=self.device_id,
+        )
         self._thread: threading.Thread | None = None
         self._stop_event = threading.Event()
         self._enabled = threading.Event()
         self._enabled.set()
-        self._wake_variants = normalize_wake_variants(WAKE_VARIANTS + [config.wake_word])
+        self._wake_variants = normalize_wake_variants(self._wake_phrases())
+        # Reconocedor con la gramática nueva tras una
+        # recarga; el hilo del detector lo cambia entre lotes
+        self._next_recognizer: KaldiRecognizer | None = None
+        self._gate: SpeechGate | None = None
+        if config.wake_gate:
+            self._gate = SpeechGate(
+                config.sample_rate,
+                config.frame_duration_ms,
+                aggressiveness=config.vad_aggressiveness,
+                margin_db=config.wake_gate_margin_db,
+            )
+            gate = self._gate
+            metrics.gauge(
+                "wake_gate_pass_ratio",
+                "Share of frames the VAD gate lets through to Vosk",
+                device=self.device_id,
+            ).set_function(lambda: gate.pass_ratio)
+
+    @property
+    def ready(self) -> bool:
+        return self._recognizer is not None
+
+    @property
+    def noise_floor_db(self) -> float | None:
+        """Background noise level the gate has learned, or None without the gate."""
+        return self._gate.noise_floor_db if self._gate is not None else None
+
+    def boundary_recognizer(self) -> KaldiRecognizer | None:
+        """Fresh recognizer for end-of-utterance hints, or None until the model is
+        loaded.
+
+        It only knows ``[unk]``: decoding stays cheap and Vosk still closes a final
+        result when it hears the end of an utterance.
+        """
+        if self._model is None:
+            return None
+        from vosk import KaldiRecognizer
+
+        return KaldiRecognizer(
+            self._model, self.config.sample_rate, json.dumps(["[unk]"])
+        )
+
+    @property
+    def backlog_frames(self) -> int:
+        """Frames captured but not yet seen by the recognizer."""
+        return self._queue.qsize()
+
+    @property
+    def partial_checks(self) -> float:
+        """PartialResult() calls made so far."""
+        return self._partial_checks.value
+
+    @property
+    def gate_pass_ratio(self) -> float | None:
+        """Share of frames the VAD gate let through to Vosk (None without the gate)."""
+        return self._gate.pass_ratio if self._gate is not None else None
 
     def load(self) -> None:
+        if self.model_path is None:
+            raise RuntimeError("Ruta del modelo Vosk no configurada")
         if self._model is None:
-            logger.info("Cargando modelo Vosk desde %s", self.model_path)
-            self._model = Model(model_path=str(self.model_path))
+            self._model = shared_model(self.model_path)
         if self._recognizer is None:
-            grammar = json.dumps(list(WAKE_VARIANTS + [self.config.wake_word] + ["[unk]"]))
-            self._recognizer = KaldiRecognizer(self._model, self.config.sample_rate, grammar)
+            self._recognizer = self._new_recognizer()
+
+    def reconfigure(self, changed: Collection[str]) -> None:
+        """Apply the ``config`` fields named in ``changed`` without reloading the model
+        or the audio.
+
+        A new wake word or variant list gets a new recognizer built around the same
+        ``Model``, swapped in by the detector thread before its next batch.
+        """
+        changed = set(changed)
+        if changed & {"wake_batch_ms", "wake_partial_interval_ms", "wake_max_lag_ms"}:
+            self._configure_batching()
+        if self._gate is not None:
+            self._gate.margin_db = self.config.wake_gate_margin_db
+            if "vad_aggressiveness" in changed:
+                self._gate.set_aggressiveness(self.config.vad_aggressiveness)
+        if changed & {"wake_word", "wake_variants"}:
+            self._wake_variants = normalize_wake_variants(self._wake_phrases())
+            if self._model is not None:
+                self._next_recognizer = self._new_recognizer()
+            logger.info(
+                "Wake word de %s actualizada: %s", self.device_id, self.config.wake_word
+            )
+
+    def _wake_phrases(self) -> list[str]:
+        return list(
+            dict.fromkeys(
+                WAKE_VARIANTS
+                + list(self.config.wake_variants)
+                + [self.config.wake_word]
+            )
+        )
+
+    def _new_recognizer(self) -> KaldiRecognizer:
+        from vosk import KaldiRecognizer
+
+        grammar = json.dumps(self._wake_phrases() + ["[unk]"])
+        recognizer = KaldiRecognizer(self._model, self.config.sample_rate, grammar)
+        # Tiempos por palabra para saber dónde terminó la
+        # wake word; en parciales solo desde Vosk 0.3.42
+        recognizer.SetWords(True)
+        if hasattr(recognizer, "SetPartialWords"):
+            recognizer.SetPartialWords(True)
+        return recognizer
+
+    def _configure_batching(self) -> None:
+        # Vosk recibe lotes de wake_batch_ms y solo se consultan parciales cada
+        # wake_partial_interval_ms de audio
+        config = self.config
+        bytes_per_ms = config.sample_rate * 2 // 1000
+        frame_ms = config.frame_duration_ms
+        self._bytes_per_ms = bytes_per_ms
+        self._frame_bytes = frame_ms * bytes_per_ms
+        self._batch_bytes = max(config.wake_batch_ms, frame_ms) * bytes_per_ms
+        self._partial_interval_ms = max(config.wake_partial_interval_ms, 0)
+        self._max_lag_frames = max(1, config.wake_max_lag_ms // frame_ms)
+        self._catch_up_bytes = max(
+            self._batch_bytes, self._max_lag_frames * frame_ms * bytes_per_ms
+        )
 
     def start(self) -> None:
         if self._thread and self._thread.is_alive():
@@ -52,14 +233,24 @@ class WakeDetector:
         self._stop_event.clear()
         self._thread = threading.Thread(target=self._run, name="WakeDetector", daemon=True)
         self._thread.start()
-        logger.info("WakeDetector iniciado")
+        logger.info("WakeDetector iniciado (dispositivo %s)", self.device_id)
 
     def pause(self) -> None:
         self._enabled.clear()
 
     def resume(self) -> None:
+        if self._gate is not None:
+            self._gate.reset()
         self._enabled.set()
 
+    def reset(self) -> None:
+        """Drop the batched audio and start a new utterance in the recognizer."""
+        self._pending.clear()
+        self._pending_indexes.clear()
+        self._window_start = None
+        if self._recognizer is not None:
+            self._recognizer.Reset()
+
     def stop(self) -> None:
         self._stop_event.set()
         self._enabled.set()
@@ -74,22 +265,171 @@ class WakeDetector:
             try:
                 frame = self._queue.get(timeout=0.5)
             except queue.Empty:
+                # Sin audio nuevo: no dejar un lote a medias esperando
+                self.flush()
                 continue
             if not self._enabled.is_set():
+                self._pending.clear()
+                self._pending_indexes.clear()
                 continue
-            if self._recognizer.AcceptWaveform(frame):
-                result = json.loads(self._recognizer.Result())
-                text = result.get("text", "")
-                if self._is_wake_word(text):
-                    logger.info("Wake word detectada: %s", text)
-                    self.on_wake()
-                    self._enabled.clear()
-            else:
-                partial = json.loads(self._recognizer.PartialResult()).get("partial", "")
-                if partial and self._is_wake_word(partial):
-                    logger.info("Wake word parcial detectada: %s", partial)
-                    self.on_wake()
-                    self._enabled.clear()
+            self.feed(frame, self._queue.last_index)
+            if (
+                self._gate is not None
+                and self._gate.frames_seen % GATE_REPORT_FRAMES == 0
+            ):
+                logger.debug(
+                    "Gate VAD: %.1f%% de los frames llegan a Vosk",
+                    self._gate.pass_ratio * 100,
+                )
+
+    def next_frame(self) -> memoryview | None:
+        """Next captured frame the detector has not seen, or None when it is up to date.
+
+        Together with ``feed`` it drives the detector without its thread (batch mode).
+        """
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def feed(self, frame, index: int | None = None) -> bool:
+        """Queue one captured frame for Vosk, feeding a batch once it is full; True when
+        the wake word fired.
+
+        ``index`` is the frame's position in the ring (default: the last one read).
+        """
+        if index is None:
+            index = self._queue.last_index
+        self._update_lag()
+        chunks = [frame] if self._gate is None else self._gate.process(frame)
+        if not chunks:
+            # El gate se ha cerrado: la cola de la frase se decodifica ya, sin esperar
+            return self.flush()
+        # Al abrirse, el gate suelta los frames anteriores a este, sin huecos
+        first = index - len(chunks) + 1
+        for offset, chunk in enumerate(chunks):
+            self._pending += chunk
+            self._pending_indexes.append(first + offset)
+        # Si vamos por detrás del micrófono, lotes
+        # más grandes para recuperar el tiempo real
+        target = self._catch_up_bytes if self._degraded else self._batch_bytes
+        if len(self._pending) >= target:
+            return self.flush()
+        return False
+
+    def flush(self) -> bool:
+        """Feed Vosk whatever is batched, without waiting for a full batch."""
+        if not self._pending:
+            return False
+        data = bytes(self._pending)
+        indexes = list(self._pending_indexes)
+        self._pending.clear()
+        self._pending_indexes.clear()
+        return self._decode(data, indexes)
+
+    def _update_lag(self) -> None:
+        backlog = self._queue.qsize()
+        if not self._degraded and backlog > self._max_lag_frames:
+            self._degraded = True
+            self._degraded_gauge.set(1)
+            metrics.counter(
+                "wake_degraded_total",
+                "Times the detector fell behind real time",
+                device=self.device_id,
+            ).inc()
+            logger.warning(
+                "WakeDetector de %s va %.1fs por detrás: "
+                "se omiten los resultados parciales",
+                self.device_id,
+                backlog * self.config.frame_duration_seconds,
+            )
+        elif self._degraded and backlog <= self._max_lag_frames // 2:
+            self._degraded = False
+            self._degraded_gauge.set(0)
+            logger.info("WakeDetector de %s recupera el tiempo real", self.device_id)
+
+    def _decode(self, data, indexes: list[int] | None = None) -> bool:
+        """Pass a batch of PCM to Vosk; returns True when the wake word fired."""
+        if self._next_recognizer is not None:
+            self._recognizer, self._next_recognizer = self._next_recognizer, None
+            self._since_partial_ms = 0.0
+            # Los tiempos del reconocedor nuevo cuentan desde este lote
+            self._fed_indexes.clear()
+            self._fed_frames = 0
+        assert self._recognizer is not None
+        if indexes is None:
+            indexes = [self._queue.last_index] * (len(data) // self._frame_bytes)
+        started = time.perf_counter()
+        accepted = self._recognizer.AcceptWaveform(bytes(data))
+        self._feed_seconds.observe(time.perf_counter() - started)
+        self._fed_indexes.extend(indexes)
+        self._fed_frames += len(indexes)
+        if self._window_start is None and indexes:
+            self._window_start = indexes[0]
+        if accepted:
+            self._since_partial_ms = 0.0
+            result = json.loads(self._recognizer.Result())
+            return self._check(result.get("text", ""), "final", result.get("result"))
+        # PartialResult() + json.loads en cada frame es casi todo overhead: se espacian
+        # según el audio decodificado
+        self._since_partial_ms += len(data) / self._bytes_per_ms
+        if self._degraded or self._since_partial_ms < self._partial_interval_ms:
+            return False
+        self._since_partial_ms = 0.0
+        self._partial_checks.inc()
+        partial = json.loads(self._recognizer.PartialResult())
+        return self._check(
+            partial.get("partial", ""), "partial", partial.get("partial_result")
+        )
+
+    def _start_index(self, words: list[dict] | None) -> int:
+        """Ring index of the first frame after the wake word, where the recording should
+        start.
+        """
+        last_fed = (
+            self._fed_indexes[-1] if self._fed_indexes else self._queue.last_index
+        )
+        end = words[-1].get("end") if words else None
+        if end is not None:
+            # Frame del flujo de Vosk donde termina
+            # la palabra -> frame del buffer circular
+            offset = int(end * 1000 // self.config.frame_duration_ms) - (
+                self._fed_frames - len(self._fed_indexes)
+            )
+            if 0 <= offset < len(self._fed_indexes):
+                return self._fed_indexes[offset]
+            if offset == len(self._fed_indexes):
+                return last_fed + 1
+        # Sin tiempos por palabra: se retrocede hasta el audio que Vosk recibió tras la
+        # última consulta, que es lo que el lote y el intervalo de parciales pueden
+        # haber retrasado la detección
+        window_start = (
+            last_fed + 1 if self._window_start is None else self._window_start
+        )
+        return max(window_start, last_fed + 1 - self.audio_stream.preroll_frames)
+
+    def _check(self, text: str, kind: str, words: list[dict] | None = None) -> bool:
+        window_start, self._window_start = self._window_start, None
+        if not text or not self._is_wake_word(text):
+            return False
+        self._window_start = window_start
+        if kind == "final":
+            logger.info("Wake word detectada en %s: %s", self.device_id, text)
+        else:
+            logger.info("Wake word parcial detectada en %s: %s", self.device_id, text)
+        metrics.counter(
+            "wake_detections_total",
+            "Wake word detections",
+            result=kind,
+            device=self.device_id,
+        ).inc()
+        start_index = self._start_index(words)
+        self._window_start = None
+        self._pending.clear()
+        self._pending_indexes.clear()
+        self.on_wake(start_index)
+        self._enabled.clear()
+        return True
 
     def _is_wake_word(self, text: str) -> bool:
         normalized = normalize_text(text)
@@ -0,0 +1,691 @@
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import email.policy
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from app.audio_codecs import ENCODERS, get_encoder
+from app.audio_sources import SyntheticSource, noise, silence, tone
+from app.audio_stream import AudioStream
+from app.config import AppConfig, project_root
+from app.journal import OutboxJournal
+from app.recorder import Recorder, SilenceDetector
+from app.vad import frame_energy_dbfs
+
+COMPONENTS = ("wake", "fanout", "resample", "recorder", "endpoint", "encode", "outbox")
+
+
+@dataclasses.dataclass
+class BenchmarkSizes:
+    wake_seconds: float = 60.0
+    fanout_frames: int = 5000
+    fanout_subscribers: tuple[int, ...] = (1, 2, 4, 8, 16)
+    recorder_seconds: float = 60.0
+    encode_durations: tuple[float, ...] = (1.0, 10.0, 60.0, 300.0)
+    outbox_jobs: int = 200
+    clip_seconds: float = 5.0
+    batch_jobs: int = 1000
+    batch_clip_seconds: float = 1.0
+    batch_latencies_ms: tuple[float, ...] = (0.0, 25.0)
+
+
+QUICK_SIZES = BenchmarkSizes(
+    wake_seconds=5.0,
+    fanout_frames=200,
+    fanout_subscribers=(1, 4),
+    recorder_seconds=2.0,
+    encode_durations=(1.0, 5.0),
+    outbox_jobs=10,
+    clip_seconds=0.5,
+    batch_jobs=50,
+    batch_clip_seconds=0.5,
+)
+
+
+class IdleSource:
+    """Source that never delivers: benchmarks push frames into the stream themselves."""
+
+    def start(self, callback) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class SilentNotifier:
+    def show(self, title: str, message: str) -> None:
+        pass
+
+
+def base_config(**overrides) -> AppConfig:
+    config = AppConfig(
+        webhook_url="",
+        wake_word="oye kay",
+        sample_rate=16000,
+        frame_duration_ms=20,
+        vad_aggressiveness=2,
+        silence_seconds=0.5,
+        input_device_index=None,
+        log_level="WARNING",
+        auto_start_spooler=False,
+    )
+    return dataclasses.replace(config, **overrides)
+
+
+def speech_like(config: AppConfig, seconds: float) -> np.ndarray:
+    """Deterministic tone + noise mix with pauses, frame-aligned, as int16 samples."""
+    script = []
+    while sum(segment.seconds for segment in script) < seconds:
+        script += [
+            tone(0.8, frequency=220.0, amplitude=0.3),
+            noise(0.3, amplitude=0.1),
+            silence(0.2),
+        ]
+    frame_samples = int(config.sample_rate * config.frame_duration_seconds)
+    samples = SyntheticSource(
+        script, config.sample_rate, frame_samples, seed=1
+    ).render()
+    count = int(seconds / config.frame_duration_seconds) * frame_samples
+    return samples[:count]
+
+
+def frames_of(samples: np.ndarray, frame_samples: int) -> np.ndarray:
+    return samples[: len(samples) // frame_samples * frame_samples].reshape(
+        -1, frame_samples, 1
+    )
+
+
+def latency_summary(seconds: list[float]) -> dict:
+    ordered = sorted(seconds)
+    if not ordered:
+        return {}
+
+    def pick(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1e6
+
+    return {
+        "mean_us": round(statistics.fmean(ordered) * 1e6, 2),
+        "p50_us": round(pick(0.50), 2),
+        "p95_us": round(pick(0.95), 2),
+        "p99_us": round(pick(0.99), 2),
+        "max_us": round(ordered[-1] * 1e6, 2),
+    }
+
+
+def bench_wake(sizes: BenchmarkSizes, model_path: Optional[Path]) -> dict:
+    """Frames per second and per-frame latency of the Vosk recognizer, with and without
+    the gate.
+    """
+    try:
+        from app.wake_detector import WakeDetector
+    except ImportError as exc:
+        return {"skipped": f"vosk no disponible: {exc}"}
+    model_path = model_path or project_root() / "models" / "vosk-es"
+    if not model_path.exists() or not any(model_path.iterdir()):
+        return {"skipped": f"modelo no encontrado en {model_path}"}
+
+    # Lote y parciales de 20 ms equivalen al comportamiento anterior: un AcceptWaveform
+    # y un parcial por frame
+    modes = {
+        "sin_gate": {"wake_gate": False},
+        "con_gate": {"wake_gate": True},
+        "lote_20ms": {
+            "wake_gate": False,
+            "wake_batch_ms": 20,
+            "wake_partial_interval_ms": 20,
+        },
+        "lote_100ms": {
+            "wake_gate": False,
+            "wake_batch_ms": 100,
+            "wake_partial_interval_ms": 200,
+        },
+        "lote_200ms": {
+            "wake_gate": False,
+            "wake_batch_ms": 200,
+            "wake_partial_interval_ms": 400,
+        },
+    }
+    results = {}
+    for mode, overrides in modes.items():
+        config = base_config(**overrides)
+        stream = AudioStream(config, source=IdleSource())
+        detector = WakeDetector(
+            config=config,
+            audio_stream=stream,
+            on_wake=lambda index: None,
+            model_path=model_path,
+        )
+        detector.load()
+        frames = frames_of(
+            speech_like(config, sizes.wake_seconds), stream.frame_samples
+        )
+        checks_before = detector.partial_checks
+        latencies = []
+        started = time.perf_counter()
+        for frame in frames:
+            frame_started = time.perf_counter()
+            detector.feed(frame.tobytes())
+            latencies.append(time.perf_counter() - frame_started)
+        detector.flush()
+        elapsed = time.perf_counter() - started
+        detector.stop()
+        results[mode] = {
+            "frames": len(frames),
+            "frames_per_second": round(len(frames) / elapsed, 1),
+            "realtime_factor": round(sizes.wake_seconds / elapsed, 2),
+            "partial_checks_per_second": round(
+                (detector.partial_checks - checks_before) / sizes.wake_seconds, 1
+            ),
+            "latency": latency_summary(latencies),
+        }
+    return results
+
+
+def bench_fanout(sizes: BenchmarkSizes) -> dict:
+    """Cost of writing one frame to the ring and reading it from N subscribers."""
+    config = base_config(ring_buffer_seconds=sizes.fanout_frames * 0.02 + 1)
+    frame = np.zeros(
+        (int(config.sample_rate * config.frame_duration_seconds), 1), dtype=np.int16
+    )
+    results = {}
+    for count in sizes.fanout_subscribers:
+        stream = AudioStream(config, source=IdleSource())
+        readers = [stream.subscribe() for _ in range(count)]
+        write_seconds = 0.0
+        read_seconds = 0.0
+        for _ in range(sizes.fanout_frames):
+            started = time.perf_counter()
+            stream._callback(frame, len(frame), None, None)
+            written = time.perf_counter()
+            for reader in readers:
+                reader.get_nowait()
+            read_seconds += time.perf_counter() - written
+            write_seconds += written - started
+        results[str(count)] = {
+            "write_us_per_frame": round(write_seconds / sizes.fanout_frames * 1e6, 3),
+            "read_us_per_frame": round(read_seconds / sizes.fanout_frames * 1e6, 3),
+            "read_us_per_subscriber": round(
+                read_seconds / sizes.fanout_frames / count * 1e6, 3
+            ),
+            "overruns": stream.total_overruns(),
+        }
+    return results
+
+
+def bench_resample(
+    sizes: BenchmarkSizes, rates: tuple[int, ...] = (48000, 44100)
+) -> dict:
+    """Cost of converting a 20 ms capture block from each native rate to SAMPLE_RATE."""
+    from app.resample import PolyphaseResampler
+
+    config = base_config()
+    results = {}
+    for rate in rates:
+        resampler = PolyphaseResampler(rate, config.sample_rate)
+        block_samples = int(rate * config.frame_duration_seconds)
+        samples = np.resize(
+            speech_like(config, 1.0), sizes.fanout_frames * block_samples
+        )
+        # Igual que ResamplingSource: la salida va a un buffer reutilizado
+        out = np.zeros(resampler.max_output(block_samples), dtype=np.int16)
+        latencies = []
+        for start in range(0, len(samples), block_samples):
+            block_started = time.perf_counter()
+            resampler.process(samples[start : start + block_samples], out=out)
+            latencies.append(time.perf_counter() - block_started)
+        audio_seconds = sizes.fanout_frames * config.frame_duration_seconds
+        results[str(rate)] = {
+            "taps": resampler.taps,
+            "delay_ms": round(resampler.delay_seconds * 1000, 2),
+            "realtime_factor": round(audio_seconds / sum(latencies), 1),
+            "latency": latency_summary(latencies),
+        }
+    return results
+
+
+def bench_recorder(sizes: BenchmarkSizes) -> dict:
+    """End-to-end Recorder throughput (ring read + VAD + encode) per codec, on
+    pre-filled audio.
+    """
+    results = {}
+    for codec in ENCODERS:
+        total = sizes.recorder_seconds + 2.0
+        # Las pausas del audio sintético duran 0,5 s:
+        # el endpointing solo debe cerrar al final
+        config = base_config(
+            audio_codec=codec,
+            endpointer="fixed",
+            silence_seconds=1.0,
+            preroll_seconds=total,
+            ring_buffer_seconds=total + 1,
+        )
+        samples = speech_like(config, sizes.recorder_seconds)
+        # Silencio final para que el endpointing cierre la grabación
+        samples = np.concatenate(
+            [samples, np.zeros(int(config.sample_rate * 1.5), dtype=np.int16)]
+        )
+        # Sin webrtcvad todo frame cuenta como voz: el tope corta al acabar el audio en
+        # vez de esperar más
+        config.max_recording_seconds = len(samples) / config.sample_rate
+        stream = AudioStream(config, source=IdleSource())
+        recorder = Recorder(config, stream)
+        start = stream.frame_index
+        for frame in frames_of(samples, stream.frame_samples):
+            stream._callback(frame, len(frame), None, None)
+        started = time.perf_counter()
+        result = recorder.record_until_silence(start_index=start)
+        elapsed = time.perf_counter() - started
+        audio_seconds = result.duration_ms / 1000 if result else 0.0
+        results[recorder.encoder.name] = {
+            "audio_seconds": audio_seconds,
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "realtime_factor": round(audio_seconds / elapsed, 1) if elapsed else 0.0,
+            "output_bytes": len(result.audio_bytes) if result else 0,
+        }
+    return results
+
+
+# Escenas de endpointing: (tipo, segundos) con voz, ruido de fondo y relleno ("eeh") por
+# debajo del umbral del VAD
+ENDPOINT_SCENES = {
+    "comando": [("voz", 1.5)],
+    "corto": [("voz", 0.4)],
+    "pausas": [
+        ("voz", 0.8),
+        ("fondo", 0.8),
+        ("voz", 0.8),
+        ("fondo", 0.8),
+        ("voz", 0.8),
+    ],
+    "titubeo": [("voz", 1.2), ("relleno", 1.5), ("voz", 1.0)],
+}
+_SCENE_AMPLITUDE = {"voz": 0.3, "relleno": 0.02, "fondo": 0.0}
+_VOICE_DBFS = -30.0
+
+
+def endpoint_scene(
+    config: AppConfig, parts: list[tuple[str, float]], lead_seconds: float = 0.5
+) -> np.ndarray:
+    """Frames of one scene over a constant noise floor, with ``SILENCE_SECONDS`` + 1 s
+    of floor after it.
+    """
+    rate = config.sample_rate
+    parts = (
+        [("fondo", lead_seconds)] + parts + [("fondo", config.silence_seconds + 1.0)]
+    )
+    chunks = []
+    for kind, seconds in parts:
+        t = np.arange(int(rate * seconds)) / rate
+        chunks.append(
+            _SCENE_AMPLITUDE[kind]
+            * (np.sin(2 * np.pi * 180 * t) + 0.5 * np.sin(2 * np.pi * 540 * t))
+        )
+    rng = np.random.default_rng(3)
+    signal = np.concatenate(chunks)
+    signal = signal + rng.normal(0.0, 0.003, len(signal))
+    frame_samples = int(rate * config.frame_duration_seconds)
+    samples = (np.clip(signal, -1.0, 1.0) * 32767).astype(np.int16)
+    return samples[: len(samples) // frame_samples * frame_samples].reshape(
+        -1, frame_samples
+    )
+
+
+def bench_endpoint() -> dict:
+    """Replay scripted utterances through the fixed and adaptive endpointers: wait after
+    the last word.
+    """
+    from app.endpointing import AdaptiveEndpointer
+
+    config = base_config(silence_seconds=5.0)
+    frame_ms = config.frame_duration_ms
+    results: dict = {}
+    for scene, parts in ENDPOINT_SCENES.items():
+        frames = endpoint_scene(config, parts)
+        # Decisiones de voz por energía, vectorizadas sobre toda
+        # la escena, para que la reproducción sea determinista
+        energies = frame_energy_dbfs(frames)
+        voice = energies > _VOICE_DBFS
+        lead = int(500 / frame_ms)
+        last_voice = int(np.flatnonzero(voice)[-1])
+        endpointers = {
+            "fijo": SilenceDetector(
+                config.silence_seconds, config.frame_duration_seconds
+            ),
+            # El gate de la wake word ya conoce el ruido
+            # de fondo cuando empieza la grabación
+            "adaptativo": AdaptiveEndpointer(
+                frame_ms,
+                config.silence_seconds,
+                noise_floor_db=float(np.median(energies[:lead])),
+            ),
+        }
+        results[scene] = {}
+        for name, endpointer in endpointers.items():
+            end = len(frames)
+            for index in range(lead, len(frames)):
+                if endpointer.mark(bool(voice[index]), frames[index].tobytes()):
+                    end = index
+                    break
+            results[scene][name] = {
+                "wait_ms": (end - last_voice) * frame_ms,
+                "cut_early": end < last_voice,
+            }
+    scenes = list(results.values())
+    for name in ("fijo", "adaptativo"):
+        results[f"media_{name}_ms"] = round(
+            statistics.fmean(scene[name]["wait_ms"] for scene in scenes), 1
+        )
+    return results
+
+
+def bench_encode(sizes: BenchmarkSizes) -> dict:
+    """Encode cost of each codec against recording duration."""
+    config = base_config()
+    longest = speech_like(config, max(sizes.encode_durations)).tobytes()
+    results = {}
+    for codec in ENCODERS:
+        encoder = get_encoder(codec, config.sample_rate)
+        per_duration = {}
+        for seconds in sizes.encode_durations:
+            pcm = longest[: int(seconds * config.sample_rate) * 2]
+            started = time.perf_counter()
+            encoded = encoder.encode(pcm)
+            elapsed = time.perf_counter() - started
+            per_duration[str(seconds)] = {
+                "ms": round(elapsed * 1000, 3),
+                "ms_per_audio_second": round(elapsed * 1000 / seconds, 4),
+                "compression_ratio": round(len(pcm) / len(encoded), 2),
+            }
+        results[encoder.name] = per_duration
+    return results
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Local webhook: ``/webhook`` takes one clip, ``/webhook/batch`` implements the
+    batch contract.
+    """
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server API
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        self.server.received += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        reply = b"OK"
+        if self.path.rstrip("/").endswith("/batch"):
+            reply = json.dumps(
+                {"results": batch_results(self.headers.get("Content-Type", ""), body)}
+            ).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def batch_results(content_type: str, body: bytes) -> list[dict]:
+    """Reference server side of a batch: every item listed in the manifest with an audio
+    part present.
+    """
+    message = BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    fields = {
+        part.get_param("name", header="content-disposition"): part
+        for part in message.iter_parts()
+    }
+    manifest = json.loads(fields["manifest"].get_content())
+    return [
+        {
+            "id": entry["id"],
+            "status": 200 if entry["part"] is None or entry["part"] in fields else 400,
+        }
+        for entry in manifest
+    ]
+
+
+def bench_outbox(sizes: BenchmarkSizes, workers: tuple[int, ...] = (1, 4)) -> dict:
+    """Direct upload and outbox drain throughput against a local stub webhook."""
+    try:
+        import requests  # noqa: F401
+    except ImportError as exc:
+        return {"skipped": f"requests no disponible: {exc}"}
+    from app.uploader import Uploader, UploadMeta
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.received = 0
+    server.latency = 0.0
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="BenchmarkStub", daemon=True
+    ).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/webhook"
+    config = base_config(webhook_url=url)
+    clip = get_encoder("wav", config.sample_rate).encode(
+        speech_like(config, sizes.clip_seconds).tobytes()
+    )
+    meta = UploadMeta(
+        duration_ms=int(sizes.clip_seconds * 1000),
+        wake_word=config.wake_word,
+        timestamp_iso="benchmark",
+    )
+    # Cada trabajo lleva su clave de idempotencia, o el drenado los daría por entregados
+    sequence = itertools.count()
+
+    def job_meta() -> UploadMeta:
+        return dataclasses.replace(meta, timestamp_iso=f"benchmark-{next(sequence)}")
+
+    results = {"clip_bytes": len(clip)}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = OutboxJournal(
+                Path(tmp) / "outbox", dead_letter=Path(tmp) / "dead_letter"
+            )
+            uploader = Uploader(config, SilentNotifier(), journal=journal)
+            started = time.perf_counter()
+            for _ in range(sizes.outbox_jobs):
+                uploader.upload(clip, job_meta(), notify=False)
+            elapsed = time.perf_counter() - started
+            results["upload_sequential"] = {
+                "jobs": sizes.outbox_jobs,
+                "jobs_per_second": round(sizes.outbox_jobs / elapsed, 1),
+                "mb_per_second": round(
+                    len(clip) * sizes.outbox_jobs / elapsed / 1e6, 2
+                ),
+            }
+            for count in workers:
+                for _ in range(sizes.outbox_jobs):
+                    uploader.enqueue_job(clip, job_meta())
+                uploader.config = dataclasses.replace(config, outbox_workers=count)
+                report = uploader.process_outbox_once()
+                results[f"drain_{count}_workers"] = {
+                    "jobs": report.total,
+                    "sent": report.sent,
+                    "jobs_per_second": round(report.sent / report.elapsed_seconds, 1)
+                    if report.elapsed_seconds
+                    else 0.0,
+                }
+            # Mismo backlog tras una caída, un POST por clip frente a lotes de
+            # OUTBOX_BATCH_MAX_ITEMS, en local y con la latencia de ida y vuelta de una
+            # conexión real
+            short_clip = get_encoder("wav", config.sample_rate).encode(
+                speech_like(config, sizes.batch_clip_seconds).tobytes()
+            )
+            for latency_ms in sizes.batch_latencies_ms:
+                server.latency = latency_ms / 1000
+                backlog = {}
+                for mode, batch_url in (("single", None), ("batch", f"{url}/batch")):
+                    for _ in range(sizes.batch_jobs):
+                        uploader.enqueue_job(short_clip, job_meta())
+                    uploader.config = dataclasses.replace(
+                        config, outbox_workers=4, webhook_batch_url=batch_url
+                    )
+                    uploader.batch_supported = batch_url is not None
+                    requests_before = server.received
+                    report = uploader.process_outbox_once()
+                    backlog[mode] = {
+                        "jobs": report.total,
+                        "sent": report.sent,
+                        "requests": server.received - requests_before,
+                        "jobs_per_second": round(
+                            report.sent / report.elapsed_seconds, 1
+                        )
+                        if report.elapsed_seconds
+                        else 0.0,
+                    }
+                if backlog["single"]["jobs_per_second"]:
+                    backlog["speedup"] = round(
+                        backlog["batch"]["jobs_per_second"]
+                        / backlog["single"]["jobs_per_second"],
+                        2,
+                    )
+                results[f"backlog_{latency_ms:g}ms"] = backlog
+            server.latency = 0.0
+            journal.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=project_root(),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def run_benchmarks(
+    sizes: BenchmarkSizes,
+    components: tuple[str, ...] = COMPONENTS,
+    model_path: Optional[Path] = None,
+) -> dict:
+    runners: dict[str, Callable[[], dict]] = {
+        "wake": lambda: bench_wake(sizes, model_path),
+        "fanout": lambda: bench_fanout(sizes),
+        "resample": lambda: bench_resample(sizes),
+        "recorder": lambda: bench_recorder(sizes),
+        "endpoint": bench_endpoint,
+        "encode": lambda: bench_encode(sizes),
+        "outbox": lambda: bench_outbox(sizes),
+    }
+    results = {name: runners[name]() for name in components}
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "sizes": dataclasses.asdict(sizes),
+        },
+        "results": results,
+    }
+
+
+def flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10) -> list[str]:
+    """Lines describing every metric that moved more than ``threshold`` relative to the
+    baseline.
+    """
+    old = flatten(baseline["results"])
+    new = flatten(current["results"])
+    lines = []
+    for name in sorted(old.keys() & new.keys()):
+        if not old[name]:
+            continue
+        change = (new[name] - old[name]) / abs(old[name])
+        if abs(change) >= threshold:
+            lines.append(f"{name}: {old[name]:g} -> {new[name]:g} ({change:+.0%})")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmarks offline del pipeline de audio"
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=COMPONENTS,
+        help="Componentes a medir (por defecto todos)",
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Tamaños reducidos para una comprobación rápida",
+    )
+    parser.add_argument(
+        "--model", type=Path, help="Modelo Vosk (por defecto models/vosk-es)"
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Archivo JSON de salida (por defecto logs/benchmark_<commit>.json)",
+    )
+    parser.add_argument(
+        "--compare", type=Path, help="JSON de una ejecución anterior para comparar"
+    )
+    args = parser.parse_args()
+
+    from app.logger import configure_logging
+
+    # El log de cada grabación y envío distorsiona las mediciones
+    configure_logging("WARNING")
+    sizes = QUICK_SIZES if args.quick else BenchmarkSizes()
+    report = run_benchmarks(
+        sizes, tuple(args.only or COMPONENTS), model_path=args.model
+    )
+    output = (
+        args.output
+        or project_root() / "logs" / f"benchmark_{report['meta']['commit']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    print(json.dumps(report["results"], indent=2, ensure_ascii=False))
+    print(f"Resultados guardados en {output}")
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        changes = compare(baseline, report)
+        print(f"Cambios respecto a {baseline['meta'].get('commit')}:")
+        for line in changes or ["sin cambios mayores al 10%"]:
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import time
+from pathlib import Path
+
+from app.audio_sources import FileSource
+from app.audio_stream import AudioStream
+from app.config import load_config
+from app.wake_detector import WakeDetector
+
+
+def replay_file(config, path: Path, model_path: Path) -> dict:
+    """Run the real WakeDetector over one file as fast as it can and measure its CPU."""
+    frame_samples = int(config.sample_rate * config.frame_duration_seconds)
+    source = FileSource(path, config.sample_rate, frame_samples, speed=0)
+    # El buffer circular cubre todo el archivo: a velocidad máxima no se pierde nada
+    audio_seconds = len(source._samples) / config.sample_rate
+    config = dataclasses.replace(config, ring_buffer_seconds=audio_seconds + 1)
+    stream = AudioStream(config, source=source)
+    detections: list[int] = []
+
+    def on_wake(frame_index: int) -> None:
+        detections.append(frame_index)
+        detector.resume()
+
+    detector = WakeDetector(
+        config=config, audio_stream=stream, on_wake=on_wake, model_path=model_path
+    )
+    detector.load()
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    detector.start()
+    stream.start()
+    source.wait()
+    while detector.backlog_frames:
+        time.sleep(0.01)
+    cpu_seconds = time.process_time() - cpu_started
+    wall_seconds = time.perf_counter() - wall_started
+    detector.stop()
+    stream.stop()
+    pass_ratio = detector.gate_pass_ratio
+    return {
+        "file": str(path),
+        "audio_seconds": source.frames_delivered * config.frame_duration_seconds,
+        "detections": len(detections),
+        "cpu_seconds": round(cpu_seconds, 3),
+        "wall_seconds": round(wall_seconds, 3),
+        "vosk_frame_ratio": round(pass_ratio, 3) if pass_ratio is not None else 1.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compara CPU y detecciones de la wake word con y sin gate VAD"
+    )
+    parser.add_argument(
+        "files", nargs="+", type=Path, help="WAV de 16 bits a la frecuencia configurada"
+    )
+    parser.add_argument("--output", type=Path, help="Guardar el resultado en JSON")
+    args = parser.parse_args()
+
+    from scripts.download_vosk_model import ensure_model
+
+    model_path = ensure_model(show_progress=True)
+    base_config = load_config()
+    results = {}
+    for mode, gate in (("sin_gate", False), ("con_gate", True)):
+        config = dataclasses.replace(base_config, wake_gate=gate)
+        results[mode] = [replay_file(config, path, model_path) for path in args.files]
+
+    cpu_off = sum(item["cpu_seconds"] for item in results["sin_gate"])
+    cpu_on = sum(item["cpu_seconds"] for item in results["con_gate"])
+    summary = {
+        "cpu_seconds_sin_gate": round(cpu_off, 3),
+        "cpu_seconds_con_gate": round(cpu_on, 3),
+        "ahorro_cpu_pct": round((1 - cpu_on / cpu_off) * 100, 1) if cpu_off else 0.0,
+        "detecciones_sin_gate": sum(item["detections"] for item in results["sin_gate"]),
+        "detecciones_con_gate": sum(item["detections"] for item in results["con_gate"]),
+        "archivos_con_diferencias": [
+            off["file"]
+            for off, on in zip(results["sin_gate"], results["con_gate"], strict=True)
+            if off["detections"] != on["detections"]
+        ],
+    }
+    report = {"summary": summary, "results": results}
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.output:
+        args.output.write_text(
+            json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8"
+        )
+
+
+if __name__ == "__main__":
+    main()
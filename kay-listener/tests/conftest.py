@@ -1,8 +1,62 @@
 from __future__ import annotations
 
+import dataclasses
 import sys
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+from app.config import AppConfig  # noqa: E402
+
+
+class DummyNotifier:
+    def show(
+        self, title: str, message: str
+    ) -> None:  # pragma: no cover - no-op for tests
+        pass
+
+
+class DummyResponse:
+    def __init__(self, status_code: int, text: str = "OK") -> None:
+        self.status_code = status_code
+        self.text = text
+
+
+class IdleSource:
+    """Source that never delivers: tests push frames into the stream themselves."""
+
+    def start(self, callback) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class AmplitudeVad:
+    """Speech is any frame with a sample louder than ``threshold``."""
+
+    def __init__(self, threshold: int = 0) -> None:
+        self.threshold = threshold
+
+    def is_speech(self, frame: bytes, sample_rate: int) -> bool:
+        samples = memoryview(frame).cast("h")
+        return max(map(abs, samples), default=0) > self.threshold
+
+
+def build_config(**overrides) -> AppConfig:
+    """Offline pipeline config: no webhook, no spooler and no wake gate."""
+    config = AppConfig(
+        webhook_url="",
+        wake_word="oye kay",
+        sample_rate=16000,
+        frame_duration_ms=20,
+        vad_aggressiveness=2,
+        silence_seconds=0.5,
+        input_device_index=None,
+        log_level="INFO",
+        auto_start_spooler=False,
+        wake_gate=False,
+    )
+    return dataclasses.replace(config, **overrides)
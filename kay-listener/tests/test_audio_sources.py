@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.audio_sources import (  # noqa: E402
+    CaptureSource,
+    FileSource,
+    SyntheticSource,
+    read_capture,
+    silence,
+    tone,
+)
+from app.audio_stream import AudioStream  # noqa: E402
+from app.config import AppConfig  # noqa: E402
+from app.metrics import metrics  # noqa: E402
+
+FRAME_SAMPLES = 320
+
+
+def build_config() -> AppConfig:
+    return AppConfig(
+        webhook_url="",
+        wake_word="oye kay",
+        sample_rate=16000,
+        frame_duration_ms=20,
+        vad_aggressiveness=2,
+        silence_seconds=5.0,
+        input_device_index=None,
+        log_level="INFO",
+        auto_start_spooler=False,
+    )
+
+
+def drain(q) -> list[bytes]:
+    frames = []
+    while not q.empty():
+        frames.append(bytes(q.get_nowait()))
+    return frames
+
+
+def test_synthetic_script_feeds_audio_stream() -> None:
+    source = SyntheticSource([silence(0.2), tone(0.2)], 16000, FRAME_SAMPLES, speed=0)
+    stream = AudioStream(build_config(), source=source)
+    q = stream.subscribe()
+    stream.start()
+    assert source.wait(timeout=5)
+    stream.stop()
+    frames = drain(q)
+    # 0.4 s a 20 ms por frame
+    assert len(frames) == 20
+    assert not any(frames[0])
+    assert any(frames[-1])
+
+
+def test_capture_roundtrip_replays_same_samples(tmp_path) -> None:
+    capture_path = tmp_path / "session.kcap"
+    synthetic = SyntheticSource(
+        [tone(0.1, frequency=300)], 16000, FRAME_SAMPLES, speed=0
+    )
+    capture = CaptureSource(synthetic, capture_path)
+    capture.start(lambda *args: None)
+    assert capture.wait(timeout=5)
+    capture.stop()
+
+    records = list(read_capture(capture_path, 16000))
+    assert len(records) == 5
+    offsets = [offset for offset, _ in records]
+    assert offsets == sorted(offsets)
+    captured = np.concatenate([samples for _, samples in records])
+    assert np.array_equal(captured, synthetic.render())
+
+    replayed: list[bytes] = []
+    replay = FileSource(capture_path, 16000, FRAME_SAMPLES, speed=0)
+    replay.start(lambda indata, *args: replayed.append(indata.tobytes()))
+    assert replay.wait(timeout=5)
+    assert b"".join(replayed) == captured.tobytes()
+
+
+def test_wav_file_replay_pads_last_frame(tmp_path) -> None:
+    wav_path = tmp_path / "clip.wav"
+    samples = np.arange(FRAME_SAMPLES + 10, dtype=np.int16)
+    with wave.open(str(wav_path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(samples.tobytes())
+
+    frames: list[bytes] = []
+    source = FileSource(wav_path, 16000, FRAME_SAMPLES, speed=0)
+    source.start(lambda indata, *args: frames.append(indata.tobytes()))
+    assert source.wait(timeout=5)
+    assert len(frames) == 2
+    assert len(frames[1]) == FRAME_SAMPLES * 2
+    assert frames[0] == samples[:FRAME_SAMPLES].tobytes()
+
+
+class Overflow:
+    """Stand-in for sounddevice.CallbackFlags with only input_overflow set."""
+
+    input_overflow = True
+
+    def __bool__(self) -> bool:
+        return True
+
+
+def test_callback_status_is_logged_outside_the_callback() -> None:
+    stream = AudioStream(
+        build_config(),
+        source=SyntheticSource([], 16000, FRAME_SAMPLES),
+        device_id="eventos",
+    )
+    samples = np.zeros((FRAME_SAMPLES, 1), dtype=np.int16)
+    status = metrics.counter("audio_callback_status_total", device="eventos")
+    before = status.value
+
+    for _ in range(3):
+        stream._callback(samples, FRAME_SAMPLES, None, Overflow())
+    assert status.value == before
+    assert stream.events.write_index == 3
+
+    assert stream.log_events() == 3
+    assert status.value == before + 3
+    assert stream.log_events() == 0
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import os
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("loguru")
+
+from conftest import AmplitudeVad, build_config  # noqa: E402
+
+from app import batch  # noqa: E402
+from app.wake_detector import WakeDetector  # noqa: E402
+
+MARKER = 7  # muestras que el reconocedor de prueba "oye" como la wake word
+
+
+class MarkerRecognizer:
+    """Reports the wake word as a partial whenever the last batch held the marker."""
+
+    def __init__(self) -> None:
+        self.heard = False
+
+    def AcceptWaveform(self, data: bytes) -> bool:  # noqa: N802 - API de Vosk
+        self.heard = bool((np.frombuffer(data, dtype=np.int16) == MARKER).any())
+        return False
+
+    def PartialResult(self) -> str:  # noqa: N802 - API de Vosk
+        return json.dumps({"partial": "Oye Kay" if self.heard else ""})
+
+    def Result(self) -> str:  # noqa: N802 - API de Vosk
+        return json.dumps({"text": ""})
+
+    def Reset(self) -> None:  # noqa: N802 - API de Vosk
+        self.heard = False
+
+
+def write_wav(path, samples: np.ndarray) -> None:
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(samples.astype("<i2").tobytes())
+
+
+def seconds(value: int, duration: float) -> np.ndarray:
+    return np.full(int(16000 * duration), value, dtype=np.int16)
+
+
+@pytest.fixture
+def scripted_pipeline(monkeypatch):
+    def load(self) -> None:
+        self._recognizer = MarkerRecognizer()
+
+    monkeypatch.setattr(WakeDetector, "load", load)
+    monkeypatch.setattr(
+        batch, "create_vad", lambda aggressiveness: AmplitudeVad(threshold=100)
+    )
+
+
+def test_segment_file_cuts_one_clip_per_wake_word(tmp_path, scripted_pipeline) -> None:
+    one_round = [
+        seconds(0, 1.0),
+        seconds(MARKER, 0.4),
+        seconds(1000, 1.0),
+        seconds(0, 1.0),
+    ]
+    archive = tmp_path / "sala.wav"
+    write_wav(archive, np.concatenate(one_round * 2 + [seconds(1000, 2.0)]))
+    os.utime(archive, (1_700_000_000, 1_700_000_000))
+    output = tmp_path / "clips"
+    output.mkdir()
+
+    result = batch.segment_file(
+        archive,
+        build_config(wake_batch_ms=20, wake_partial_interval_ms=20),
+        output,
+    )
+
+    utterances = result["utterances"]
+    assert [item["index"] for item in utterances] == [0, 1]
+    # Empieza en el frame siguiente a la wake word y termina tras 0,5 s de silencio
+    assert utterances[0]["wake_seconds"] == pytest.approx(1.0)
+    assert utterances[0]["start_seconds"] == pytest.approx(1.02)
+    assert utterances[0]["duration_ms"] == (19 + 50 + 25) * 20
+    assert utterances[1]["wake_seconds"] == pytest.approx(4.4)
+    # La hora de cada clip es la del archivo más su desplazamiento, no la del proceso
+    assert [item["timestamp_iso"] for item in utterances] == [
+        "2023-11-14T22:13:21Z",
+        "2023-11-14T22:13:24Z",
+    ]
+    clip = output / "sala_0000.wav"
+    assert utterances[0]["clip"] == str(clip)
+    with wave.open(str(clip), "rb") as wf:
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    assert (pcm[19 * 320 : 69 * 320] == 1000).all()
+    assert result["audio_seconds"] == pytest.approx(2 * 3.4 + 2.0)
+    assert not list(output.glob("rec_*.wav"))
+
+
+def test_collect_inputs_expands_directories_and_globs(tmp_path) -> None:
+    (tmp_path / "a").mkdir()
+    write_wav(tmp_path / "a" / "uno.wav", seconds(0, 0.1))
+    write_wav(tmp_path / "dos.wav", seconds(0, 0.1))
+    (tmp_path / "notas.txt").write_text("x", encoding="utf-8")
+
+    assert batch.collect_inputs([str(tmp_path / "a")]) == [tmp_path / "a" / "uno.wav"]
+    assert batch.collect_inputs([str(tmp_path / "*.*")]) == [tmp_path / "dos.wav"]
+
+
+def test_iter_frames_pads_the_last_frame(tmp_path) -> None:
+    archive = tmp_path / "corto.wav"
+    write_wav(archive, seconds(5, 0.05))  # 800 muestras: 2 frames y medio
+    frames = list(batch.iter_frames(archive, 16000, 320))
+    assert [len(frame) for frame in frames] == [320, 320, 320]
+    assert (frames[-1][160:] == 0).all()
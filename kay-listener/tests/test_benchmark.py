@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import dataclasses
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from scripts.benchmark import QUICK_SIZES, compare, run_benchmarks  # noqa: E402
+
+
+def test_quick_benchmark_produces_comparable_json() -> None:
+    sizes = dataclasses.replace(
+        QUICK_SIZES,
+        fanout_frames=50,
+        recorder_seconds=1.0,
+        encode_durations=(0.5,),
+        outbox_jobs=3,
+        batch_jobs=4,
+        batch_latencies_ms=(0.0,),
+    )
+    report = run_benchmarks(sizes, ("fanout", "recorder", "encode", "outbox"))
+
+    results = report["results"]
+    assert report["meta"]["commit"]
+    assert results["fanout"]["4"]["overruns"] == 0
+    assert results["recorder"]["wav"]["audio_seconds"] >= 1.0
+    assert set(results["encode"]) >= {"wav", "mulaw", "adpcm"}
+    if "skipped" not in results["outbox"]:
+        assert results["outbox"]["drain_4_workers"]["sent"] == 3
+        backlog = results["outbox"]["backlog_0ms"]
+        assert backlog["single"]["requests"] == 4
+        assert backlog["batch"]["sent"] == 4
+
+
+def test_compare_reports_only_large_changes() -> None:
+    baseline = {"results": {"encode": {"wav": {"ms": 10.0, "ratio": 1.0}}}}
+    current = {"results": {"encode": {"wav": {"ms": 15.0, "ratio": 1.02}}}}
+    assert compare(baseline, current) == ["encode.wav.ms: 10 -> 15 (+50%)"]
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import struct
+import warnings
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.audio_codecs import (  # noqa: E402
+    ADPCM_SAMPLES_PER_BLOCK,
+    get_encoder,
+    linear_to_ima_adpcm,
+    linear_to_mulaw,
+)
+from app.uploader import UploadMeta  # noqa: E402
+
+
+def speech_like(seconds: float = 1.0):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(16000 * seconds)) / 16000
+    return (np.sin(2 * np.pi * 220 * t) * 6000 + rng.normal(0, 300, len(t))).astype(
+        np.int16
+    )
+
+
+def test_mulaw_matches_reference_table() -> None:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        audioop = pytest.importorskip("audioop")
+    samples = np.arange(-32768, 32768, dtype=np.int16)
+    assert linear_to_mulaw(samples).tobytes() == audioop.lin2ulaw(samples.tobytes(), 2)
+
+
+def test_adpcm_blocks_match_reference_encoder() -> None:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        audioop = pytest.importorskip("audioop")
+    samples = speech_like(0.5)
+    blocks = linear_to_ima_adpcm(samples)
+
+    assert blocks.shape == (-(-len(samples) // ADPCM_SAMPLES_PER_BLOCK), 256)
+    padded = np.zeros(blocks.shape[0] * ADPCM_SAMPLES_PER_BLOCK, dtype=np.int16)
+    padded[: len(samples)] = samples
+    for block, pcm in zip(blocks, padded.reshape(len(blocks), -1), strict=True):
+        assert block[:2].view("<i2")[0] == pcm[0]
+        encoded, _ = audioop.lin2adpcm(
+            pcm[1:].tobytes(), 2, (int(pcm[0]), int(block[2]))
+        )
+        # audioop escribe el primer nibble en la parte alta; WAV lo espera en la baja
+        assert (
+            bytes(((b & 0x0F) << 4) | (b >> 4) for b in encoded) == block[4:].tobytes()
+        )
+
+
+@pytest.mark.parametrize(
+    "codec, format_tag, min_ratio", [("mulaw", 7, 1.9), ("adpcm", 0x11, 3.8)]
+)
+def test_compact_codecs_write_valid_wav_headers(
+    codec: str, format_tag: int, min_ratio: float
+) -> None:
+    pcm = speech_like().tobytes()
+    encoder = get_encoder(codec, 16000)
+    data = encoder.encode(pcm)
+
+    assert data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+    assert struct.unpack_from("<I", data, 4)[0] == len(data) - 8
+    assert struct.unpack_from("<HHI", data, 20) == (format_tag, 1, 16000)
+    fact = data.index(b"fact")
+    assert struct.unpack_from("<I", data, fact + 8)[0] == 16000
+    assert encoder.stats.compression_ratio >= min_ratio
+    assert encoder.stats.audio_seconds == pytest.approx(1.0)
+
+
+def test_meta_carries_codec_content_type() -> None:
+    meta = UploadMeta(
+        duration_ms=1000,
+        wake_word="oye kay",
+        timestamp_iso="now",
+        codec="flac",
+        content_type="audio/flac",
+    )
+    assert meta.to_payload()["codec"] == "flac"
+    assert meta.file_extension == "flac"
+    assert UploadMeta.from_dict(meta.to_dict()) == meta
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("loguru")
+
+from conftest import IdleSource, build_config  # noqa: E402
+
+from app.audio_stream import AudioStream  # noqa: E402
+from app.config import AppConfig  # noqa: E402
+from app.config_watch import ConfigWatcher, config_changes  # noqa: E402
+from app.wake_detector import WakeDetector  # noqa: E402
+
+
+class ScriptedRecognizer:
+    """Returns a fixed partial for every batch it is fed."""
+
+    def __init__(self, partial: str = "") -> None:
+        self.partial = partial
+        self.batches = 0
+
+    def AcceptWaveform(self, data: bytes) -> bool:  # noqa: N802 - API de Vosk
+        self.batches += 1
+        return False
+
+    def PartialResult(self) -> str:  # noqa: N802 - API de Vosk
+        return json.dumps({"partial": self.partial})
+
+    def Result(self) -> str:  # noqa: N802 - API de Vosk
+        return json.dumps({"text": ""})
+
+
+def frame(config: AppConfig) -> bytes:
+    return np.ones(
+        int(config.sample_rate * config.frame_duration_seconds), dtype=np.int16
+    ).tobytes()
+
+
+def test_watcher_reloads_only_when_the_file_changes(tmp_path, monkeypatch) -> None:
+    # Sin python-dotenv load_config no lee el archivo
+    pytest.importorskip("dotenv")
+    for key in (
+        "WAKE_WORD",
+        "WAKE_VARIANTS",
+        "SILENCE_SECONDS",
+        "OUTBOX_BACKOFF_SECONDS",
+    ):
+        # load_config(override=True) escribe en os.environ;
+        # así monkeypatch lo restaura al terminar
+        monkeypatch.setenv(key, "")
+        monkeypatch.delenv(key)
+    env = tmp_path / ".env"
+    env.write_text("WAKE_WORD=hola kay\n", encoding="utf-8")
+    reloads: list[AppConfig] = []
+    watcher = ConfigWatcher(env, reloads.append)
+
+    assert watcher.check() is False
+    env.write_text(
+        "WAKE_WORD=hola casa\nWAKE_VARIANTS=ola casa, hola kasa\n"
+        "SILENCE_SECONDS=3\nOUTBOX_BACKOFF_SECONDS=5\n",
+        encoding="utf-8",
+    )
+    os.utime(env, ns=(1, 1))
+    assert watcher.check() is True
+    assert watcher.check() is False
+
+    new = reloads[0]
+    assert new.wake_word == "hola casa"
+    assert new.wake_variants == ("ola casa", "hola kasa")
+    assert new.outbox_backoff_seconds == 5.0
+    changes = config_changes(build_config(silence_seconds=3.0), new)
+    assert changes["wake_word"] == "hola casa"
+    assert "silence_seconds" not in changes
+
+
+def test_new_wake_word_swaps_recognizer_at_the_next_batch(monkeypatch) -> None:
+    config = build_config(wake_batch_ms=20, wake_partial_interval_ms=20)
+    wakes: list[int] = []
+    detector = WakeDetector(
+        config=config,
+        audio_stream=AudioStream(config, source=IdleSource()),
+        on_wake=wakes.append,
+    )
+    old = ScriptedRecognizer(partial="hola casa")
+    new = ScriptedRecognizer(partial="hola casa")
+    detector._recognizer = old
+    detector._model = object()
+    monkeypatch.setattr(detector, "_new_recognizer", lambda: new)
+
+    assert detector.feed(frame(config)) is False
+    config.wake_word = "hola casa"
+    detector.reconfigure({"wake_word"})
+    assert detector.feed(frame(config)) is True
+
+    # El modelo no se recarga: solo cambia el reconocedor, y el viejo ya no recibe audio
+    assert (old.batches, new.batches) == (1, 1)
+    assert detector._recognizer is new
+    assert len(wakes) == 1
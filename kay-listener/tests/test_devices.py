@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import sys
+import types
+
+import pytest
+
+from app.config import AppConfig, device_label, load_config
+from app.uploader import UploadMeta
+
+
+def test_input_devices_list_overrides_single_device(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv("INPUT_DEVICE_INDEX", "2")
+    monkeypatch.setenv("INPUT_DEVICES", "1, 3,auto,3")
+    config = load_config(tmp_path / ".env")
+    assert config.device_indices == [1, 3, None]
+    assert [device_label(index) for index in config.device_indices] == [
+        "1",
+        "3",
+        "default",
+    ]
+
+    monkeypatch.delenv("INPUT_DEVICES")
+    assert load_config(tmp_path / ".env").device_indices == [2]
+
+
+def test_device_id_travels_with_upload_meta() -> None:
+    meta = UploadMeta(
+        duration_ms=1000, wake_word="oye kay", timestamp_iso="t", device_id="3"
+    )
+    assert meta.to_payload()["device_id"] == "3"
+    # Los trabajos del outbox conservan el dispositivo de origen
+    assert UploadMeta.from_dict(meta.to_dict()).device_id == "3"
+    assert (
+        "device_id"
+        not in UploadMeta(duration_ms=1, wake_word="w", timestamp_iso="t").to_payload()
+    )
+
+
+class FakeModel:
+    loads = 0
+
+    def __init__(self, model_path: str) -> None:
+        FakeModel.loads += 1
+
+
+class FakeRecognizer:
+    def __init__(self, model, sample_rate: int, grammar: str) -> None:
+        self.model = model
+
+    def SetWords(self, enabled: bool) -> None:  # noqa: N802 - API de Vosk
+        pass
+
+
+def test_devices_share_one_model_but_not_the_pipeline(monkeypatch, tmp_path) -> None:
+    pytest.importorskip("numpy")
+    pytest.importorskip("loguru")
+    from app import wake_detector
+    from app.app import KayListenerApp
+
+    fake_vosk = types.SimpleNamespace(Model=FakeModel, KaldiRecognizer=FakeRecognizer)
+    monkeypatch.setitem(sys.modules, "vosk", fake_vosk)
+    monkeypatch.setattr(wake_detector, "_MODELS", {})
+    monkeypatch.setattr(FakeModel, "loads", 0)
+    config = AppConfig(
+        webhook_url="",
+        wake_word="oye kay",
+        sample_rate=16000,
+        frame_duration_ms=20,
+        vad_aggressiveness=2,
+        silence_seconds=0.5,
+        input_device_index=None,
+        log_level="INFO",
+        auto_start_spooler=False,
+        input_devices=(1, 3),
+    )
+    # Solo la construcción de canales: sin outbox, bandeja ni hilos de subida
+    app = KayListenerApp.__new__(KayListenerApp)
+    app.config = config
+    channels = [app._build_channel(index, multiple=True) for index in (1, 3)]
+    for channel in channels:
+        channel.wake_detector.model_path = tmp_path
+        channel.wake_detector.load()
+
+    first, second = channels
+    assert [channel.device_id for channel in channels] == ["1", "3"]
+    assert FakeModel.loads == 1
+    assert first.wake_detector._model is second.wake_detector._model
+    assert first.wake_detector._recognizer is not second.wake_detector._recognizer
+    assert first.audio_stream is not second.audio_stream
+    assert first.recorder is not second.recorder
+    assert first.recorder.audio_stream is first.audio_stream
+    assert first.audio_stream.config.input_device_index == 1
+    assert first.recording_lock is not second.recording_lock
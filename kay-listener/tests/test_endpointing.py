@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.config import AppConfig  # noqa: E402
+from app.endpointing import AdaptiveEndpointer  # noqa: E402
+from scripts.benchmark import (  # noqa: E402
+    ENDPOINT_SCENES,
+    bench_endpoint,
+    endpoint_scene,
+)
+
+FRAME_MS = 20
+
+
+def build_config() -> AppConfig:
+    return AppConfig(
+        webhook_url="",
+        wake_word="oye kay",
+        sample_rate=16000,
+        frame_duration_ms=FRAME_MS,
+        vad_aggressiveness=2,
+        silence_seconds=5.0,
+        input_device_index=None,
+        log_level="INFO",
+        auto_start_spooler=False,
+    )
+
+
+class FinalAfter:
+    """Recognizer stand-in that closes a final result after ``frames`` frames."""
+
+    def __init__(self, frames: int) -> None:
+        self.frames = frames
+        self.fed = 0
+
+    def AcceptWaveform(self, data: bytes) -> bool:  # noqa: N802 - API de Vosk
+        self.fed += 1
+        return self.fed == self.frames
+
+
+def replay(endpointer, frames, voice) -> int:
+    """Index of the frame on which the endpointer closes the recording."""
+    for index, frame in enumerate(frames):
+        if endpointer.mark(bool(voice[index]), frame.tobytes()):
+            return index
+    return len(frames)
+
+
+def test_replay_reports_shorter_wait_without_cutting_anyone_off() -> None:
+    results = bench_endpoint()
+
+    for scene in ENDPOINT_SCENES:
+        assert results[scene]["fijo"]["wait_ms"] == 5000
+        assert not results[scene]["adaptativo"]["cut_early"]
+        assert (
+            results[scene]["adaptativo"]["wait_ms"] < results[scene]["fijo"]["wait_ms"]
+        )
+    # Un final claro cierra en unos 600 ms; una duda o una frase corta esperan más
+    assert results["comando"]["adaptativo"]["wait_ms"] <= 700
+    assert (
+        results["titubeo"]["adaptativo"]["wait_ms"]
+        > results["comando"]["adaptativo"]["wait_ms"]
+    )
+    assert results["media_adaptativo_ms"] < results["media_fijo_ms"] / 2
+
+
+def test_filled_pause_is_not_taken_for_the_end() -> None:
+    config = build_config()
+    frames = endpoint_scene(config, ENDPOINT_SCENES["titubeo"], lead_seconds=0.0)
+    voice = frames.std(axis=1) > 1000
+    resumed = 60 + 75  # 1,2 s de voz y 1,5 s de "eeh"
+
+    floor = AdaptiveEndpointer(FRAME_MS, 5.0, noise_floor_db=-50.0)
+    assert replay(floor, frames, voice) > resumed
+    assert floor.longest_pause == 75
+
+    # Con una espera fija igual a la mínima, la escena se cortaría a mitad de la duda
+    eager = AdaptiveEndpointer(FRAME_MS, 0.6, noise_floor_db=-50.0)
+    assert replay(eager, frames, voice) < resumed
+
+
+def test_vosk_final_result_shortens_the_wait_of_a_short_utterance() -> None:
+    config = build_config()
+    frames = endpoint_scene(config, ENDPOINT_SCENES["corto"], lead_seconds=0.0)
+    voice = frames.std(axis=1) > 1000
+    last_voice = int(np.flatnonzero(voice)[-1])
+
+    plain = replay(
+        AdaptiveEndpointer(FRAME_MS, 5.0, noise_floor_db=-50.0), frames, voice
+    )
+    hinted = replay(
+        AdaptiveEndpointer(
+            FRAME_MS, 5.0, noise_floor_db=-50.0, recognizer=FinalAfter(last_voice + 10)
+        ),
+        frames,
+        voice,
+    )
+
+    assert (plain - last_voice) * FRAME_MS > 3000
+    assert (hinted - last_voice) * FRAME_MS == 600
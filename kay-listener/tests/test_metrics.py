@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import json
+import urllib.request
+
+from app.metrics import Histogram, MetricsRegistry, MetricsServer
+
+
+def test_labelled_series_are_independent() -> None:
+    registry = MetricsRegistry()
+    registry.counter("frames_dropped_total", subscriber="wake").inc(3)
+    registry.counter("frames_dropped_total", subscriber="recorder").inc()
+    registry.counter("frames_dropped_total", subscriber="wake").inc()
+
+    series = registry.snapshot()["metrics"]["frames_dropped_total"]["series"]
+    values = {item["labels"]["subscriber"]: item["value"] for item in series}
+    assert values == {"wake": 4, "recorder": 1}
+
+
+def test_histogram_percentiles_stay_within_observed_range() -> None:
+    histogram = Histogram((0.1, 0.5, 1.0))
+    for value in [0.05] * 90 + [0.8] * 10:
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 100
+    assert snapshot["buckets"] == {"0.1": 90, "0.5": 90, "1": 100, "+Inf": 100}
+    assert snapshot["p50"] <= 0.1
+    assert 0.5 <= snapshot["p99"] <= 0.8
+
+
+def test_gauge_callback_and_snapshot_file(tmp_path) -> None:
+    registry = MetricsRegistry()
+    depth = [5]
+    registry.gauge("outbox_jobs").set_function(lambda: depth[0])
+    depth[0] = 7
+    registry.write_snapshot(tmp_path / "metrics.json")
+    data = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))
+    assert data["metrics"]["outbox_jobs"]["series"][0]["value"] == 7
+
+
+def test_http_endpoint_serves_json_and_prometheus() -> None:
+    registry = MetricsRegistry()
+    registry.histogram(
+        "upload_request_seconds", "Duration of one webhook POST"
+    ).observe(0.2)
+    server = MetricsServer(registry, port=0)
+    assert server.start()
+    try:
+        base = f"http://127.0.0.1:{server.port}"
+        with urllib.request.urlopen(f"{base}/metrics", timeout=5) as response:
+            data = json.loads(response.read())
+        with urllib.request.urlopen(
+            f"{base}/metrics/prometheus", timeout=5
+        ) as response:
+            text = response.read().decode("utf-8")
+    finally:
+        server.stop()
+    assert data["metrics"]["upload_request_seconds"]["series"][0]["value"]["count"] == 1
+    assert 'kay_upload_request_seconds_bucket{le="0.25"} 1' in text
+    assert "kay_upload_request_seconds_count 1" in text
+
+
+def test_startup_timer_records_each_phase() -> None:
+    from app.metrics import metrics
+    from app.utils import StartupTimer
+
+    timer = StartupTimer()
+    timer.mark("capture")
+    timer.mark("model_load")
+    assert list(timer.phases) == ["capture", "model_load"]
+    assert timer.total >= sum(timer.phases.values()) - 1e-9
+    assert (
+        metrics.gauge("startup_phase_seconds", phase="model_load").value
+        == timer.phases["model_load"]
+    )
@@ -0,0 +1,406 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import threading
+import time
+
+import pytest
+from conftest import DummyNotifier, DummyResponse
+
+from app.config import AppConfig, project_root
+from app.journal import DROP_NEWEST, STALE_WRITE_SECONDS, WRITING, OutboxJournal
+from app.metrics import metrics
+from app.outbox import OutboxDrainer
+from app.uploader import (
+    DELIVERY_CHECK,
+    RETRY,
+    UNCERTAIN,
+    Uploader,
+    UploadMeta,
+    requests,
+)
+from app.utils import load_json, save_json
+
+
+class RoutingSession:
+    """Answers each POST according to the job's timestamp_iso field."""
+
+    def __init__(self, routes: dict[str, object]) -> None:
+        self.routes = routes
+        self.posted: list[str] = []
+        self._lock = threading.Lock()
+
+    def post(self, url, files=None, data=None, timeout=None):
+        key = data["timestamp_iso"]
+        with self._lock:
+            self.posted.append(key)
+        outcome = self.routes.get(key, DummyResponse(200))
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def build_config() -> AppConfig:
+    return AppConfig(
+        webhook_url="https://example.com",
+        wake_word="oye kay",
+        sample_rate=16000,
+        frame_duration_ms=20,
+        vad_aggressiveness=2,
+        silence_seconds=5.0,
+        input_device_index=None,
+        log_level="INFO",
+        auto_start_spooler=False,
+    )
+
+
+def clean_dirs():
+    root = project_root()
+    for folder in (root / "outbox", root / "dead_letter"):
+        folder.mkdir(exist_ok=True)
+        for file in folder.glob("*"):
+            if file.name != ".gitkeep":
+                file.unlink()
+    return root / "outbox", root / "dead_letter"
+
+
+@pytest.fixture(autouse=True)
+def _clean_after():
+    yield
+    clean_dirs()
+
+
+def meta(name: str) -> UploadMeta:
+    return UploadMeta(duration_ms=1000, wake_word="oye kay", timestamp_iso=name)
+
+
+def test_rejected_jobs_go_to_dead_letter_without_blocking() -> None:
+    outbox, dead_letter = clean_dirs()
+    session = RoutingSession({"job-1": DummyResponse(400, "bad request")})
+    uploader = Uploader(build_config(), DummyNotifier(), session=session)
+    for index in range(6):
+        uploader.enqueue_job(b"abc", meta(f"job-{index}"))
+
+    report = OutboxDrainer(uploader, workers=3).drain_once()
+
+    assert (report.sent, report.dead_lettered) == (5, 1)
+    assert sorted(session.posted) == [f"job-{index}" for index in range(6)]
+    assert uploader.journal.pending_count() == 0
+    assert not any(outbox.glob("*.wav"))
+    (sidecar,) = dead_letter.glob("*.json")
+    assert load_json(sidecar)["timestamp_iso"] == "job-1"
+
+
+def test_transient_failures_back_off_then_dead_letter() -> None:
+    clean_dirs()
+    session = RoutingSession({"flaky": requests.ConnectionError("net")})
+    uploader = Uploader(build_config(), DummyNotifier(), session=session)
+    uploader.enqueue_job(b"abc", meta("flaky"))
+    drainer = OutboxDrainer(uploader, workers=2, max_attempts=2, backoff_seconds=0.0)
+
+    assert drainer.drain_once().retried == 1
+    assert (
+        uploader.journal.claim_next_due(now=0) is None
+    )  # en espera hasta el próximo intento
+    assert drainer.drain_once().dead_lettered == 1
+    assert uploader.journal.pending_count() == 0
+
+
+def test_journal_recovers_legacy_and_orphan_files() -> None:
+    outbox, dead_letter = clean_dirs()
+    (outbox / "job_1_1000.wav").write_bytes(b"legacy")
+    save_json(outbox / "job_1_1000.json", meta("legacy").to_dict())
+    (outbox / "job_2_2000.json").write_text("{roto", encoding="utf-8")
+    (outbox / "job_deadbeef.wav.part").write_bytes(b"crash")
+
+    journal = OutboxJournal(outbox, dead_letter)
+
+    job = journal.claim_next_due()
+    assert job is not None and job.meta["timestamp_iso"] == "legacy"
+    assert not (outbox / "job_deadbeef.wav.part").exists()
+    assert (dead_letter / "job_2_2000.json").exists()
+    journal.close()
+    # Un trabajo en vuelo durante un cierre inesperado vuelve a estar pendiente
+    reopened = OutboxJournal(outbox, dead_letter)
+    assert reopened.claim_next_due().id == job.id
+    reopened.close()
+
+
+def test_only_the_outbox_owner_runs_recovery() -> None:
+    outbox, dead_letter = clean_dirs()
+    owner = OutboxJournal(outbox, dead_letter)
+    owner.add(b"audio", meta("en vuelo").to_dict())
+    claimed = owner.claim_next_due()
+
+    guest = OutboxJournal(outbox, dead_letter)
+
+    assert owner.owner and not guest.owner
+    # Abrir el outbox desde otro proceso no devuelve a la cola el trabajo en vuelo
+    # ni borra su audio
+    assert guest.claim_next_due() is None
+    assert claimed.audio_path.exists()
+    guest.close()
+    owner.close()
+
+
+def test_recovery_keeps_audio_whose_row_was_still_being_written() -> None:
+    outbox, dead_letter = clean_dirs()
+    journal = OutboxJournal(outbox, dead_letter)
+    insert = (
+        "INSERT INTO jobs (created_at, state, lane, size, audio_file, meta) "
+        "VALUES (?, ?, ?, 5, ?, ?)"
+    )
+    # Cierre tras el rename y antes de marcar la fila pendiente: el audio está completo
+    (outbox / "job_renombrado.wav").write_bytes(b"audio")
+    journal._db.execute(
+        insert,
+        (
+            time.time(),
+            WRITING,
+            "a",
+            "job_renombrado.wav",
+            json.dumps(meta("a").to_dict()),
+        ),
+    )
+    # Cierre a mitad de escribir, hace tiempo: el .part y la fila sobran
+    (outbox / "job_abandonado.wav.part").write_bytes(b"aud")
+    stale = time.time() - STALE_WRITE_SECONDS - 1
+    journal._db.execute(
+        insert,
+        (stale, WRITING, "b", "job_abandonado.wav", json.dumps(meta("b").to_dict())),
+    )
+    journal.close()
+
+    reopened = OutboxJournal(outbox, dead_letter)
+
+    job = reopened.claim_next_due()
+    assert (
+        job is not None and job.meta["timestamp_iso"] == "a" and job.audio_path.exists()
+    )
+    assert reopened.pending_count() == 1
+    assert not (outbox / "job_abandonado.wav.part").exists()
+    assert not list(dead_letter.glob("*.json"))
+    reopened.close()
+
+
+def test_lane_waits_for_an_earlier_job_still_being_written() -> None:
+    outbox, dead_letter = clean_dirs()
+    journal = OutboxJournal(outbox, dead_letter)
+    journal._db.execute(
+        "INSERT INTO jobs (created_at, state, lane, size, audio_file, meta) "
+        "VALUES (?, ?, 'sesion', 5, 'job_segmento0.wav', ?)",
+        (time.time(), WRITING, json.dumps(meta("segmento-0").to_dict())),
+    )
+    journal.add(b"audio", meta("segmento-1").to_dict(), lane="sesion")
+
+    # El segmento 1 no sale antes que el 0, que aún se está escribiendo
+    assert journal.due_count() == 1
+    assert journal.claim_next_due() is None
+    # Una fila abandonada hace tiempo deja de bloquear el carril
+    stale = time.time() + STALE_WRITE_SECONDS + 1
+    job = journal.claim_next_due(now=stale)
+    assert job is not None and job.meta["timestamp_iso"] == "segmento-1"
+    assert journal.due_count(now=stale) == 0
+    journal.close()
+
+
+def test_quota_eviction_policies() -> None:
+    outbox, dead_letter = clean_dirs()
+    journal = OutboxJournal(outbox, dead_letter, quota_bytes=10)
+    first = journal.add(b"x" * 6, meta("a").to_dict())
+    journal.add(b"y" * 6, meta("b").to_dict())
+    assert journal.pending_bytes() == 6
+    assert not first.audio_path.exists()
+    journal.close()
+
+    strict = OutboxJournal(outbox, dead_letter, quota_bytes=10, eviction=DROP_NEWEST)
+    assert strict.add(b"z" * 6, meta("c").to_dict()) is None
+    assert strict.pending_count() == 1
+    strict.close()
+
+
+class BatchSession(RoutingSession):
+    """Batch endpoint answering each item with ``item_status`` (200 by default)."""
+
+    def __init__(
+        self, item_status: dict[str, int], batch_response: DummyResponse | None = None
+    ) -> None:
+        super().__init__({})
+        self.item_status = item_status
+        self.batch_response = batch_response
+        self.batches: list[list[str]] = []
+
+    def post(self, url, files=None, data=None, timeout=None):
+        if not url.endswith("/batch"):
+            return super().post(url, files=files, data=data, timeout=timeout)
+        manifest = json.loads(data["manifest"])
+        self.batches.append([entry["meta"]["timestamp_iso"] for entry in manifest])
+        assert len(files) == len(manifest)
+        if self.batch_response is not None:
+            return self.batch_response
+        results = [
+            {
+                "id": entry["id"],
+                "status": self.item_status.get(entry["meta"]["timestamp_iso"], 200),
+            }
+            for entry in manifest
+        ]
+        return DummyResponse(200, json.dumps({"results": results}))
+
+
+def batch_uploader(session) -> Uploader:
+    config = dataclasses.replace(
+        build_config(), webhook_batch_url="https://example.com/batch"
+    )
+    return Uploader(config, DummyNotifier(), session=session)
+
+
+def test_batch_mode_applies_per_item_results() -> None:
+    clean_dirs()
+    session = BatchSession({"job-1": 400, "job-2": 503})
+    uploader = batch_uploader(session)
+    for index in range(6):
+        uploader.enqueue_job(b"abc", meta(f"job-{index}"))
+
+    report = OutboxDrainer(uploader, workers=1, batch_max_items=4).drain_once()
+
+    assert [len(batch) for batch in session.batches] == [4, 2]
+    assert session.posted == []
+    assert (report.sent, report.dead_lettered, report.retried) == (4, 1, 1)
+    assert uploader.journal.pending_count() == 1
+
+
+def test_batch_size_limit_leaves_the_rest_for_the_next_request() -> None:
+    clean_dirs()
+    session = BatchSession({})
+    uploader = batch_uploader(session)
+    for index in range(5):
+        uploader.enqueue_job(b"x" * 100, meta(f"job-{index}"))
+
+    report = OutboxDrainer(
+        uploader, workers=1, batch_max_items=10, batch_max_bytes=250
+    ).drain_once()
+
+    assert [len(batch) for batch in session.batches] == [2, 2]
+    assert report.sent == 5  # el último lote de uno sale como envío normal
+    assert session.posted == ["job-4"]
+
+
+def test_batch_falls_back_to_single_posts_when_unsupported() -> None:
+    clean_dirs()
+    session = BatchSession({}, batch_response=DummyResponse(404, "not found"))
+    uploader = batch_uploader(session)
+    for index in range(5):
+        uploader.enqueue_job(b"abc", meta(f"job-{index}"))
+
+    report = OutboxDrainer(uploader, workers=1, batch_max_items=3).drain_once()
+
+    assert report.sent == 5
+    assert len(session.batches) == 1
+    assert sorted(session.posted) == [f"job-{index}" for index in range(5)]
+    assert uploader.batch_supported is False
+
+
+def test_acknowledged_recordings_are_not_sent_twice() -> None:
+    clean_dirs()
+    session = RoutingSession({})
+    uploader = Uploader(build_config(), DummyNotifier(), session=session)
+    uploader.enqueue_job(b"abc", meta("once"))
+    assert OutboxDrainer(uploader, workers=1).drain_once().sent == 1
+
+    # El mismo clip vuelve a entrar al outbox (por ejemplo, tras un cierre inesperado)
+    uploader.enqueue_job(b"abc", meta("once"))
+    report = OutboxDrainer(uploader, workers=1).drain_once()
+
+    assert (report.sent, report.already_delivered) == (0, 1)
+    assert session.posted == ["once"]
+    assert uploader.journal.pending_count() == 0
+
+
+class CheckingSession(RoutingSession):
+    """Answers delivery checks from the set of idempotency keys the server already
+    stored.
+    """
+
+    def __init__(self, stored: set[str]) -> None:
+        super().__init__({})
+        self.stored = stored
+        self.checked: list[str] = []
+
+    def post(self, url, files=None, data=None, timeout=None):
+        if data.get("event") != DELIVERY_CHECK:
+            return super().post(url, files=files, data=data, timeout=timeout)
+        assert files is None
+        self.checked.append(data["idempotency_key"])
+        return DummyResponse(
+            200, json.dumps({"delivered": data["idempotency_key"] in self.stored})
+        )
+
+
+def test_uncertain_jobs_ask_the_server_before_resending() -> None:
+    clean_dirs()
+    session = CheckingSession(set())
+    uploader = Uploader(build_config(), DummyNotifier(), session=session)
+    landed = uploader.enqueue_job(b"abc", meta("landed"))
+    lost = uploader.enqueue_job(b"def", meta("lost"))
+    session.stored.add(landed.meta["idempotency_key"])
+    for job in (uploader.journal.claim_next_due(), uploader.journal.claim_next_due()):
+        uploader.journal.retry(job, 0.0, UNCERTAIN)
+
+    report = OutboxDrainer(uploader, workers=1).drain_once()
+
+    assert report.sent == 2
+    assert sorted(session.checked) == sorted(
+        [landed.meta["idempotency_key"], lost.meta["idempotency_key"]]
+    )
+    assert session.posted == ["lost"]
+    assert uploader.journal.is_delivered(landed.meta["idempotency_key"])
+
+
+class AmbiguousBatchSession(CheckingSession):
+    """Stores every batched clip, then answers the batch with ``answer`` (a response or
+    an error).
+    """
+
+    def __init__(self, answer: object) -> None:
+        super().__init__(set())
+        self.answer = answer
+        self.batches = 0
+
+    def post(self, url, files=None, data=None, timeout=None):
+        if not url.endswith("/batch"):
+            return super().post(url, files=files, data=data, timeout=timeout)
+        self.batches += 1
+        self.stored.update(
+            entry["meta"]["idempotency_key"] for entry in json.loads(data["manifest"])
+        )
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+@pytest.mark.parametrize(
+    "answer",
+    [DummyResponse(200, "OK"), requests.ReadTimeout("sin respuesta")],
+    ids=["unreadable-body", "read-timeout"],
+)
+def test_ambiguous_batch_is_confirmed_before_resending(answer) -> None:
+    clean_dirs()
+    session = AmbiguousBatchSession(answer)
+    uploader = batch_uploader(session)
+    for index in range(3):
+        uploader.enqueue_job(b"abc", meta(f"job-{index}"))
+    drainer = OutboxDrainer(uploader, workers=1, batch_max_items=3, backoff_seconds=0.0)
+    uncertain = metrics.counter("uploads_total", "Upload outcomes", result=UNCERTAIN)
+    retry = metrics.counter("uploads_total", "Upload outcomes", result=RETRY)
+    before = (uncertain.value, retry.value)
+
+    first = drainer.drain_once()
+    assert (session.batches, first.retried, session.posted) == (1, 3, [])
+    assert (uncertain.value, retry.value) == (before[0] + 3, before[1])
+
+    second = drainer.drain_once()
+    assert (second.sent, len(session.checked)) == (3, 3)
+    assert session.posted == []
+    assert uploader.journal.pending_count() == 0
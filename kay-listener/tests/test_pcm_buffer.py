@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import wave
+
+from app.journal import OutboxJournal
+from app.pcm_buffer import WAV_HEADER_SIZE, PcmBuffer
+
+
+def test_buffer_stays_in_memory_below_threshold(tmp_path) -> None:
+    buffer = PcmBuffer(16000, spill_threshold=1000, directory=tmp_path, chunk_bytes=64)
+    buffer.extend(b"\x01\x00" * 100)
+    assert not buffer.spilled
+    assert len(buffer) == 200
+    assert buffer.read(0, 4) == b"\x01\x00\x01\x00"
+    assert not list(tmp_path.iterdir())
+
+
+def test_buffer_spills_and_finalizes_header_in_place(tmp_path) -> None:
+    buffer = PcmBuffer(16000, spill_threshold=1000, directory=tmp_path, chunk_bytes=64)
+    for value in range(10):
+        buffer.extend(bytes([value, 0]) * 160)
+    assert buffer.spilled
+    assert buffer.read(320 * 9, 320 * 9 + 2) == b"\x09\x00"
+    with buffer.pcm() as pcm:
+        assert len(pcm) == 3200
+        assert pcm[320] == 1
+
+    path = buffer.finalize_wav()
+    # El archivo preasignado se recorta al tamaño real
+    assert path.stat().st_size == WAV_HEADER_SIZE + 3200
+    with wave.open(str(path), "rb") as wf:
+        assert wf.getframerate() == 16000
+        assert wf.getnframes() == 1600
+        assert wf.readframes(1) == b"\x00\x00"
+
+
+def test_discard_removes_spill_file(tmp_path) -> None:
+    buffer = PcmBuffer(16000, spill_threshold=10, directory=tmp_path)
+    buffer.extend(b"\x00" * 20)
+    path = buffer.path
+    assert path.exists()
+    buffer.discard()
+    assert not path.exists()
+
+
+def test_trim_keeps_the_span_in_memory_and_on_disk(tmp_path) -> None:
+    small = PcmBuffer(16000, spill_threshold=1000, directory=tmp_path)
+    small.extend(bytes(range(10)))
+    small.trim(2, 6)
+    assert small.read(0, 10) == bytes([2, 3, 4, 5])
+
+    spilled = PcmBuffer(16000, spill_threshold=1000, directory=tmp_path, chunk_bytes=64)
+    for value in range(10):
+        spilled.extend(bytes([value, 0]) * 160)
+    spilled.trim(320 * 2, 320 * 5, chunk=100)
+    assert len(spilled) == 960
+    path = spilled.finalize_wav()
+    with wave.open(str(path), "rb") as wf:
+        assert wf.getnframes() == 480
+        frames = wf.readframes(480)
+    assert frames[::320] == bytes([2, 3, 4])
+
+
+def test_journal_moves_finished_file_into_outbox(tmp_path) -> None:
+    recording = tmp_path / "rec_long.wav"
+    recording.write_bytes(b"RIFF" + b"\x00" * 100)
+    journal = OutboxJournal(tmp_path / "outbox", dead_letter=tmp_path / "dead")
+    job = journal.add(recording, {"timestamp_iso": "t"})
+    assert not recording.exists()
+    assert job.size == 104
+    assert job.audio_path.read_bytes().startswith(b"RIFF")
+    journal.close()
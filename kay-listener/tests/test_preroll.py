@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from conftest import AmplitudeVad, IdleSource, build_config  # noqa: E402
+
+from app.audio_stream import AudioStream  # noqa: E402
+from app.pcm_buffer import PcmBuffer  # noqa: E402
+from app.recorder import Recorder  # noqa: E402
+from app.utils import remove_stale_spill_files  # noqa: E402
+
+# Silencio corto y un segundo de pre-roll: las grabaciones de prueba son breves
+PREROLL = {"silence_seconds": 0.1, "preroll_seconds": 1.0}
+
+
+def push(stream: AudioStream, value: int, count: int) -> None:
+    for _ in range(count):
+        stream._callback(
+            np.full((stream.frame_samples, 1), value, dtype=np.int16),
+            stream.frame_samples,
+            None,
+            None,
+        )
+
+
+def test_recorder_starts_from_wake_frame_index() -> None:
+    stream = AudioStream(build_config(**PREROLL), source=IdleSource())
+    recorder = Recorder(stream.config, stream)
+    recorder.vad = AmplitudeVad()
+    push(stream, 0, 10)  # ruido previo a la wake word
+    wake_end = stream.frame_index - 1
+    push(stream, 1, 3)  # habla inmediatamente después de "oye kay"
+    push(stream, 0, 5)  # silencio suficiente para cerrar la grabación
+
+    result = recorder.record_until_silence(start_index=wake_end + 1)
+
+    assert result is not None
+    assert result.duration_ms == 8 * 20
+    pcm = np.frombuffer(result.audio_bytes[44:], dtype=np.int16)
+    assert (pcm[: 3 * stream.frame_samples] == 1).all()
+
+
+def test_long_recording_spills_to_disk_and_respects_max_duration() -> None:
+    config = build_config(**PREROLL)
+    config.max_recording_seconds = 1.0
+    config.recording_spill_mb = 0.01
+    stream = AudioStream(config, source=IdleSource())
+    recorder = Recorder(config, stream)
+    recorder.vad = AmplitudeVad()
+    start = stream.frame_index
+    push(stream, 7, 60)  # habla continua: solo la corta el máximo configurado
+
+    result = recorder.record_until_silence(start_index=start)
+
+    assert result is not None
+    assert result.audio_bytes == b""
+    assert result.duration_ms == 1000
+    data = result.audio_path.read_bytes()
+    assert len(data) == 44 + 50 * stream.frame_samples * 2
+    assert (np.frombuffer(data[44:], dtype=np.int16) == 7).all()
+    result.audio_path.unlink()
+
+
+def test_streamed_recording_that_spills_leaves_no_file(tmp_path) -> None:
+    config = build_config(**PREROLL)
+    config.max_recording_seconds = 1.0
+    config.recording_spill_mb = 0.01
+    config.stream_segment_seconds = 0.4
+    stream = AudioStream(config, source=IdleSource())
+    recorder = Recorder(config, stream)
+    recorder.spill_dir = tmp_path
+    recorder.vad = AmplitudeVad()
+    segments: list[int] = []
+    start = stream.frame_index
+    push(stream, 7, 60)
+
+    result = recorder.record_until_silence(
+        start_index=start, on_segment=lambda pcm, ms: segments.append(ms)
+    )
+
+    # Los segmentos ya llevan el audio: el resultado solo trae la duración
+    assert result is not None
+    assert result.duration_ms == sum(segments) == 1000
+    assert result.audio_bytes == b"" and result.audio_path is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_subscribe_clamps_to_ring_history() -> None:
+    stream = AudioStream(build_config(**PREROLL), source=IdleSource())
+    push(stream, 0, stream.ring.capacity + 200)
+    reader = stream.subscribe(start_index=0)
+    assert reader.cursor == stream.ring.oldest_index()
+    assert stream.ring.write_index - reader.cursor >= stream.preroll_frames
+
+
+def test_audio_buffered_during_startup_is_kept() -> None:
+    config = build_config(**PREROLL)
+    stream = AudioStream(config, source=IdleSource())
+    # El detector se suscribe antes de que el modelo esté listo
+    reader = stream.subscribe(name="wake")
+    warmup_frames = (
+        int(config.startup_buffer_seconds / config.frame_duration_seconds) - 1
+    )
+    push(stream, 3, warmup_frames)
+
+    assert reader.qsize() == warmup_frames
+    assert bytes(reader.get_nowait())[:2] == b"\x03\x00"
+    assert reader.overruns == 0
+
+
+def test_trailing_silence_is_trimmed_to_the_padding() -> None:
+    config = build_config(**PREROLL)
+    config.silence_seconds = 1.0
+    config.endpointer = "fixed"
+    config.trim_padding_ms = 100
+    stream = AudioStream(config, source=IdleSource())
+    recorder = Recorder(config, stream)
+    recorder.vad = AmplitudeVad()
+    start = stream.frame_index
+    push(stream, 0, 10)  # pausa antes de hablar
+    push(stream, 3, 20)
+    push(stream, 0, 50)  # el silencio que cierra la grabación
+
+    result = recorder.record_until_silence(start_index=start)
+
+    assert result is not None
+    assert result.original_duration_ms == 80 * 20
+    assert result.duration_ms == (5 + 20 + 5) * 20
+    pcm = np.frombuffer(result.audio_bytes[44:], dtype=np.int16).reshape(
+        -1, stream.frame_samples
+    )
+    assert [int(frame[0]) for frame in pcm] == [0] * 5 + [3] * 20 + [0] * 5
+
+
+def test_new_recorder_keeps_the_spill_files_of_other_recordings(
+    tmp_path, monkeypatch
+) -> None:
+    monkeypatch.setattr("app.utils.recording_spill_dir", lambda: tmp_path)
+    live = PcmBuffer(16000, spill_threshold=4, directory=tmp_path)
+    live.extend(b"\x00" * 8)
+    stream = AudioStream(build_config(**PREROLL), source=IdleSource())
+
+    # Un Recorder extra (batch, benchmark) no debe borrar una grabación en curso
+    Recorder(stream.config, stream)
+    assert live.path is not None and live.path.exists()
+
+    live.discard()
+    (tmp_path / "rec_interrumpida.wav").write_bytes(b"RIFF")
+    (tmp_path / "notas.txt").write_text("x", encoding="utf-8")
+    assert remove_stale_spill_files(tmp_path) == 1
+    assert [path.name for path in tmp_path.iterdir()] == ["notas.txt"]
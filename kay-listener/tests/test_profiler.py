@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+import threading
+
+from app.profiler import SamplingProfiler, ThreadInfo, write_profile
+
+
+def spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_attributes_cpu_and_stacks_per_thread(tmp_path) -> None:
+    stop = threading.Event()
+    busy = threading.Thread(target=spin, args=(stop,), name="Busy", daemon=True)
+    idle = threading.Thread(target=stop.wait, name="Idle", daemon=True)
+    busy.start()
+    idle.start()
+    try:
+        report = SamplingProfiler(interval=0.005).run(0.5)
+    finally:
+        stop.set()
+
+    threads = {thread.name: thread for thread in report.threads}
+    assert report.samples > 10
+    assert threads["Busy"].top_functions[0][0] == "test_profiler:spin"
+    assert threads["Idle"].top_functions[0][0].startswith("threading:")
+    if threads["Busy"].cpu_seconds is not None:
+        assert threads["Busy"].cpu_seconds > threads["Idle"].cpu_seconds
+        assert report.threads[0].name == "Busy"
+
+    collapsed_path, summary_path = write_profile(report, tmp_path)
+    lines = collapsed_path.read_text(encoding="utf-8").splitlines()
+    assert any(
+        line.startswith("Busy;")
+        and line.split(";")[-1].startswith("test_profiler:spin ")
+        for line in lines
+    )
+    summary = json.loads(summary_path.read_text(encoding="utf-8"))
+    assert {"Busy", "Idle"} <= {thread["name"] for thread in summary["threads"]}
+
+
+def test_extra_threads_name_foreign_threads() -> None:
+    stop = threading.Event()
+    worker = threading.Thread(target=stop.wait, daemon=True)
+    worker.start()
+    try:
+        extra = [ThreadInfo("AudioCallback-default", worker.ident, worker.native_id)]
+        report = SamplingProfiler(interval=0.01, extra_threads=lambda: extra).run(0.1)
+    finally:
+        stop.set()
+
+    assert any(stack.startswith("AudioCallback-default;") for stack in report.stacks)
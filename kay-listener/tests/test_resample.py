@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.audio_sources import AudioSource, ResamplingSource  # noqa: E402
+from app.resample import PolyphaseResampler  # noqa: E402
+
+
+def sine(
+    rate: int, seconds: float, frequency: float = 1000.0, delay: float = 0.0
+) -> np.ndarray:
+    t = np.arange(int(rate * seconds)) / rate - delay
+    return 0.5 * 32767 * np.sin(2 * np.pi * frequency * t)
+
+
+class BlockSource(AudioSource):
+    """Pushes fixed blocks of a prepared signal when ``play`` is called."""
+
+    def __init__(
+        self, samples: np.ndarray, sample_rate: int, frame_samples: int
+    ) -> None:
+        super().__init__(sample_rate, frame_samples)
+        self.samples = samples
+        self.callback = None
+
+    def start(self, callback) -> None:
+        self.callback = callback
+
+    def stop(self) -> None:
+        self.callback = None
+
+    def play(self) -> None:
+        for start in range(0, len(self.samples), self.frame_samples):
+            block = self.samples[start : start + self.frame_samples]
+            self.callback(block.reshape(-1, 1), len(block), None, None)
+
+
+@pytest.mark.parametrize("in_rate", [48000, 44100])
+def test_resampled_tone_matches_a_tone_generated_at_16k(in_rate) -> None:
+    resampler = PolyphaseResampler(in_rate, 16000)
+    output = resampler.process(sine(in_rate, 1.0).astype(np.int16))
+
+    assert abs(len(output) - 16000) <= 1
+    expected = sine(16000, len(output) / 16000, delay=resampler.delay_seconds)
+    error = (output - expected)[200:-200]
+    snr_db = 10 * np.log10(np.mean(expected[200:-200] ** 2) / np.mean(error**2))
+    assert snr_db > 60
+
+
+def test_block_boundaries_do_not_change_the_output() -> None:
+    samples = (np.random.default_rng(5).normal(0, 3000, 44100)).astype(np.int16)
+    whole = PolyphaseResampler(44100, 16000).process(samples)
+
+    streaming = PolyphaseResampler(44100, 16000)
+    sizes = np.random.default_rng(6).integers(1, 1500, 200)
+    edges = np.concatenate(([0], np.cumsum(sizes)))
+    parts = [
+        streaming.process(samples[start:end])
+        for start, end in zip(edges[:-1], edges[1:], strict=True)
+        if start < len(samples)
+    ]
+
+    assert np.array_equal(np.concatenate(parts), whole)
+
+
+def test_process_writes_into_the_callers_buffer() -> None:
+    samples = (np.random.default_rng(7).normal(0, 3000, 4800)).astype(np.int16)
+    expected = PolyphaseResampler(48000, 16000).process(samples)
+
+    resampler = PolyphaseResampler(48000, 16000)
+    out = np.zeros(resampler.max_output(960), dtype=np.int16)
+    parts = []
+    for start in range(0, len(samples), 960):
+        written = resampler.process(samples[start : start + 960], out=out)
+        assert np.shares_memory(written, out)
+        parts.append(written.copy())
+
+    assert np.array_equal(np.concatenate(parts), expected)
+
+
+def test_aliasing_tones_are_filtered_out() -> None:
+    # 11 kHz no cabe a 16 kHz: sin filtro se plegaría a 5 kHz
+    output = PolyphaseResampler(48000, 16000).process(
+        sine(48000, 0.5, frequency=11000.0).astype(np.int16)
+    )
+    assert np.abs(output[100:]).max() < 30
+
+
+def test_resampling_source_delivers_fixed_frames_at_the_model_rate() -> None:
+    device = BlockSource(sine(44100, 1.0).astype(np.int16), 44100, 882)
+    source = ResamplingSource(device, 16000, 320)
+    frames = []
+    source.start(lambda indata, count, time_info, status: frames.append(indata.copy()))
+
+    device.play()
+
+    assert {frame.shape for frame in frames} == {(320, 1)}
+    assert len(frames) == 16000 // 320
+    pcm = np.concatenate(frames).reshape(-1)
+    assert np.array_equal(
+        pcm, PolyphaseResampler(44100, 16000).process(device.samples)[: len(pcm)]
+    )
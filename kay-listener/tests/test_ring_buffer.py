@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.metrics import metrics  # noqa: E402
+from app.ring_buffer import EventRing, FrameRing  # noqa: E402
+
+
+def frame(value: int, samples: int = 4):
+    return np.full((samples, 1), value, dtype=np.int16)
+
+
+def test_readers_keep_independent_cursors() -> None:
+    ring = FrameRing(capacity=8, frame_samples=4)
+    early = ring.reader()
+    ring.write(frame(1))
+    late = ring.reader()
+    ring.write(frame(2))
+
+    assert bytes(early.get_nowait()) == frame(1).tobytes()
+    assert bytes(early.get_nowait()) == frame(2).tobytes()
+    assert bytes(late.get_nowait()) == frame(2).tobytes()
+    with pytest.raises(queue.Empty):
+        late.get(timeout=0.01)
+
+
+def test_views_are_zero_copy() -> None:
+    ring = FrameRing(capacity=4, frame_samples=4)
+    reader = ring.reader()
+    ring.write(frame(7))
+    view = reader.get_nowait()
+    assert view.obj is not None
+    assert np.shares_memory(np.frombuffer(view, dtype=np.int16), ring.array(0))
+
+
+def test_slow_reader_counts_overruns() -> None:
+    dropped = metrics.counter(
+        "frames_dropped_total", subscriber="slow", device="default"
+    )
+    before = dropped.value
+    ring = FrameRing(capacity=4, frame_samples=4)
+    reader = ring.reader(name="slow")
+    for value in range(10):
+        ring.write(frame(value))
+    # Solo sobreviven los 3 frames más recientes con margen de seguridad
+    assert bytes(reader.get_nowait()) == frame(7).tobytes()
+    assert reader.overruns == 7
+    assert reader.qsize() == 2
+    assert dropped.value - before == 7
+
+
+def test_blocked_reader_wakes_on_write_and_close() -> None:
+    ring = FrameRing(capacity=8, frame_samples=4)
+    # Sondeo enorme: solo el aviso del escritor puede despertar a tiempo al lector
+    reader = ring.reader(poll_interval=30.0)
+    writer = threading.Timer(0.05, ring.write, args=(frame(3),))
+    writer.start()
+    started = time.monotonic()
+    assert bytes(reader.get(timeout=10)) == frame(3).tobytes()
+    assert time.monotonic() - started < 5
+
+    threading.Timer(0.05, reader.close).start()
+    started = time.monotonic()
+    with pytest.raises(queue.Empty):
+        reader.get()
+    assert time.monotonic() - started < 5
+
+
+def test_event_ring_drops_instead_of_blocking_when_full() -> None:
+    events = EventRing(capacity=4)
+    for value in range(6):
+        events.record(1, value)
+
+    pending, dropped = events.drain()
+    assert [value for _, _, value in pending] == [0, 1, 2, 3]
+    assert dropped == 2
+    # Tras vaciarlo vuelve a aceptar eventos y no repite los descartes ya contados
+    assert events.record(1, 6) is True
+    pending, dropped = events.drain()
+    assert [value for _, _, value in pending] == [6]
+    assert dropped == 0
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("loguru")
+
+ROOT = Path(__file__).resolve().parents[1]
+# Margen amplio para máquinas de CI lentas; en un portátil normal ronda 0.03 s
+IMPORT_BUDGET_SECONDS = float(os.getenv("KAY_IMPORT_BUDGET_SECONDS", "1.0"))
+DEFERRED_MODULES = (
+    "loguru",
+    "vosk",
+    "sounddevice",
+    "numpy",
+    "webrtcvad",
+    "requests",
+    "pystray",
+    "PIL",
+    "win10toast",
+    "http.server",
+)
+
+_COLD_IMPORT = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.app
+elapsed = time.perf_counter() - started
+loaded = [name for name in {DEFERRED_MODULES!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "loaded": loaded}}))
+"""
+
+
+def test_cold_import_of_app_stays_within_budget() -> None:
+    completed = subprocess.run(
+        [sys.executable, "-c", _COLD_IMPORT],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=True,
+    )
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    # Las dependencias pesadas se cargan al construir cada subsistema, no al importar
+    assert report["loaded"] == []
+    assert report["seconds"] < IMPORT_BUDGET_SECONDS, (
+        f"import app.app tardó {report['seconds']:.2f}s"
+    )
+
+
+def test_profile_imports_reports_each_subsystem() -> None:
+    from app.app import PROFILED_MODULES, profile_imports
+
+    timings = profile_imports()
+    assert [module for module, _, _ in timings] == ["app.app"] + [
+        module for module, _ in PROFILED_MODULES
+    ]
+    for _, _, status in timings:
+        assert isinstance(status, float) or status in ("ya cargado", "no disponible")
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from conftest import DummyNotifier, DummyResponse
+
+from app.config import AppConfig, project_root
+from app.streaming import SegmentedUploadSession
+from app.uploader import Uploader, requests
+
+
+class RecordingSession:
+    """Fake requests session: fails the calls listed in ``failures`` with ``error``
+    and records the rest.
+    """
+
+    def __init__(self, failures=(), error=requests.ConnectionError):
+        self.failures = set(failures)
+        self.error = error
+        self.calls = 0
+        self.posted: list[dict] = []
+
+    def post(self, url, files=None, data=None, timeout=None):
+        call = self.calls
+        self.calls += 1
+        if call in self.failures:
+            raise self.error("net")
+        self.posted.append({"data": dict(data), "has_audio": files is not None})
+        return DummyResponse(200)
+
+
+def build_config() -> AppConfig:
+    return AppConfig(
+        webhook_url="https://example.com",
+        wake_word="oye kay",
+        sample_rate=16000,
+        frame_duration_ms=20,
+        vad_aggressiveness=2,
+        silence_seconds=5.0,
+        input_device_index=None,
+        log_level="INFO",
+        auto_start_spooler=False,
+        max_retry_attempts=1,
+    )
+
+
+def clean_outbox():
+    outbox = project_root() / "outbox"
+    for file in outbox.glob("*"):
+        if file.name == ".gitkeep":
+            continue
+        file.unlink()
+    return outbox
+
+
+def test_segments_share_session_and_end_with_marker() -> None:
+    clean_outbox()
+    http = RecordingSession()
+    uploader = Uploader(build_config(), DummyNotifier(), session=http)
+    session = SegmentedUploadSession(
+        uploader, encode=lambda pcm: pcm, wake_word="oye kay", timestamp_iso="now"
+    )
+    session.add_segment(b"\x00" * 10, 1000)
+    session.add_segment(b"\x00" * 10, 500)
+    assert session.finish(1500, timeout=5) is True
+
+    events = [
+        (p["data"]["event"], p["data"]["segment_seq"], p["has_audio"])
+        for p in http.posted
+    ]
+    assert events == [
+        ("segment", "0", True),
+        ("segment", "1", True),
+        ("session_end", "2", False),
+    ]
+    assert {p["data"]["session_id"] for p in http.posted} == {session.session_id}
+
+
+def test_failed_segment_spools_rest_of_session_in_order() -> None:
+    outbox = clean_outbox()
+    http = RecordingSession(failures={1})
+    uploader = Uploader(build_config(), DummyNotifier(), session=http)
+    session = SegmentedUploadSession(
+        uploader, encode=lambda pcm: pcm, wake_word="oye kay", timestamp_iso="now"
+    )
+    for _ in range(3):
+        session.add_segment(b"\x01" * 10, 1000)
+    assert session.finish(3000, timeout=5) is False
+    # Segmentos 1 y 2 con audio, más el marcador de cierre sin audio
+    assert uploader.journal.pending_count() == 3
+    assert len(list(outbox.glob("*.wav"))) == 2
+
+    uploader.process_outbox_once()
+    assert uploader.journal.pending_count() == 0
+    replayed = [(p["data"]["event"], p["data"]["segment_seq"]) for p in http.posted[1:]]
+    assert replayed == [("segment", "1"), ("segment", "2"), ("session_end", "3")]
+
+
+def test_segment_spooled_after_uncertain_post_is_marked_delivery_unknown() -> None:
+    clean_outbox()
+    http = RecordingSession(failures={1}, error=requests.ReadTimeout)
+    uploader = Uploader(build_config(), DummyNotifier(), session=http)
+    session = SegmentedUploadSession(
+        uploader, encode=lambda pcm: pcm, wake_word="oye kay", timestamp_iso="now"
+    )
+    for _ in range(3):
+        session.add_segment(b"\x01" * 10, 1000)
+    assert session.finish(3000, timeout=5) is False
+
+    spooled = []
+    while (job := uploader.journal.claim_next_due()) is not None:
+        spooled.append((job.meta["segment_seq"], job.meta["delivery_unknown"]))
+        uploader.journal.complete(job)
+    # Solo el segmento cuyo POST pudo llegar se confirma antes de reenviarse
+    assert spooled == [(1, True), (2, False), (3, False)]
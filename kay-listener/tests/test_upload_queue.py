@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import threading
+
+from conftest import DummyNotifier, DummyResponse
+
+from app.config import AppConfig
+from app.journal import OutboxJournal
+from app.upload_queue import UploadQueue
+from app.uploader import Uploader, UploadMeta
+
+
+class GatedSession:
+    """Holds every POST until ``release`` is set, like a webhook that hangs."""
+
+    def __init__(self) -> None:
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def post(self, *args, **kwargs):
+        self.calls += 1
+        self.entered.set()
+        self.release.wait(5)
+        return DummyResponse(200)
+
+
+def build_config() -> AppConfig:
+    return AppConfig(
+        webhook_url="https://example.com",
+        wake_word="oye kay",
+        sample_rate=16000,
+        frame_duration_ms=20,
+        vad_aggressiveness=2,
+        silence_seconds=5.0,
+        input_device_index=None,
+        log_level="INFO",
+        auto_start_spooler=False,
+    )
+
+
+def build_uploader(tmp_path, session) -> Uploader:
+    journal = OutboxJournal(tmp_path / "outbox", tmp_path / "dead_letter")
+    return Uploader(build_config(), DummyNotifier(), session=session, journal=journal)
+
+
+def meta(duration_ms: int = 1000) -> UploadMeta:
+    return UploadMeta(duration_ms=duration_ms, wake_word="oye kay", timestamp_iso="now")
+
+
+def test_submit_returns_while_the_webhook_hangs(tmp_path) -> None:
+    session = GatedSession()
+    upload_queue = UploadQueue(build_uploader(tmp_path, session), workers=1, maxsize=4)
+    upload_queue.start()
+    sent = threading.Event()
+
+    assert upload_queue.submit(b"abc", meta(), on_sent=sent.set) is True
+    assert session.entered.wait(5)
+    assert not sent.is_set()
+
+    session.release.set()
+    upload_queue.join()
+    assert sent.is_set()
+    upload_queue.stop()
+
+
+def test_full_queue_spills_to_outbox(tmp_path) -> None:
+    session = GatedSession()
+    uploader = build_uploader(tmp_path, session)
+    upload_queue = UploadQueue(uploader, workers=1, maxsize=1)
+    upload_queue.start()
+
+    assert upload_queue.submit(b"uno", meta(1)) is True
+    assert session.entered.wait(5)  # el worker está ocupado con la primera
+    assert upload_queue.submit(b"dos", meta(2)) is True
+    assert upload_queue.submit(b"tres", meta(3)) is False
+    assert uploader.journal.pending_count() == 1
+
+    session.release.set()
+    upload_queue.join()
+    assert session.calls == 2
+    upload_queue.stop()
+
+
+def test_stop_moves_waiting_recordings_to_outbox(tmp_path) -> None:
+    session = GatedSession()
+    uploader = build_uploader(tmp_path, session)
+    upload_queue = UploadQueue(uploader, workers=1, maxsize=4)
+    upload_queue.start()
+    upload_queue.submit(b"uno", meta(1))
+    assert session.entered.wait(5)
+    upload_queue.submit(b"dos", meta(2))
+    upload_queue.submit(b"tres", meta(3))
+
+    # La subida en curso sigue; las que esperaban no se pierden al cerrar
+    assert upload_queue.stop(timeout=0.1) == 2
+    assert upload_queue.submit(b"cuatro", meta(4)) is False
+    session.release.set()
+    assert uploader.journal.pending_count() == 3
+    assert session.calls == 1
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.vad import SpeechGate, frame_energy_dbfs  # noqa: E402
+
+FRAME = 320
+
+
+def make_frames(amplitude: float, count: int, seed: int = 0) -> list[bytes]:
+    rng = np.random.default_rng(seed)
+    data = (rng.uniform(-1, 1, (count, FRAME)) * amplitude * 32767).astype(np.int16)
+    return [row.tobytes() for row in data]
+
+
+def test_energy_is_vectorized_per_frame() -> None:
+    frames = np.stack(
+        [np.zeros(FRAME, dtype=np.int16), np.full(FRAME, 32767, dtype=np.int16)]
+    )
+    energy = frame_energy_dbfs(frames)
+    assert energy.shape == (2,)
+    assert energy[0] == pytest.approx(-100.0)
+    assert energy[1] == pytest.approx(0.0, abs=0.01)
+
+
+def test_gate_skips_quiet_room_and_releases_lookback_on_speech() -> None:
+    gate = SpeechGate(16000, 20, margin_db=6.0, hangover_ms=100, lookback_ms=60)
+    gate._vad = None  # solo la etapa de energía, independiente de webrtcvad
+    quiet = make_frames(0.0005, 100)
+    loud = make_frames(0.3, 5, seed=1)
+
+    passed = [chunk for frame in quiet for chunk in gate.process(frame)]
+    assert passed == []
+
+    released = gate.process(loud[0])
+    # 3 frames de lookback (60 ms) más el frame que abre el gate
+    assert released == quiet[-3:] + [loud[0]]
+
+    for frame in loud[1:]:
+        assert gate.process(frame) == [frame]
+    tail = [gate.process(frame) for frame in quiet[:10]]
+    assert sum(len(chunk) for chunk in tail) == gate.hangover_frames - 1
+    assert not gate.is_open
+    assert gate.pass_ratio < 0.2
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("loguru")
+
+from conftest import AmplitudeVad, IdleSource, build_config  # noqa: E402
+
+from app.audio_stream import AudioStream  # noqa: E402
+from app.config import AppConfig  # noqa: E402
+from app.recorder import Recorder  # noqa: E402
+from app.wake_detector import WakeDetector  # noqa: E402
+
+WAKE = 7  # muestras que TimedRecognizer "oye" como la wake word
+
+
+class ScriptedRecognizer:
+    """Records what the detector feeds and returns canned partials."""
+
+    def __init__(self, partial: str = "") -> None:
+        self.batches: list[int] = []
+        self.partial_calls = 0
+        self.partial = partial
+
+    def AcceptWaveform(self, data: bytes) -> bool:  # noqa: N802 - API de Vosk
+        self.batches.append(len(data))
+        return False
+
+    def PartialResult(self) -> str:  # noqa: N802 - API de Vosk
+        self.partial_calls += 1
+        return json.dumps({"partial": self.partial})
+
+    def Result(self) -> str:  # noqa: N802 - API de Vosk
+        return json.dumps({"text": ""})
+
+
+def build_detector(
+    config: AppConfig, recognizer: ScriptedRecognizer, wakes: list[int] | None = None
+) -> WakeDetector:
+    stream = AudioStream(config, source=IdleSource())
+    detector = WakeDetector(
+        config=config,
+        audio_stream=stream,
+        on_wake=(wakes if wakes is not None else []).append,
+    )
+    detector._recognizer = recognizer
+    return detector
+
+
+def frame(config: AppConfig) -> bytes:
+    return np.ones(
+        int(config.sample_rate * config.frame_duration_seconds), dtype=np.int16
+    ).tobytes()
+
+
+def test_frames_are_fed_in_batches_and_partials_throttled() -> None:
+    config = build_config(wake_batch_ms=100, wake_partial_interval_ms=200)
+    recognizer = ScriptedRecognizer()
+    detector = build_detector(config, recognizer)
+
+    for _ in range(50):  # 1 s de audio
+        detector.feed(frame(config))
+
+    # 10 lotes de 5 frames en lugar de 50 llamadas; un parcial cada 200 ms de audio
+    assert recognizer.batches == [3200] * 10
+    assert recognizer.partial_calls == 5
+
+
+def test_per_frame_settings_match_previous_behaviour() -> None:
+    config = build_config(wake_batch_ms=20, wake_partial_interval_ms=0)
+    recognizer = ScriptedRecognizer()
+    detector = build_detector(config, recognizer)
+
+    for _ in range(10):
+        detector.feed(frame(config))
+
+    assert recognizer.batches == [640] * 10
+    assert recognizer.partial_calls == 10
+
+
+def test_partial_wake_word_fires_and_drops_pending_audio() -> None:
+    config = build_config(wake_batch_ms=40, wake_partial_interval_ms=40)
+    wakes: list[int] = []
+    detector = build_detector(config, ScriptedRecognizer(partial="oye kay"), wakes)
+
+    assert detector.feed(frame(config)) is False
+    assert detector.feed(frame(config)) is True
+    assert len(wakes) == 1
+    assert not detector._pending
+
+
+def test_backlog_skips_partials_until_caught_up() -> None:
+    config = build_config(
+        wake_batch_ms=20, wake_partial_interval_ms=20, wake_max_lag_ms=100
+    )
+    recognizer = ScriptedRecognizer()
+    detector = build_detector(config, recognizer)
+    stream = detector.audio_stream
+    samples = np.zeros((stream.frame_samples, 1), dtype=np.int16)
+    for _ in range(20):  # 400 ms pendientes, por encima del máximo de 100 ms
+        stream._callback(samples, stream.frame_samples, None, None)
+
+    partials_while_degraded = []
+    while detector.backlog_frames:
+        detector.feed(detector.next_frame())
+        if detector._degraded:
+            partials_while_degraded.append(recognizer.partial_calls)
+    detector.flush()
+
+    assert partials_while_degraded and set(partials_while_degraded) == {0}
+    # En modo degradado los lotes crecen hasta wake_max_lag_ms; al recuperarse, 20 ms
+    assert recognizer.batches[0] == 3200
+    assert recognizer.batches[-1] == 640
+    assert not detector._degraded
+
+
+class TimedRecognizer:
+    """Hears the wake word 60 ms after it ends, like Vosk, and optionally reports word
+    timings.
+    """
+
+    def __init__(self, words: bool) -> None:
+        self.words = words
+        self.samples: list[np.ndarray] = []
+
+    def AcceptWaveform(self, data: bytes) -> bool:  # noqa: N802 - API de Vosk
+        self.samples.append(np.frombuffer(data, dtype=np.int16))
+        return False
+
+    def PartialResult(self) -> str:  # noqa: N802 - API de Vosk
+        audio = np.concatenate(self.samples)
+        wake = np.flatnonzero(audio == WAKE)
+        if not len(wake) or len(audio) - wake[-1] < 16000 * 0.06:
+            return json.dumps({"partial": ""})
+        result = {"partial": "oye kay"}
+        if self.words:
+            end = (wake[-1] + 1) / 16000
+            result["partial_result"] = [
+                {"word": "oye", "end": end / 2},
+                {"word": "kay", "end": end},
+            ]
+        return json.dumps(result)
+
+
+def say_wake_word_then_command(words: bool) -> tuple[WakeDetector, list[int]]:
+    # Lotes de 100 ms y parciales cada 200 ms: Vosk
+    # reconoce la wake word ya dentro de la orden
+    config = build_config(
+        wake_batch_ms=100, wake_partial_interval_ms=200, endpointer="fixed"
+    )
+    wakes: list[int] = []
+    detector = build_detector(config, TimedRecognizer(words), wakes)
+    stream = detector.audio_stream
+    for value, frames in ((0, 10), (WAKE, 15), (1000, 30), (0, 30)):
+        for _ in range(frames):
+            samples = np.full((stream.frame_samples, 1), value, dtype=np.int16)
+            stream._callback(samples, stream.frame_samples, None, None)
+            if not wakes:
+                detector.feed(detector.next_frame())
+    return detector, wakes
+
+
+def test_recording_starts_where_the_wake_word_ended_not_where_it_was_recognised() -> (
+    None
+):
+    detector, wakes = say_wake_word_then_command(words=True)
+
+    # Detectada en el frame 29, pero la wake word
+    # terminó en el 24: la orden empieza en el 25
+    assert detector._queue.last_index == 29
+    assert wakes == [25]
+    stream = detector.audio_stream
+    recorder = Recorder(stream.config, stream)
+    recorder.vad = AmplitudeVad(threshold=100)
+    result = recorder.record_until_silence(start_index=wakes[0])
+    assert result is not None
+    pcm = np.frombuffer(result.audio_bytes[44:], dtype=np.int16)
+    assert (pcm[: 30 * stream.frame_samples] == 1000).all()
+
+
+def test_without_word_timings_the_start_rewinds_over_the_decode_window() -> None:
+    _, wakes = say_wake_word_then_command(words=False)
+
+    # Se retrocede al primer frame posterior al parcial anterior (el 19): incluye la
+    # cola de la wake word, pero ningún frame de la orden se pierde
+    assert wakes == [20]